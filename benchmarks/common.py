@@ -0,0 +1,166 @@
+"""Helpers shared by the benchmarks: load loops, latency summaries and JSON results."""
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from honeypot import utils
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of an already sorted list, nearest rank."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))
+    return values[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (in milliseconds) of one benchmark."""
+    latencies = sorted(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 4)
+
+    return {
+        "operations": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def measure(operation, concurrency=1, duration=5.0, setup=None, close=None):
+    """Call operation(state) in a loop from `concurrency` threads for `duration` seconds.
+
+    state is a dict private to each thread (e.g. a kept-alive connection),
+    filled by setup(state) whenever it is empty; only operation() is timed.
+    An exception counts as an error; close(state) is then called and the
+    thread starts over with an empty state.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        state = {}
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            try:
+                if setup is not None and not state:
+                    setup(state)
+                start = time.perf_counter()
+                operation(state)
+            except Exception:
+                failed += 1
+                if close is not None:
+                    with contextlib.suppress(Exception):
+                        close(state)
+                state = {}
+                continue
+            local.append(time.perf_counter() - start)
+        if close is not None:
+            with contextlib.suppress(Exception):
+                close(state)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, time.monotonic() - start, errors[0])
+
+
+def time_calls(function, iterations):
+    """Call function() `iterations` times in a row and summarize the latencies."""
+    latencies = []
+    start = time.monotonic()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.monotonic() - start)
+
+
+def free_port():
+    """A localhost port that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_log_dir(**writer_settings):
+    """Send the sensors' events to a fresh temporary directory instead of the real logs."""
+    utils.LOG_DIR = tempfile.mkdtemp(prefix="honeypot-bench-")
+    utils.configure_log_writer(**writer_settings)
+    return utils.LOG_DIR
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence logging and stdout/stderr (per-request messages) inside the block."""
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield
+    finally:
+        logging.disable(previous)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(path, suite, args, results):
+    """Save one run as JSON, with what is needed to compare it with another run."""
+    document = {
+        "suite": suite,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def print_results(results):
+    print(f"  {'benchmark':40s} {'ops/s':>10s} {'p50 ms':>10s} {'p99 ms':>10s} {'errors':>7s}")
+    for name, result in results.items():
+        print(f"  {name:40s} {_cell(result['throughput'])} {_cell(result['p50_ms'])} "
+              f"{_cell(result['p99_ms'])} {result['errors']:7d}")
+
+
+def _cell(value):
+    return f"{'-':>10s}" if value is None else f"{value:10.3f}" if value < 100 else f"{value:10.1f}"
@@ -0,0 +1,68 @@
+"""Compare two benchmark result files written with --json.
+
+Usage: python -m benchmarks.compare before.json after.json [--threshold 5]
+
+Prints throughput and p50/p99 latency of every benchmark found in both
+runs with the change in percent; changes beyond --threshold percent are
+marked as better (+) or worse (-).
+"""
+import argparse
+import json
+
+
+def flatten(results, prefix=""):
+    """{name: result} for every benchmark, nested groups (e.g. history sizes) joined with '/'."""
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict) and "throughput" in value:
+            flat[prefix + name] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}/"))
+    return flat
+
+
+def change(before, after, higher_is_better, threshold):
+    if before is None or after is None or before == 0:
+        return "", ""
+    percent = (after - before) / before * 100
+    mark = ""
+    if abs(percent) >= threshold:
+        mark = "+" if (percent > 0) == higher_is_better else "-"
+    return f"{percent:+.1f}%", mark
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=5.0)
+    args = parser.parse_args()
+
+    runs = []
+    for path in (args.before, args.after):
+        with open(path) as f:
+            runs.append(json.load(f))
+    before, after = runs
+    if before.get("suite") != after.get("suite"):
+        print(f"Warning: comparing a {before.get('suite')} run with a {after.get('suite')} run")
+    for key in ("git", "python", "cpus"):
+        if before.get(key) != after.get(key):
+            print(f"  {key}: {before.get(key)} -> {after.get(key)}")
+
+    old, new = flatten(before["results"]), flatten(after["results"])
+    print(f"  {'benchmark':48s} {'ops/s':>18s} {'p50':>18s} {'p99':>18s}")
+    for name in old:
+        if name not in new:
+            continue
+        cells = []
+        for field, higher_is_better in (("throughput", True), ("p50_ms", False), ("p99_ms", False)):
+            percent, mark = change(old[name][field], new[name][field], higher_is_better, args.threshold)
+            cells.append(f"{percent:>16s} {mark:1s}")
+        print(f"  {name:48s} " + " ".join(cells))
+    missing = [name for name in new if name not in old] + [name for name in old if name not in new]
+    if missing:
+        print(f"  only in one run: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Requests/sec of the HTTP honeypot: threaded keep-alive server vs the old single-threaded one.
+
+Usage: python -m benchmarks.http_bench [--clients 16] [--duration 5] [--slow-clients 0]
+                                       [--json results.json]
+
+Each client thread sends GET / in a loop over one connection (reconnecting
+when the server closes it). Slow clients open a connection, send half a
+request line and then stay silent, like a slow-loris scanner.
+"""
+import argparse
+import http.client
+import os
+import socket
+import sys
+import threading
+from http.server import HTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import bench_log_dir, measure, print_results, quiet, write_results
+from honeypot import utils
+from honeypot.assets import AssetCache
+from honeypot.honeypot import HoneypotHTTPHandler, HoneypotHTTPServer
+
+
+class LegacyHandler(HoneypotHTTPHandler):
+    # One request per connection, as before keep-alive
+    protocol_version = "HTTP/1.0"
+
+
+def legacy_server():
+    """The previous setup: a single-threaded HTTPServer without limits."""
+    server = HTTPServer(("127.0.0.1", 0), LegacyHandler)
+    server.request_timeout = None
+    server.max_header_bytes = 1 << 20
+    server.max_body = 1 << 30
+    server.max_keepalive_requests = 1
+    server.assets = AssetCache(os.path.dirname(os.path.abspath(utils.__file__)))
+    return server
+
+
+def threaded_server():
+    return HoneypotHTTPServer(("127.0.0.1", 0), HoneypotHTTPHandler, max_connections=1024)
+
+
+def get(state):
+    # A new connection is part of the timed request, as a client sees it
+    if "conn" not in state:
+        state["conn"] = http.client.HTTPConnection("127.0.0.1", state["port"], timeout=5)
+    state["conn"].request("GET", "/")
+    response = state["conn"].getresponse()
+    response.read()
+    if response.will_close:
+        state.pop("conn").close()
+
+
+def close(state):
+    if "conn" in state:
+        state["conn"].close()
+
+
+def run(make_server, clients, duration, slow_clients):
+    server = make_server()
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    slow = []
+    for _ in range(slow_clients):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"GET / HT")
+        slow.append(sock)
+
+    result = measure(get, clients, duration, setup=lambda state: state.update(port=port), close=close)
+
+    for sock in slow:
+        sock.close()
+    server.shutdown()
+    server.server_close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--slow-clients", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    # Keep benchmark events out of the real logs
+    bench_log_dir()
+
+    results = {}
+    for name, make_server in (("single-threaded", legacy_server), ("threaded keep-alive", threaded_server)):
+        # Silence the per-request log lines
+        with quiet():
+            results[name] = run(make_server, args.clients, args.duration, args.slow_clients)
+
+    print(f"{args.clients} clients, {args.slow_clients} slow clients, {args.duration:g}s each")
+    print_results(results)
+    if args.json:
+        write_results(args.json, "http", args, results)
+
+
+if __name__ == "__main__":
+    main()
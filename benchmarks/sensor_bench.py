@@ -0,0 +1,183 @@
+"""Load test of the three sensors on localhost: TCP, HTTP and SSH.
+
+Usage: python -m benchmarks.sensor_bench [--sensors tcp,http,ssh] [--concurrency 8]
+                                         [--duration 5] [--json results.json]
+
+Benchmarks (each runs for --duration seconds with --concurrency client threads):
+  tcp           connect, read the banner, send one line, wait for the close
+  http_get      GET / over a kept-alive connection
+  http_login    POST /login with a form over a kept-alive connection
+  ssh_login     new connection, key exchange and one password (brute force)
+  ssh_commands  one shell session per client, latency of each command until
+                the next prompt
+
+The clients run in this process and share the machine with the sensors, so
+compare results from the same host only. Events go to a temporary log
+directory.
+"""
+import argparse
+import http.client
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import bench_log_dir, free_port, measure, print_results, quiet, write_results
+from honeypot.honeypot import Honeypot, HoneypotHTTPHandler, HoneypotHTTPServer
+
+HOST = "127.0.0.1"
+PASSWORDS = ["123456", "password", "admin", "root", "qwerty", "letmein", "toor", "1234"]
+COMMANDS = ["uname -a", "id", "ls -la", "cat /etc/passwd", "ps aux", "whoami", "ifconfig", "uptime"]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def bench_tcp(args):
+    honeypot = Honeypot(host=HOST, port=free_port(), max_tcp_connections=args.concurrency * 4)
+    threading.Thread(target=honeypot.start_tcp_server, daemon=True).start()
+    wait_for_port(honeypot.port)
+    # The probe connection above is timed out by the sensor on its own
+
+    def exchange(state):
+        with socket.create_connection((HOST, honeypot.port), timeout=10) as sock:
+            sock.recv(1024)
+            sock.sendall(b"GET / HTTP/1.0\r\n")
+            while sock.recv(1024):
+                pass
+
+    return {"tcp": measure(exchange, args.concurrency, args.duration)}
+
+
+def bench_http(args):
+    server = HoneypotHTTPServer((HOST, 0), HoneypotHTTPHandler, max_connections=args.concurrency * 4)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = "username=admin&password=admin123"
+
+    def connect(state):
+        state["conn"] = http.client.HTTPConnection(HOST, port, timeout=10)
+
+    def request(state, method, path, payload=None, headers=None):
+        conn = state["conn"]
+        conn.request(method, path, payload, headers or {})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise http.client.HTTPException(f"HTTP {response.status}")
+        if response.will_close:
+            # Reconnect (untimed) before the next request
+            conn.close()
+            state.clear()
+
+    def close(state):
+        if "conn" in state:
+            state["conn"].close()
+
+    results = {
+        "http_get": measure(lambda state: request(state, "GET", "/"),
+                            args.concurrency, args.duration, connect, close),
+        "http_login": measure(lambda state: request(state, "POST", "/login", body,
+                                                    {"Content-Type": "application/x-www-form-urlencoded"}),
+                              args.concurrency, args.duration, connect, close),
+    }
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def bench_ssh(args):
+    import paramiko
+    from honeypot.ssh_honeypot import SSHHoneypot
+
+    ssh = SSHHoneypot(host=HOST, port=free_port(), max_sessions=args.concurrency * 2,
+                      overflow="queue", host_keys=args.ssh_host_keys.split(","))
+    threading.Thread(target=ssh.start, daemon=True).start()
+    wait_for_port(ssh.port)
+    passwords = itertools.cycle(PASSWORDS)
+
+    def login(state):
+        sock = socket.create_connection((HOST, ssh.port), timeout=10)
+        transport = paramiko.Transport(sock)
+        try:
+            transport.start_client(timeout=10)
+            transport.auth_password("root", next(passwords))
+        finally:
+            transport.close()
+
+    prompt = b"root@prod-server:~$ "
+
+    def read_prompt(channel):
+        buffer = b""
+        while not buffer.endswith(prompt):
+            data = channel.recv(65536)
+            if not data:
+                raise EOFError("Session closed")
+            buffer += data
+
+    def open_session(state):
+        client = state["client"] = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(HOST, ssh.port, username="root", password="toor", timeout=10,
+                       look_for_keys=False, allow_agent=False)
+        channel = state["channel"] = client.invoke_shell()
+        channel.settimeout(10)
+        read_prompt(channel)
+        state["commands"] = itertools.cycle(COMMANDS)
+
+    def command(state):
+        state["channel"].sendall(next(state["commands"]).encode() + b"\r")
+        read_prompt(state["channel"])
+
+    def close(state):
+        if "client" in state:
+            state["client"].close()
+
+    results = {"ssh_login": measure(login, args.concurrency, args.duration)}
+    results["ssh_commands"] = measure(command, args.concurrency, args.duration, open_session, close)
+    return results
+
+
+SENSORS = {"tcp": bench_tcp, "http": bench_http, "ssh": bench_ssh}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", default="tcp,http,ssh")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--ssh-host-keys", default="ed25519")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    sensors = [name for name in args.sensors.split(",") if name]
+    unknown = [name for name in sensors if name not in SENSORS]
+    if unknown:
+        parser.error(f"Unknown sensors: {unknown}")
+
+    bench_log_dir()
+    results = {}
+    for name in sensors:
+        with quiet():
+            results.update(SENSORS[name](args))
+
+    print(f"{args.concurrency} clients, {args.duration:g}s per benchmark")
+    print_results(results)
+    if args.json:
+        write_results(args.json, "sensors", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,83 @@ HONEYPOT_HOST = "0.0.0.0"  # Already correct for external access
 HONEYPOT_PORT = 8080
 WEB_APP_HOST = "127.0.0.1"  # Keep this as is for local-only access
 WEB_APP_PORT = 5000
-LOGGING_LEVEL = "INFO"
\ No newline at end of file
+LOGGING_LEVEL = "INFO"
+
+# Background log writer (see honeypot/writer.py)
+LOG_BACKEND = "ndjson"  # ndjson (day files) or sqlite (logs/events.db)
+LOG_FLUSH_INTERVAL = 0.5  # Seconds between group commits
+LOG_BATCH_SIZE = 500  # Commit early once this many events are queued
+LOG_QUEUE_SIZE = 10000  # Maximum number of queued events
+LOG_OVERFLOW = "drop_oldest"  # drop_oldest, block or spill
+LOG_FSYNC = "interval"  # always, interval or never
+
+# Log retention (see honeypot/retention.py)
+LOG_RETENTION_ENABLED = True
+LOG_HOT_DAYS = 7  # Days (today included) kept as plain NDJSON; older days are gzipped
+LOG_RETENTION_DAYS = 90  # Days kept at all; older partitions are deleted (None = keep forever)
+LOG_RETENTION_INTERVAL = 3600  # Seconds between retention passes
+
+# Worker processes per sensor (HTTP/TCP and SSH), sharing each port with
+# SO_REUSEPORT so connections are spread over several cores. 0 runs the
+# sensors as threads in the dashboard process. Workers keep their own
+# metrics: the dashboard's /metrics then has no sensor metrics.
+SENSOR_WORKERS = 0
+
+# Raw TCP sensor (see honeypot/tcp_server.py)
+TCP_BACKLOG = 1024  # Listen backlog
+TCP_MAX_CONNECTIONS = 10000  # Concurrent connections; extra ones are closed after accept
+TCP_READ_TIMEOUT = 30  # Seconds a client gets to send its input
+TCP_IDLE_TIMEOUT = 10  # Seconds of silence before giving up on a client
+TCP_MAX_BUFFER = 4096  # Maximum bytes read per connection
+
+# HTTP sensor (see honeypot/honeypot.py)
+HTTP_MAX_CONNECTIONS = 512  # Concurrent connections (one thread each); extra ones are closed
+HTTP_TIMEOUT = 10  # Seconds a read may wait, including between kept-alive requests
+HTTP_MAX_HEADER_BYTES = 16384  # Request line plus headers
+HTTP_MAX_BODY = 65536  # Largest POST body accepted
+HTTP_KEEPALIVE_REQUESTS = 100  # Requests served per connection
+
+# SSH sensor (see honeypot/ssh_honeypot.py)
+SSH_PORT = 2222  # Non-privileged port to avoid requiring admin privileges
+SSH_MAX_SESSIONS = 100  # Worker threads, i.e. concurrent SSH sessions
+SSH_ACCEPT_QUEUE = 200  # Connections waiting for a free worker
+SSH_OVERFLOW = "reject"  # reject (when all workers are busy) or queue
+SSH_BACKLOG = 128  # Listen backlog
+SSH_HANDSHAKE_TIMEOUT = 15  # Seconds for the banner and key exchange
+SSH_AUTH_TIMEOUT = 20  # Seconds to authenticate and open a shell
+SSH_IDLE_TIMEOUT = 300  # Seconds of inactivity before a session is closed
+SSH_MAX_LINE = 4096  # Characters kept per shell input line; the rest is dropped
+# Host key types offered, most preferred first: ed25519, ecdsa, rsa. RSA
+# signatures cost far more CPU per handshake but some old scanners need them.
+SSH_HOST_KEYS = ["ed25519", "ecdsa", "rsa"]
+# Key exchange algorithms offered, most preferred first (None = paramiko defaults)
+SSH_KEX = [
+    "curve25519-sha256@libssh.org",
+    "ecdh-sha2-nistp256",
+    "ecdh-sha2-nistp384",
+    "ecdh-sha2-nistp521",
+    "diffie-hellman-group14-sha256",
+    "diffie-hellman-group16-sha512",
+    "diffie-hellman-group-exchange-sha256",
+]
+# Tarpit: drip all SSH output slowly to waste attackers' time
+SSH_TARPIT = False
+SSH_TARPIT_CHUNK = 16  # Bytes per write
+SSH_TARPIT_INTERVAL = 1.0  # Seconds between writes
+SSH_TARPIT_SESSION_BUDGET = 120  # Seconds of delay one session may use
+SSH_TARPIT_GLOBAL_BUDGET = 10000  # Delayed writes pending across all sessions
+# Record what attackers type and see in SSH shells (logs/tty, replayed by /api/sessions/<id>/tty)
+SSH_TTY_RECORDING = False
+SSH_TTY_COMPRESS = True  # Gzip each recording when its session ends
+SSH_TTY_MAX_BYTES = 10 * 1024 * 1024  # Bytes recorded per session; the rest is not recorded
+
+# Admission control shared by all listeners (see honeypot/admission.py)
+ADMISSION_ENABLED = True
+ADMISSION_RATE = 2  # Connections per second allowed per source IP
+ADMISSION_BURST = 20  # Burst allowed per source IP
+ADMISSION_SUBNET_RATE = 20  # Connections per second allowed per /24 (IPv6: /64)
+ADMISSION_SUBNET_BURST = 100  # Burst allowed per /24
+ADMISSION_MAX_ENTRIES = 100000  # Sources tracked; least recently seen are evicted
+ADMISSION_ACTION = "reject"  # reject (reset) or tarpit (hold open, unread)
+ADMISSION_TARPIT_SECONDS = 30  # How long a tarpitted connection is held
+ADMISSION_MAX_TARPIT = 1000  # Connections held at once; extra ones are reset
@@ -0,0 +1,205 @@
+import ipaddress
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+
+try:
+    from .metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+
+def subnet_of(ip):
+    """Return the /24 (IPv4) or /64 (IPv6) network a source address belongs to."""
+    if ":" not in ip or "." in ip:
+        # IPv4, including IPv4-mapped IPv6 such as ::ffff:1.2.3.4
+        return ip.rpartition(".")[0] + ".0/24"
+    try:
+        return str(ipaddress.ip_network(f"{ip}/64", strict=False))
+    except ValueError:
+        return ip
+
+
+class TokenBuckets:
+    """Token buckets keyed by source, kept in a bounded LRU table.
+
+    Each entry is just [tokens, last refill time]. An entry that has been
+    idle long enough to refill completely is the same as a missing one, so
+    such entries are expired from the cold end of the table, and when the
+    table is full the least recently seen source is evicted. Memory stays at
+    ``max_entries`` entries even when the sources are spoofed.
+    """
+
+    def __init__(self, rate, burst, max_entries=100000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_entries = max_entries
+        # Seconds after which an idle bucket is full again
+        self.ttl = self.burst / self.rate if self.rate > 0 else float("inf")
+        self._table = OrderedDict()
+
+        # Counters
+        self.evicted = 0
+
+    def tokens(self, key, now):
+        """Return the entry for key with its tokens refilled up to now."""
+        entry = self._table.get(key)
+        if entry is None:
+            self._expire(now)
+            if len(self._table) >= self.max_entries:
+                self._table.popitem(last=False)
+                self.evicted += 1
+            entry = self._table[key] = [self.burst, now]
+        else:
+            entry[0] = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+            entry[1] = now
+            self._table.move_to_end(key)
+        return entry
+
+    def _expire(self, now):
+        cutoff = now - self.ttl
+        while self._table:
+            key, entry = next(iter(self._table.items()))
+            if entry[1] > cutoff:
+                break
+            del self._table[key]
+
+    def __len__(self):
+        return len(self._table)
+
+
+class Tarpit:
+    """Holds refused sockets open, unread, until a deadline, then closes them.
+
+    A single thread closes expired sockets; at most ``max_held`` sockets are
+    held and anything beyond that is closed immediately.
+    """
+
+    def __init__(self, hold_seconds=30, max_held=1000):
+        self.hold_seconds = hold_seconds
+        self.max_held = max_held
+        self._held = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def hold(self, sock):
+        """Take ownership of sock; returns False (and closes it) when full."""
+        with self._cond:
+            if len(self._held) >= self.max_held:
+                close_now(sock)
+                return False
+            self._held.append((time.monotonic() + self.hold_seconds, sock))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tarpit", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._held:
+                    self._cond.wait()
+                deadline, sock = self._held[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._held.popleft()
+            close_now(sock)
+
+    def __len__(self):
+        return len(self._held)
+
+
+def close_now(sock):
+    """Close a socket with a RST so it does not linger in TIME_WAIT."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+    sock.close()
+
+
+class AdmissionControl:
+    """Connection admission shared by the SSH, HTTP and TCP listeners.
+
+    Every accepted connection costs one token from the bucket of its source
+    IP and one from the bucket of its /24 (or /64 for IPv6), so a single
+    noisy host and a noisy neighbourhood are both limited. Refused
+    connections are handled right after accept(), before any protocol work:
+    action="reject" resets them, action="tarpit" holds them open without
+    reading so the client wastes its own time.
+    """
+
+    def __init__(self, rate=2, burst=20, subnet_rate=20, subnet_burst=100,
+                 max_entries=100000, action="reject", tarpit_seconds=30, max_tarpit=1000):
+        if action not in ("reject", "tarpit"):
+            raise ValueError(f"Unknown admission action: {action}")
+        self.action = action
+        self.ips = TokenBuckets(rate, burst, max_entries)
+        self.subnets = TokenBuckets(subnet_rate, subnet_burst, max_entries)
+        self.tarpit = Tarpit(tarpit_seconds, max_tarpit)
+        self._lock = threading.Lock()
+        REGISTRY.register_stats("honeypot_admission", self.stats,
+                                counters=("admitted", "rejected", "tarpitted", "evicted"))
+
+        # Counters
+        self.admitted = 0
+        self.rejected = 0
+        self.tarpitted = 0
+
+    def allow(self, ip):
+        """Take a token for ip and its subnet; False when either bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            ip_bucket = self.ips.tokens(ip, now)
+            subnet_bucket = self.subnets.tokens(subnet_of(ip), now)
+            if ip_bucket[0] < 1 or subnet_bucket[0] < 1:
+                return False
+            ip_bucket[0] -= 1
+            subnet_bucket[0] -= 1
+            self.admitted += 1
+            return True
+
+    def admit(self, sock, addr):
+        """Check an accepted socket. Returns True if it may be served.
+
+        On False the socket has been taken care of (reset or tarpitted) and
+        the caller must not use it again.
+        """
+        if self.allow(addr[0]):
+            return True
+        tarpitted = False
+        if self.action == "tarpit":
+            # Detach so the listener's own cleanup cannot close the held socket
+            held = socket.socket(sock.family, sock.type, sock.proto, sock.detach())
+            tarpitted = self.tarpit.hold(held)
+        else:
+            close_now(sock)
+        self.refused(addr, tarpitted)
+        return False
+
+    def refused(self, addr, tarpitted=False):
+        """Count a refused connection (listeners that refuse on their own call this too)."""
+        with self._lock:
+            if tarpitted:
+                self.tarpitted += 1
+            else:
+                self.rejected += 1
+        logging.debug(f"Connection from {addr[0]} refused by admission control")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "tarpitted": self.tarpitted,
+                "held": len(self.tarpit),
+                "tracked_ips": len(self.ips),
+                "tracked_subnets": len(self.subnets),
+                "evicted": self.ips.evicted + self.subnets.evicted,
+            }
@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+# Content types by extension (anything else goes through mimetypes)
+CONTENT_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "text/javascript",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+# Types worth compressing, and the smallest body worth it
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_GZIP_SIZE = 256
+
+
+class Asset:
+    """One file held in memory with everything needed to answer a request for it."""
+
+    def __init__(self, path, body, mtime, cache_control):
+        self.path = path
+        self.body = body
+        self.mtime = mtime
+        _, ext = os.path.splitext(path)
+        self.content_type = CONTENT_TYPES.get(ext.lower()) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        self.last_modified = formatdate(int(mtime), usegmt=True)
+
+        self.gzip_body = None
+        if self.content_type.startswith(COMPRESSIBLE) and len(body) >= MIN_GZIP_SIZE:
+            compressed = gzip.compress(body, 9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+
+        # Response headers, built once per variant
+        common = [
+            ("Content-type", self.content_type),
+            ("Last-Modified", self.last_modified),
+            ("Cache-Control", cache_control),
+        ]
+        if self.gzip_body is not None:
+            common.append(("Vary", "Accept-Encoding"))
+        self.headers = {
+            False: common + [("ETag", self.etag), ("Content-Length", str(len(body)))],
+            True: None,
+        }
+        if self.gzip_body is not None:
+            self.headers[True] = common + [
+                ("ETag", self.etag[:-1] + '-gz"'),
+                ("Content-Encoding", "gzip"),
+                ("Content-Length", str(len(self.gzip_body))),
+            ]
+
+    def variant(self, accept_encoding):
+        """Return (headers, body) for a request's Accept-Encoding header."""
+        if self.gzip_body is not None and "gzip" in (accept_encoding or ""):
+            return self.headers[True], self.gzip_body
+        return self.headers[False], self.body
+
+    def not_modified(self, if_none_match, if_modified_since):
+        """True if the client's cached copy (per its conditional headers) is current."""
+        if if_none_match:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags or self.etag[:-1] + '-gz"' in tags
+        if if_modified_since:
+            try:
+                return int(self.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, OverflowError):
+                return False
+        return False
+
+
+class AssetCache:
+    """The honeypot's web assets, read into memory once and served from there.
+
+    Only the files found at load time are servable (``routes`` plus every
+    file under ``static_dir``, by URL path), so request paths are looked up
+    in a dict and never joined onto the filesystem. The table is replaced
+    as a whole, never modified, so readers need no lock. Every
+    ``check_interval`` seconds a request triggers a rescan that reloads
+    changed files and picks up added or removed ones.
+    """
+
+    def __init__(self, root, routes=None, static_dir="static", check_interval=2.0,
+                 cache_control="max-age=300"):
+        self.root = os.path.abspath(root)
+        self.routes = routes or {
+            "/": "honeypot.html",
+            "/index.html": "honeypot.html",
+            "/honeypot.html": "honeypot.html",
+        }
+        self.static_dir = static_dir
+        self.check_interval = check_interval
+        self.cache_control = cache_control
+        self._assets = {}
+        self._next_check = 0
+        self._reload_lock = threading.Lock()
+
+        # Counters
+        self.reloads = 0
+        self.load()
+
+    def _files(self):
+        """Map URL paths to the files that should be served for them."""
+        files = {url: os.path.join(self.root, name) for url, name in self.routes.items()}
+        static_root = os.path.join(self.root, self.static_dir)
+        for dirpath, _, filenames in os.walk(static_root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                rel = os.path.relpath(path, static_root).replace(os.sep, "/")
+                files[f"/{self.static_dir}/{rel}"] = path
+        return files
+
+    def load(self):
+        """(Re)build the table, re-reading only files whose mtime or size changed."""
+        old = self._assets
+        assets = {}
+        loaded = {}
+        for url, path in self._files().items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            previous = old.get(url)
+            if previous is not None and previous.path == path and previous.mtime == st.st_mtime and len(previous.body) == st.st_size:
+                assets[url] = previous
+                continue
+            if path not in loaded:
+                # Several URLs may share a file (/ and /index.html)
+                try:
+                    with open(path, "rb") as f:
+                        loaded[path] = Asset(path, f.read(), st.st_mtime, self.cache_control)
+                except OSError:
+                    continue
+            assets[url] = loaded[path]
+        self._assets = assets
+        self._next_check = time.monotonic() + self.check_interval
+        self.reloads += 1
+
+    def get(self, url_path):
+        """Return the Asset for a URL path (without query string), or None."""
+        if time.monotonic() >= self._next_check and self._reload_lock.acquire(blocking=False):
+            try:
+                self.load()
+            finally:
+                self._reload_lock.release()
+        return self._assets.get(url_path)
+
+    def stats(self):
+        assets = self._assets
+        return {
+            "assets": len(assets),
+            "bytes": sum(len(a.body) + len(a.gzip_body or b"") for a in set(assets.values())),
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,324 @@
+import gzip
+import json
+import os
+import base64
+import logging
+import re
+import secrets
+from datetime import datetime, date, timedelta
+
+# Day partitions are stored as line-delimited JSON: one event per line
+LOG_SUFFIX = ".jsonl"
+LEGACY_SUFFIX = ".json"
+# Closed day partitions compressed by the retention job (honeypot/retention.py)
+ARCHIVE_SUFFIX = LOG_SUFFIX + ".gz"
+
+# Days after its start in which the events of a session are looked for
+SESSION_MAX_DAYS = 2
+SESSION_ID_PATTERN = re.compile(r"\d{8}-\d{6}-[0-9a-f]{8}")
+
+
+def day_file(log_dir, when=None, name=""):
+    """Return the path of the day partition for the given datetime (default: now).
+
+    ``name`` tells apart partitions written by different sources for the same
+    day, e.g. name=".api" gives "YYYY-MM-DD.api.jsonl".
+    """
+    when = when or datetime.now()
+    return os.path.join(log_dir, f"{when.strftime('%Y-%m-%d')}{name}{LOG_SUFFIX}")
+
+
+def timestamp_key(entry):
+    """Return a sortable form of an event's timestamp.
+
+    The sensors write "YYYY-MM-DD HH:MM:SS" while HoneypotLogger writes ISO 8601
+    ("YYYY-MM-DDTHH:MM:SS.ffffff"); normalizing the separator makes both order
+    correctly against each other.
+    """
+    return str(entry.get("timestamp", "")).replace("T", " ")
+
+
+def normalize_time(value):
+    """Normalize a user-supplied time bound (e.g. from datetime-local) like timestamp_key."""
+    return value.replace("T", " ") if value else None
+
+
+# Latest possible value of each position of a timestamp
+_END_OF = "9999-12-31 23:59:59.999999"
+
+
+def normalize_end(value):
+    """Normalize an inclusive upper time bound so it covers all of its last unit.
+
+    datetime-local gives minutes ("2024-01-31T12:17"), so the bound is padded
+    to "2024-01-31 12:17:59.999999"; a date alone covers the whole day.
+    """
+    value = normalize_time(value)
+    if value and len(value) < len(_END_OF):
+        value += _END_OF[len(value):]
+    return value
+
+
+def new_session_id(when=None):
+    """Return a new session ID: the start time (YYYYMMDD-HHMMSS) and 8 random hex digits.
+
+    IDs sort by start time, and the start time tells which day partitions
+    hold the session's events.
+    """
+    when = when or datetime.now()
+    return f"{when.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+
+
+def session_range(session_id):
+    """Return the (start, end) time range holding a session's events. Raises ValueError for a malformed ID."""
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        raise ValueError(f"Invalid session ID: {session_id}")
+    try:
+        start = datetime.strptime(session_id[:15], "%Y%m%d-%H%M%S")
+    except ValueError as e:
+        raise ValueError(f"Invalid session ID: {session_id}") from e
+    end = start + timedelta(days=SESSION_MAX_DAYS)
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def event_matches(entry, filters):
+    """Return True if an event matches the given filters.
+
+    ``filters`` may contain ``types`` (a list of event types), ``ip``,
+    ``username``, ``protocol``, ``session`` and an inclusive ``start``/``end``
+    time range. Missing or empty filters match everything.
+    """
+    types = filters.get("types")
+    if types and entry.get("type", "access") not in types:
+        return False
+    for field in ("ip", "username", "protocol", "session"):
+        value = filters.get(field)
+        if value and entry.get(field) != value:
+            return False
+    start = filters.get("start")
+    end = filters.get("end")
+    if start or end:
+        key = timestamp_key(entry)
+        if start and key < normalize_time(start):
+            return False
+        if end and key > normalize_end(end):
+            return False
+    return True
+
+
+def encode_cursor(key):
+    """Encode a pagination position (timestamp plus tiebreaker values) as an opaque string."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed.
+
+    A cursor is a timestamp followed by string or integer tiebreakers.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list) or not key or not isinstance(key[0], str) or not all(
+        isinstance(value, (str, int)) and not isinstance(value, bool) for value in key
+    ):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def file_day(path):
+    """Return the date of a day partition (plain or archived), or None for other log files."""
+    name = os.path.basename(path)
+    if not name.endswith((LOG_SUFFIX, ARCHIVE_SUFFIX)) or name[10:11] != ".":
+        return None
+    try:
+        return date.fromisoformat(name[:10])
+    except ValueError:
+        return None
+
+
+def is_archived(path):
+    """Return True for a compressed (archived) partition."""
+    return path.endswith(ARCHIVE_SUFFIX)
+
+
+def file_may_match(path, start=None, end=None):
+    """Return False if a day partition cannot hold events in the [start, end] range.
+
+    A day file is named after the time the event was queued, so it may also
+    hold a few events stamped just before midnight of the previous day.
+    """
+    day = file_day(path)
+    if day is None:
+        return True
+    if start and day.isoformat() < normalize_time(start)[:10]:
+        return False
+    if end and (day - timedelta(days=1)).isoformat() > normalize_time(end)[:10]:
+        return False
+    return True
+
+
+def encode_event(entry):
+    """Serialize an event to a single NDJSON line (as bytes)."""
+    return (json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def append_events(path, entries):
+    """Append events to an NDJSON file with a single write.
+
+    The file is opened in append mode, so the cost of a write does not depend on
+    how many events are already stored in it. If a previous write was torn by a
+    crash, the partial record is closed off so it only costs that one event.
+    """
+    if not entries:
+        return
+    data = b"".join(encode_event(entry) for entry in entries)
+    with open(path, "ab+") as f:
+        if needs_newline(f):
+            # Terminate a torn record so the new events start on a fresh line
+            data = b"\n" + data
+        f.write(data)
+
+
+def needs_newline(f):
+    """Return True if the file opened in f ends with an unterminated line."""
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return False
+    f.seek(end - 1)
+    last = f.read(1)
+    f.seek(end)
+    return last != b"\n"
+
+
+def parse_lines(data):
+    """Parse a chunk of complete NDJSON lines (bytes), skipping blank or corrupted lines."""
+    events = []
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            logging.warning(f"Skipping corrupted log line: {line[:80]!r}")
+    return events
+
+
+def read_events(path):
+    """Yield the events stored in an NDJSON file, plain or gzip-compressed.
+
+    A torn last line (a write interrupted by a crash) has no trailing newline
+    and is ignored, as are lines that fail to parse. Archives are decompressed
+    while reading, never as a whole.
+    """
+    try:
+        f = gzip.open(path, "rb") if is_archived(path) else open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Incomplete trailing record
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping corrupted log line in {path}")
+        except (EOFError, gzip.BadGzipFile) as e:
+            logging.warning(f"Archive {path} is damaged, stopped reading it: {e}")
+
+
+def list_log_files(log_dir, archived=False):
+    """Return the NDJSON log files in log_dir, sorted by name (oldest day first).
+
+    Compressed partitions are only included with archived=True. A day can
+    have both: events appended after it was archived go to a new plain file
+    until the next retention pass merges it into the archive.
+    """
+    try:
+        names = set(os.listdir(log_dir))
+    except FileNotFoundError:
+        return []
+    paths = [os.path.join(log_dir, name) for name in names if name.endswith(LOG_SUFFIX)]
+    if archived:
+        paths.extend(os.path.join(log_dir, name) for name in names if name.endswith(ARCHIVE_SUFFIX))
+    return sorted(paths)
+
+
+def iter_events(log_dir, archived=True):
+    """Yield every event stored in log_dir (including archived days by default)."""
+    for path in list_log_files(log_dir, archived):
+        yield from read_events(path)
+
+
+def iter_range(log_dir, filters):
+    """Yield the events matching filters, oldest day first, one line at a time.
+
+    Only the partitions (plain or archived) that can overlap the filters'
+    start/end range are opened, and nothing is held in memory beyond the
+    current line. Within a day, events come in the order they were stored.
+    """
+    start = filters.get("start")
+    end = filters.get("end")
+    for path in list_log_files(log_dir, archived=True):
+        if not file_may_match(path, start, end):
+            continue
+        for entry in read_events(path):
+            if event_matches(entry, filters):
+                yield entry
+
+
+def read_all_events(log_dir):
+    """Return every event stored in log_dir as a list."""
+    return list(iter_events(log_dir))
+
+
+def migrate_json_logs(log_dir):
+    """Convert legacy JSON-array log files in log_dir to NDJSON.
+
+    Each ``name.json`` is appended to ``name.jsonl`` and then removed, so running
+    the migration twice is harmless. Returns the number of migrated events.
+    """
+    migrated = 0
+    try:
+        names = sorted(os.listdir(log_dir))
+    except FileNotFoundError:
+        return 0
+
+    for name in names:
+        if not name.endswith(LEGACY_SUFFIX):
+            continue
+        legacy_path = os.path.join(log_dir, name)
+        try:
+            with open(legacy_path, "r") as f:
+                logs = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            logging.error(f"Cannot migrate corrupted log file: {legacy_path}")
+            continue
+        if not isinstance(logs, list):
+            logs = [logs]
+
+        target = legacy_path[:-len(LEGACY_SUFFIX)] + LOG_SUFFIX
+        append_events(target, logs)
+        os.remove(legacy_path)
+        migrated += len(logs)
+        logging.info(f"Migrated {len(logs)} events from {legacy_path} to {target}")
+
+    return migrated
+
+
+if __name__ == "__main__":
+    import sys
+
+    try:
+        from .utils import LOG_DIR
+    except ImportError:
+        from utils import LOG_DIR
+
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else LOG_DIR
+    count = migrate_json_logs(target_dir)
+    print(f"Migrated {count} events in {target_dir}")
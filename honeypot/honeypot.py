@@ -1,82 +1,161 @@
-import socket
 import threading
 import logging
 import os
+import sys
 from datetime import datetime
 from http.server import HTTPServer, SimpleHTTPRequestHandler
-# Change this line
-from .utils import save_log  # Changed from 'from utils import save_log'
+from socketserver import ThreadingMixIn
+from urllib.parse import unquote, urlsplit
 
-# To this
 try:
     from .utils import save_log
+    from .tcp_server import AsyncTCPHoneypot
+    from .assets import AssetCache
+    from .metrics import REGISTRY, CONNECTIONS, AUTH_ATTEMPTS, ACTIVE_SESSIONS
 except ImportError:
     from utils import save_log
+    from tcp_server import AsyncTCPHoneypot
+    from assets import AssetCache
+    from metrics import REGISTRY, CONNECTIONS, AUTH_ATTEMPTS, ACTIVE_SESSIONS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
+class HeaderLimitedReader:
+    """Wraps a connection's rfile so one request's header lines can't exceed a byte budget.
+    
+    readline() (used for the request line and headers) draws from the budget
+    and returns b"" once it is spent; read() (used for bodies) is unlimited.
+    """
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.left = 0
+        self.exceeded = False
+    
+    def reset(self, limit):
+        self.left = limit
+        self.exceeded = False
+    
+    def readline(self, size=-1):
+        if self.left <= 0:
+            self.exceeded = True
+            return b""
+        size = self.left if size < 0 else min(size, self.left)
+        line = self.raw.readline(size)
+        self.left -= len(line)
+        if self.left <= 0 and not line.endswith(b"\n"):
+            self.exceeded = True
+        return line
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
 class HoneypotHTTPHandler(SimpleHTTPRequestHandler):
+    # Keep-alive: every response must carry a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Buffer the response so headers and body leave in one write (flushed
+    # after each request), and don't let Nagle delay it on a kept-alive socket
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        self.timeout = self.server.request_timeout
+        super().setup()
+        self.rfile = HeaderLimitedReader(self.rfile)
+        self.requests_handled = 0
+    
+    def log_message(self, format, *args):
+        # Every request is already logged as an event; don't also write it to stderr
+        logging.debug("%s - %s", self.client_address[0], format % args)
+    
+    def handle_one_request(self):
+        self.rfile.reset(self.server.max_header_bytes)
+        super().handle_one_request()
+        self.requests_handled += 1
+        if self.requests_handled >= self.server.max_keepalive_requests:
+            self.close_connection = True
+    
+    def end_headers(self):
+        # Tell the client when this is the last request on the connection
+        if not self.close_connection and self.requests_handled + 1 >= self.server.max_keepalive_requests:
+            self.send_header('Connection', 'close')
+        super().end_headers()
+    
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        if self.rfile.exceeded:
+            self.send_error(431, "Request header fields too large")
+            return False
+        return True
+    
+    def send_body(self, status, content_type, body, head=False):
+        """Send a complete response with a Content-Length."""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
     def do_GET(self):
-        if self.path == '/' or self.path == '/index.html':
-            # Update path to point to the honeypot.html in the same directory
-            self.path = '/honeypot.html'
+        self.send_asset()
+    
+    def do_HEAD(self):
+        self.send_asset(head=True)
+    
+    def send_asset(self, head=False):
+        """Answer from the in-memory asset cache (see assets.py)."""
+        url_path = unquote(urlsplit(self.path).path)
+        asset = self.server.assets.get(url_path)
+        if asset is None:
+            self.send_body(404, 'text/html', b'File not found', head=head)
+            logging.debug("File not found: %s", self.path)
+            return
         
-        try:
-            # Get the file extension
-            _, ext = os.path.splitext(self.path)
-            
-            # Set the appropriate content type based on file extension
-            content_type = 'text/html'
-            if ext == '.css':
-                content_type = 'text/css'
-            elif ext == '.js':
-                content_type = 'text/javascript'
-            elif ext == '.png':
-                content_type = 'image/png'
-            elif ext == '.jpg' or ext == '.jpeg':
-                content_type = 'image/jpeg'
-            
-            # Try to serve the file from the current directory
-            current_dir = os.path.dirname(__file__)
-            
-            # Improved static file handling
-            if self.path.startswith('/static/'):
-                # For static files, look in the static subdirectory
-                static_dir = os.path.join(current_dir, 'static')
-                # Get the part of the path after /static/
-                file_name = self.path[8:]  # Remove '/static/' prefix
-                file_path = os.path.join(static_dir, file_name)
-            else:
-                # For other files, look directly in the current directory
-                file_path = os.path.join(current_dir, self.path[1:])
-                
-            file_to_open = open(file_path, 'rb')
-            self.send_response(200)
-            self.send_header('Content-type', content_type)
+        headers, body = asset.variant(self.headers.get('Accept-Encoding'))
+        if asset.not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')):
+            self.send_response(304)
+            for name, value in headers:
+                if name not in ('Content-Length', 'Content-type', 'Content-Encoding'):
+                    self.send_header(name, value)
             self.end_headers()
-            self.wfile.write(file_to_open.read())
-            file_to_open.close()
-            
-            # Log the access
-            log_entry = {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "ip": self.client_address[0],
-                "port": self.client_address[1],
-                "data": f"HTTP GET {self.path}"
-            }
-            save_log(log_entry)
-            
-        except FileNotFoundError:
-            self.send_response(404)
-            self.send_header('Content-type', 'text/html')
+        else:
+            self.send_response(200)
+            for name, value in headers:
+                self.send_header(name, value)
             self.end_headers()
-            self.wfile.write(b'File not found')
-            logging.error(f"File not found: {self.path}")
+            if not head:
+                # Goes out with the headers in one write when the buffer is flushed
+                self.wfile.write(body)
+        
+        # Log the access
+        log_entry = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ip": self.client_address[0],
+            "port": self.client_address[1],
+            "data": f"HTTP {self.command} {self.path}"
+        }
+        save_log(log_entry)
     
     def do_POST(self):
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length).decode('utf-8')
+        if 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+            self.send_error(411, "Chunked requests are not supported")
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.close_connection = True
+            self.send_error(411)
+            return
+        if content_length < 0 or content_length > self.server.max_body:
+            # The body is not read, so the connection can't be reused
+            self.close_connection = True
+            self.send_error(413)
+            return
+        post_data = self.rfile.read(content_length).decode('utf-8', errors='replace')
         
         # Parse the form data
         form_data = {}
@@ -99,19 +178,118 @@ class HoneypotHTTPHandler(SimpleHTTPRequestHandler):
         
         # Log the attempt
         save_log(log_entry)
-        logging.info(f"Login attempt from {self.client_address[0]}: username='{form_data.get('username', '')}', password='{form_data.get('password', '')}'")
+        AUTH_ATTEMPTS.inc(sensor="http")
+        logging.debug("Login attempt from %s: username=%r, password=%r",
+                      self.client_address[0], form_data.get('username', ''), form_data.get('password', ''))
         
         # Send a response
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(b'Login attempt recorded')
+        self.send_body(200, 'text/html', b'Login attempt recorded')
+
+class HoneypotHTTPServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP sensor with a connection limit.
+    
+    Each connection gets its own thread, so a slow client no longer blocks
+    the others. Pages and static files are served from an AssetCache. Admission control runs right after accept(); connections
+    beyond max_connections are closed at once. Per connection, reads time
+    out after request_timeout seconds and at most max_keepalive_requests
+    requests are served; request headers are limited to max_header_bytes
+    and POST bodies to max_body bytes. reuse_port=True lets several worker
+    processes listen on the same port (see supervisor.py).
+    """
+    
+    daemon_threads = True
+    admission = None
+    
+    def __init__(self, server_address, handler_class, max_connections=512, request_timeout=10,
+                 max_header_bytes=16384, max_body=65536, max_keepalive_requests=100, backlog=128,
+                 assets=None, reuse_port=False):
+        self.request_queue_size = backlog
+        self.allow_reuse_port = reuse_port
+        self.assets = assets or AssetCache(os.path.dirname(os.path.abspath(__file__)))
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.max_header_bytes = max_header_bytes
+        self.max_body = max_body
+        self.max_keepalive_requests = max_keepalive_requests
+        self._active_lock = threading.Lock()
+        
+        # Counters
+        self.active = 0
+        self.accepted = 0
+        self.rejected = 0
+        super().__init__(server_address, handler_class)
+        REGISTRY.register_stats("honeypot_http", self.stats, counters=("accepted", "rejected"))
+        REGISTRY.register_stats("honeypot_http_assets", self.assets.stats, counters=("reloads",))
+        ACTIVE_SESSIONS.set_function(lambda: self.active, sensor="http")
+    
+    def verify_request(self, request, client_address):
+        if self.admission is not None and not self.admission.admit(request, client_address):
+            CONNECTIONS.inc(sensor="http", result="refused")
+            return False
+        with self._active_lock:
+            if self.active >= self.max_connections:
+                self.rejected += 1
+                CONNECTIONS.inc(sensor="http", result="rejected")
+                return False
+            self.active += 1
+            self.accepted += 1
+        CONNECTIONS.inc(sensor="http", result="accepted")
+        return True
+    
+    def handle_error(self, request, client_address):
+        # Scanners reset connections all the time; that's not worth a traceback
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            return
+        super().handle_error(request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._active_lock:
+                self.active -= 1
+    
+    def stats(self):
+        with self._active_lock:
+            return {
+                "active": self.active,
+                "max_connections": self.max_connections,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+            }
 
 class Honeypot:
-    def __init__(self, host="0.0.0.0", port=8080, http_port=80):
+    def __init__(self, host="0.0.0.0", port=8080, http_port=80, tcp_backlog=1024,
+                 max_tcp_connections=10000, tcp_read_timeout=30, tcp_idle_timeout=10,
+                 tcp_max_buffer=4096, admission=None, http_max_connections=512, http_timeout=10,
+                 http_max_header_bytes=16384, http_max_body=65536, http_keepalive_requests=100,
+                 reuse_port=False):
         self.host = host
         self.port = port
         self.http_port = http_port
+        self.admission = admission
+        self.http_settings = {
+            "max_connections": http_max_connections,
+            "request_timeout": http_timeout,
+            "max_header_bytes": http_max_header_bytes,
+            "max_body": http_max_body,
+            "max_keepalive_requests": http_keepalive_requests,
+            "reuse_port": reuse_port,
+        }
+        self.http_server = None
+        
+        # Raw TCP sensor (asyncio, see tcp_server.py)
+        self.tcp_server = AsyncTCPHoneypot(
+            host=host,
+            port=port,
+            backlog=tcp_backlog,
+            max_connections=max_tcp_connections,
+            read_timeout=tcp_read_timeout,
+            idle_timeout=tcp_idle_timeout,
+            max_buffer=tcp_max_buffer,
+            admission=admission,
+            reuse_port=reuse_port,
+        )
 
     def start(self):
         # Start the TCP socket server in a separate thread
@@ -123,41 +301,15 @@ class Honeypot:
         self.start_http_server()
     
     def start_tcp_server(self):
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self.host, self.port))
-        server.listen(5)
-        logging.info(f"TCP Honeypot listening on {self.host}:{self.port}")
-        
-        while True:
-            client, addr = server.accept()
-            logging.info(f"TCP Connection from {addr}")
-            threading.Thread(target=self.handle_client, args=(client, addr)).start()
+        # One event loop serves every TCP connection (no thread per client)
+        self.tcp_server.serve_forever()
 
     def start_http_server(self):
-        http_server = HTTPServer((self.host, self.http_port), HoneypotHTTPHandler)
+        self.http_server = HoneypotHTTPServer((self.host, self.http_port), HoneypotHTTPHandler,
+                                              **self.http_settings)
+        self.http_server.admission = self.admission
         logging.info(f"HTTP Honeypot listening on {self.host}:{self.http_port}")
-        http_server.serve_forever()
-
-    def handle_client(self, client, addr):
-        try:
-            # Simulate a service response
-            client.send(b"Welcome to the service!\n")
-            data = client.recv(1024).decode('utf-8')
-            logging.info(f"Received data from {addr}: {data}")
-
-            # Log the interaction
-            log_entry = {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "ip": addr[0],
-                "port": addr[1],
-                "data": data
-            }
-            save_log(log_entry)
-
-            # Close the connection
-            client.close()
-        except Exception as e:
-            logging.error(f"Error handling client {addr}: {e}")
+        self.http_server.serve_forever()
 
 if __name__ == "__main__":
     # Changed HTTP port to 8081
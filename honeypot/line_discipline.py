@@ -0,0 +1,99 @@
+import codecs
+import re
+
+# Runs of printable text, complete escape sequences, or single control characters
+TOKENS = re.compile(r"[^\x00-\x1f\x7f]+|\x1b\[[0-9;?]*[ -/]*[@-~]|\x1bO.|\x1b[^\[O]|[\x00-\x1f\x7f]", re.S)
+ESCAPE = re.compile(r"\x1b(?:\[[0-9;?]*[ -/]*[@-~]|O.|[^\[O])", re.S)
+
+# Longest incomplete escape sequence kept for the next read
+MAX_PENDING_ESCAPE = 32
+
+# Returned instead of a line when the user pressed Ctrl+C
+INTERRUPT = object()
+
+
+class LineDiscipline:
+    """Cooked-mode terminal input for the fake shell.
+
+    feed() takes a whole received chunk and returns what to echo and which
+    lines were completed, so a pasted script costs one echo write per
+    chunk instead of one per character. Printable text is handled a run at
+    a time and the current line is kept as a list of pieces (no quadratic
+    string building). UTF-8 characters and escape sequences split across
+    reads are completed on the next read; arrow keys and other escape
+    sequences are swallowed. Input beyond ``max_line`` characters is dropped
+    until the line ends.
+    """
+
+    def __init__(self, max_line=4096):
+        self.max_line = max_line
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pieces = []
+        self._length = 0
+        self._pending = ""
+        self._after_cr = False
+
+        # Counters
+        self.truncated = 0
+
+    def feed(self, data):
+        """Process a received chunk.
+
+        Returns a list of (echo, line) pairs in input order. echo is the text
+        to send back before handling line; line is a completed input line,
+        INTERRUPT for Ctrl+C, or None for text that did not end a line (only
+        ever the last pair).
+        """
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ""
+        start = text.rfind("\x1b")
+        if start != -1 and len(text) - start <= MAX_PENDING_ESCAPE and not ESCAPE.match(text, start):
+            # Incomplete escape sequence: wait for the rest of it
+            self._pending = text[start:]
+            text = text[:start]
+
+        results = []
+        echo = []
+        for token in TOKENS.findall(text):
+            char = token[0]
+            after_cr = self._after_cr
+            self._after_cr = False
+            if char >= " " and char != "\x7f":
+                room = self.max_line - self._length
+                if len(token) > room:
+                    self.truncated += 1
+                    token = token[:room]
+                if token:
+                    self._pieces.append(token)
+                    self._length += len(token)
+                    echo.append(token)
+            elif char == "\r" or char == "\n":
+                if char == "\n" and after_cr:
+                    # \r\n is one line end
+                    continue
+                self._after_cr = char == "\r"
+                echo.append("\r\n")
+                results.append(("".join(echo), "".join(self._pieces)))
+                echo = []
+                self._clear()
+            elif char == "\x03":  # Ctrl+C
+                echo.append("^C\r\n")
+                results.append(("".join(echo), INTERRUPT))
+                echo = []
+                self._clear()
+            elif char == "\x7f" or char == "\x08":  # Backspace
+                if self._pieces:
+                    last = self._pieces.pop()
+                    if len(last) > 1:
+                        self._pieces.append(last[:-1])
+                    self._length -= 1
+                    echo.append("\b \b")  # Move back, erase, move back
+            # Anything else (escape sequences, other control keys) is ignored
+
+        if echo:
+            results.append(("".join(echo), None))
+        return results
+
+    def _clear(self):
+        self._pieces = []
+        self._length = 0
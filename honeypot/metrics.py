@@ -0,0 +1,279 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram buckets (seconds) for operations on the request path
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base of the metric types: one value (or histogram) per label combination.
+
+    Updates take a per-metric lock for a dict lookup and an addition, so
+    they cost well under a microsecond and never wait on a scrape for long:
+    render() copies the values under the lock and formats them outside it.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes the labels {self.label_names}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.label_names, key, extra)} {_number(value)}")
+        return lines
+
+
+class _Scalar(Metric):
+    """A metric with one number per label combination, optionally read from a function."""
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._functions = {}
+
+    def set_function(self, function, **labels):
+        """Report function() as the value (called on every scrape)."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [(self.name, key, None, value) for key, value in values.items()]
+
+
+class Counter(_Scalar):
+    """A value that only goes up; set_function() exposes a total kept elsewhere."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Scalar):
+    """A value that goes up and down, set directly or read from a function at scrape time."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (plus +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            states = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in states:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", key, ("le", _number(float(bound))), cumulative))
+            samples.append((self.name + "_sum", key, None, total))
+            samples.append((self.name + "_count", key, None, cumulative))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class StatsCollector:
+    """Exposes a component's existing stats() dict as gauges and counters.
+
+    Every numeric value becomes ``<prefix>_<key>`` (nested dicts add their
+    key to the name); other values are skipped. Keys listed in ``counters``
+    (flattened names; a nested dict's key covers everything below it) are
+    running totals: they are exposed as counters named
+    ``<prefix>_<key>_total``. stats() is only called at scrape time.
+    """
+
+    def __init__(self, prefix, stats, counters=()):
+        self.prefix = prefix
+        self.stats = stats
+        self.counters = frozenset(counters)
+
+    def render(self):
+        try:
+            values = self.stats()
+        except Exception:
+            return []
+        lines = []
+        self._flatten(self.prefix, "", values, False, lines)
+        return lines
+
+    def _flatten(self, name, path, value, counter, lines):
+        counter = counter or path in self.counters
+        if isinstance(value, dict):
+            for key, item in value.items():
+                key = "".join(c if c.isalnum() else "_" for c in str(key))
+                self._flatten(f"{name}_{key}", f"{path}_{key}" if path else key, item, counter, lines)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if counter:
+                lines.append(f"# TYPE {name}_total counter")
+                lines.append(f"{name}_total {_number(value)}")
+            else:
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+
+
+class Registry:
+    """All metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def register_stats(self, prefix, stats, counters=()):
+        """Expose stats() (a dict of numbers) as gauges named prefix_<key>.
+
+        The keys in ``counters`` only ever grow and are exposed as counters
+        named prefix_<key>_total instead. Registering the same prefix again
+        replaces the previous function.
+        """
+        with self._lock:
+            self._collectors[prefix] = StatsCollector(prefix, stats, counters)
+
+    def render(self):
+        with self._lock:
+            items = list(self._metrics.values()) + list(self._collectors.values())
+        lines = []
+        for item in items:
+            lines.extend(item.render())
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry and the metrics shared by the sensors
+REGISTRY = Registry()
+
+CONNECTIONS = REGISTRY.counter(
+    "honeypot_connections_total", "Connections by sensor and outcome: accepted, rejected (sensor full) or refused (admission control)",
+    ["sensor", "result"])
+AUTH_ATTEMPTS = REGISTRY.counter(
+    "honeypot_auth_attempts_total", "Login attempts by sensor", ["sensor"])
+COMMANDS = REGISTRY.counter(
+    "honeypot_commands_total", "Shell commands received by sensor", ["sensor"])
+EVENTS = REGISTRY.counter(
+    "honeypot_events_total", "Events logged by type", ["type"])
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    "honeypot_active_sessions", "Connections currently being served", ["sensor"])
+SSH_HANDSHAKE_SECONDS = REGISTRY.histogram(
+    "honeypot_ssh_handshake_seconds", "Wall time of the SSH banner and key exchange",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15))
+SAVE_LOG_SECONDS = REGISTRY.histogram(
+    "honeypot_save_log_seconds", "Time save_log() takes to queue an event")
+LOG_COMMIT_SECONDS = REGISTRY.histogram(
+    "honeypot_log_commit_seconds", "Time to write one batch of events to storage")
+DASHBOARD_REQUEST_SECONDS = REGISTRY.histogram(
+    "honeypot_dashboard_request_seconds", "Dashboard request handling time by endpoint",
+    ["endpoint", "method"])
+
+REGISTRY.gauge("honeypot_threads", "Live threads in this process").set_function(threading.active_count)
+REGISTRY.counter("process_cpu_seconds_total", "CPU time used by this process").set_function(time.process_time)
+_started = time.time()
+REGISTRY.gauge("process_start_time_seconds", "Start time of this process (Unix time)").set_function(lambda: _started)
@@ -0,0 +1,224 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+
+try:
+    from .eventlog import list_log_files, file_day, is_archived, ARCHIVE_SUFFIX, LOG_SUFFIX
+    from .metrics import REGISTRY
+    from .ttylog import tty_dir, prune_recordings
+except ImportError:
+    from eventlog import list_log_files, file_day, is_archived, ARCHIVE_SUFFIX, LOG_SUFFIX
+    from metrics import REGISTRY
+    from ttylog import tty_dir, prune_recordings
+
+
+# A plain partition is renamed to name.jsonl.merging while it is compressed,
+# so events appended late go to a new plain file
+MERGING_SUFFIX = ".merging"
+
+
+def compress_partition(path):
+    """Gzip a closed day partition into name.jsonl.gz and remove the plain file.
+
+    The plain file is first renamed aside, so a late append (a spill replay,
+    an ingested back-dated event) starts a new plain file instead of being
+    lost. If the day already has an archive, the file is added to it as a
+    new gzip member; gzip readers read the members one after the other.
+    """
+    target = path + ".gz"
+    staging = path + MERGING_SUFFIX
+    if os.path.exists(staging):
+        # Left by an interrupted pass
+        _merge(staging, target)
+    os.replace(path, staging)
+    _merge(staging, target)
+    return target
+
+
+def _merge(staging, target):
+    # The new archive (the old one plus a member for staging) is written to
+    # a temporary name. Removing staging commits it: a .tmp archive found
+    # without its staging file is complete and only needs renaming into
+    # place (see recover_partitions).
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as out:
+        try:
+            with open(target, "rb") as archive:
+                shutil.copyfileobj(archive, out, 1024 * 1024)
+        except FileNotFoundError:
+            pass
+        with open(staging, "rb") as src, gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=out) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        out.flush()
+        os.fsync(out.fileno())
+    os.remove(staging)
+    os.replace(tmp, target)
+
+
+def recover_partitions(log_dir):
+    """Finish or undo the compressions interrupted by a crash in log_dir."""
+    try:
+        names = set(os.listdir(log_dir))
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith(ARCHIVE_SUFFIX + ".tmp"):
+            continue
+        tmp = os.path.join(log_dir, name)
+        if name[:-len(".gz.tmp")] + MERGING_SUFFIX in names:
+            # Not committed: merged again below
+            os.remove(tmp)
+        else:
+            os.replace(tmp, tmp[:-len(".tmp")])
+    for name in names:
+        if name.endswith(LOG_SUFFIX + MERGING_SUFFIX):
+            staging = os.path.join(log_dir, name)
+            _merge(staging, staging[:-len(MERGING_SUFFIX)] + ".gz")
+
+
+class LogRetention:
+    """Rotation, compression and pruning of the day partitions in log_dir.
+
+    The last ``hot_days`` days (today included, and yesterday in any case)
+    stay plain NDJSON, which is what the dashboard reads and tails. Older days are archived as
+    ``YYYY-MM-DD.jsonl.gz``; the readers only open those when a query's time
+    range reaches back that far. Partitions older than ``retention_days``
+    are deleted (None keeps them forever), and so are the matching rows of
+    ``store`` (an SQLiteEventStore) when one is given and the SSH session
+    recordings in log_dir/tty.
+
+    run() does a single pass; start() repeats it every ``interval`` seconds
+    on a background thread.
+    """
+
+    def __init__(self, log_dir, hot_days=7, retention_days=90, interval=3600, store=None):
+        if hot_days < 1:
+            raise ValueError("hot_days must be at least 1 (today is never archived)")
+        if retention_days is not None and retention_days < hot_days:
+            raise ValueError("retention_days must not be shorter than hot_days")
+        self.log_dir = log_dir
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.interval = interval
+        self.store = store
+        self._lock = threading.Lock()
+        self._thread = None
+        REGISTRY.register_stats("honeypot_retention", self.stats, counters=(
+            "runs", "compressed", "deleted", "pruned_rows", "recordings_deleted", "bytes_saved", "errors"))
+
+        # Counters
+        self.runs = 0
+        self.compressed = 0
+        self.deleted = 0
+        self.pruned_rows = 0
+        self.recordings_deleted = 0
+        self.bytes_saved = 0
+        self.errors = 0
+        self.last_run_time = 0.0
+
+    def run(self, today=None):
+        """Archive and prune once. Returns what this pass did."""
+        today = today or date.today()
+        # Yesterday's partition can still be written to around midnight, so it
+        # stays plain whatever hot_days is
+        archive_before = min(today - timedelta(days=self.hot_days - 1), today - timedelta(days=1))
+        delete_before = None
+        if self.retention_days is not None:
+            delete_before = today - timedelta(days=self.retention_days - 1)
+
+        started = time.perf_counter()
+        result = {"compressed": 0, "deleted": 0, "pruned_rows": 0, "recordings_deleted": 0}
+        with self._lock:
+            try:
+                recover_partitions(self.log_dir)
+            except OSError as e:
+                self.errors += 1
+                logging.error(f"Could not recover interrupted compressions in {self.log_dir}: {e}")
+            for path in list_log_files(self.log_dir, archived=True):
+                day = file_day(path)
+                if day is None:
+                    # Not a day partition (e.g. the legacy honeypot.jsonl)
+                    continue
+                try:
+                    if delete_before is not None and day < delete_before:
+                        os.remove(path)
+                        result["deleted"] += 1
+                    elif day < archive_before and not is_archived(path):
+                        size = os.path.getsize(path)
+                        archived = os.path.getsize(path + ".gz") if os.path.exists(path + ".gz") else 0
+                        target = compress_partition(path)
+                        self.bytes_saved += size - (os.path.getsize(target) - archived)
+                        result["compressed"] += 1
+                except OSError as e:
+                    self.errors += 1
+                    logging.error(f"Retention failed for {path}: {e}")
+
+            if delete_before is not None and self.store is not None:
+                result["pruned_rows"] = self.store.delete_before(delete_before.isoformat())
+            if delete_before is not None:
+                result["recordings_deleted"] = prune_recordings(tty_dir(self.log_dir), delete_before)
+
+            self.runs += 1
+            self.compressed += result["compressed"]
+            self.deleted += result["deleted"]
+            self.pruned_rows += result["pruned_rows"]
+            self.recordings_deleted += result["recordings_deleted"]
+            self.last_run_time = time.perf_counter() - started
+
+        if any(result.values()):
+            logging.info(
+                f"Log retention: {result['compressed']} partitions archived, "
+                f"{result['deleted']} deleted, {result['pruned_rows']} database rows pruned, "
+                f"{result['recordings_deleted']} SSH recordings deleted"
+            )
+        return result
+
+    def start(self):
+        """Run a pass now and then every ``interval`` seconds in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="log-retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            try:
+                self.run()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Log retention pass failed: {e}")
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hot_days": self.hot_days,
+                "retention_days": self.retention_days,
+                "runs": self.runs,
+                "compressed": self.compressed,
+                "deleted": self.deleted,
+                "pruned_rows": self.pruned_rows,
+                "recordings_deleted": self.recordings_deleted,
+                "bytes_saved": self.bytes_saved,
+                "errors": self.errors,
+                "last_run_time": round(self.last_run_time, 6),
+            }
+
+
+if __name__ == "__main__":
+    import sys
+
+    try:
+        from .utils import LOG_DIR
+    except ImportError:
+        from utils import LOG_DIR
+
+    logging.basicConfig(level=logging.INFO)
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else LOG_DIR
+    hot = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    keep = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    print(LogRetention(target_dir, hot_days=hot, retention_days=keep).run())
@@ -0,0 +1,202 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+
+class Scheduler:
+    """Runs callbacks after a delay from a single timer thread.
+
+    Timers live in a heap, so a waiting session costs one heap entry instead
+    of a sleeping thread. Callbacks run on the timer thread and must not
+    block. At most ``max_pending`` timers can be pending; call_later()
+    returns None beyond that and the caller has to go without the delay.
+    """
+
+    def __init__(self, max_pending=10000):
+        self.max_pending = max_pending
+        self._heap = []
+        self._seq = itertools.count()
+        # Cancelled timers still in the heap
+        self._cancelled = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+        # Counters
+        self.scheduled = 0
+        self.fired = 0
+        self.refused = 0
+        self.errors = 0
+
+    def call_later(self, delay, callback, *args):
+        """Run callback(*args) in delay seconds. Returns a timer for cancel(), or None."""
+        with self._cond:
+            if len(self._heap) - self._cancelled >= self.max_pending:
+                self.refused += 1
+                return None
+            timer = [time.monotonic() + delay, next(self._seq), callback, args]
+            heapq.heappush(self._heap, timer)
+            self.scheduled += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+                self._thread.start()
+            if self._heap[0] is timer:
+                self._cond.notify()
+            return timer
+
+    def cancel(self, timer):
+        # Cancelled timers stay in the heap and are skipped when due, until
+        # they make up half of it
+        with self._cond:
+            if timer[2] is None:
+                # Already cancelled or fired
+                return
+            timer[2] = None
+            self._cancelled += 1
+            if self._cancelled > len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if entry[2] is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                timer = heapq.heappop(self._heap)
+                callback, args = timer[2], timer[3]
+                if callback is None:
+                    self._cancelled -= 1
+                    continue
+                # Fired timers can no longer be cancelled
+                timer[2] = None
+                self.fired += 1
+            try:
+                callback(*args)
+            except Exception as e:
+                with self._cond:
+                    self.errors += 1
+                logging.error(f"Scheduled callback failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._heap) - self._cancelled,
+                "max_pending": self.max_pending,
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+                "refused": self.refused,
+                "errors": self.errors,
+            }
+
+
+class SessionOutput:
+    """Ordered, optionally delayed output for one session.
+
+    send(data, delay) writes data ``delay`` seconds after the previous write
+    went out; writes without a delay go out immediately unless delayed
+    output is still queued, in which case they wait their turn. Only the
+    next queued write has a timer, so a session dribbling output holds one
+    heap entry in the scheduler.
+
+    ``budget`` is the total delay (in seconds) the session may use. Once it
+    is spent, output is sent without delays. If the scheduler is full, the
+    queued output is dropped and the session closed (``on_close`` is
+    called) rather than sent synchronously. After slow_down(), every write
+    is dripped until the budget runs out.
+
+    The timer thread only sends while ``send_ready`` says the client has
+    room, so a client that stops reading cannot stall the other sessions.
+    """
+
+    # Retry interval while the client is not reading (send would block)
+    RETRY_INTERVAL = 0.5
+
+    def __init__(self, scheduler, send, budget=60.0, send_ready=None, on_close=None):
+        self.scheduler = scheduler
+        self.budget = budget
+        self._send = send
+        self._send_ready = send_ready
+        self._on_close = on_close
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._timer = None
+        self.closed = False
+        self.drip_size = None
+        self.drip_interval = 0
+
+    def slow_down(self, chunk_size, interval):
+        """Tarpit the session: drip all further output chunk_size bytes at a time."""
+        self.drip_size = chunk_size
+        self.drip_interval = interval
+
+    def send(self, data, delay=0):
+        if self.drip_size and delay <= 0 and self.budget > 0:
+            self.drip(data, self.drip_size, self.drip_interval)
+            return
+        with self._lock:
+            if self.closed:
+                return
+            if delay > 0:
+                delay = min(delay, self.budget)
+                self.budget -= delay
+            if delay <= 0 and self._timer is None and not self._pending:
+                self._send(data)
+                return
+            self._pending.append((delay, data))
+            if self._timer is None:
+                self._schedule(self._pending[0][0])
+
+    def drip(self, data, chunk_size=1, interval=0.5):
+        """Send data a few bytes at a time, interval seconds apart."""
+        for i in range(0, len(data), chunk_size):
+            self.send(data[i:i + chunk_size], interval)
+
+    def _schedule(self, delay):
+        # Called with the lock held
+        self._timer = self.scheduler.call_later(max(delay, 0), self._fire)
+        if self._timer is None:
+            # Global budget exhausted. Sending the rest here could block on
+            # the client (and this may be the timer thread): give up instead
+            logging.debug("Scheduler full, closing a delayed session")
+            self.closed = True
+            self._pending.clear()
+            if self._on_close is not None:
+                self._on_close()
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+            if self.closed or not self._pending:
+                return
+            try:
+                # The due write, then those queued behind it without a delay
+                while self._pending:
+                    if self._send_ready is not None and not self._send_ready():
+                        # Never block the timer thread on a client that stopped reading
+                        self._schedule(self.RETRY_INTERVAL)
+                        return
+                    self._send(self._pending.popleft()[1])
+                    if self._pending and self._pending[0][0] > 0:
+                        break
+            except Exception:
+                self.closed = True
+                self._pending.clear()
+                raise
+            if self._pending:
+                self._schedule(self._pending[0][0])
+
+    def close(self):
+        """Drop queued output; nothing is sent after this."""
+        with self._lock:
+            self.closed = True
+            self._pending.clear()
+            if self._timer is not None:
+                self.scheduler.cancel(self._timer)
+                self._timer = None
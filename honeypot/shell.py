@@ -0,0 +1,196 @@
+from datetime import datetime
+from functools import lru_cache
+
+# Responses that only depend on the username and hostname. Templates are
+# rendered with str.format(username=..., hostname=..., capitalized=...).
+STATIC_RESPONSES = {
+    "whoami": "{username}\r\n",
+    "hostname": "{hostname}\r\n",
+    "id": "uid=1000({username}) gid=1000({username}) groups=1000({username}),4(adm),24(cdrom),27(sudo),30(dip),46(plugdev),120(lpadmin),131(lxd),132(sambashare)\r\n",
+    "pwd": "/home/{username}\r\n",
+    "ls": (
+        "total 32\r\n"
+        "drwxr-xr-x 4 {username} {username} 4096 Apr 18 09:14 .\r\n"
+        "drwxr-xr-x 3 root     root     4096 Jan 15 12:32 ..\r\n"
+        "-rw------- 1 {username} {username}  220 Jan 15 12:32 .bash_history\r\n"
+        "-rw-r--r-- 1 {username} {username} 3771 Jan 15 12:32 .bashrc\r\n"
+        "drwx------ 2 {username} {username} 4096 Jan 15 12:34 .cache\r\n"
+        "-rw-r--r-- 1 {username} {username}  807 Jan 15 12:32 .profile\r\n"
+        "drwxrwxr-x 2 {username} {username} 4096 Apr 18 09:14 .ssh\r\n"
+        "-rw-r--r-- 1 {username} {username}    0 Jan 15 12:34 .sudo_as_admin_successful\r\n"
+        "-rw------- 1 {username} {username}  945 Apr 18 09:10 .viminfo\r\n"
+    ),
+    "uname -a": "Linux prod-server 5.4.0-146-generic #163-Ubuntu SMP Fri Mar 17 18:26:02 UTC 2023 x86_64 x86_64 x86_64 GNU/Linux\r\n",
+    "ps aux": (
+        "USER         PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND\r\n"
+        "root           1  0.0  0.2 168860 11492 ?        Ss   Apr17   0:04 /sbin/init\r\n"
+        "root           2  0.0  0.0      0     0 ?        S    Apr17   0:00 [kthreadd]\r\n"
+        "root         546  0.0  0.6  72172 25868 ?        Ss   Apr17   0:00 /usr/sbin/sshd -D\r\n"
+        "root         565  0.0  0.3 235520 14120 ?        Ssl  Apr17   0:00 /usr/sbin/rsyslogd -n\r\n"
+        "root         566  0.0  0.0   6812  2972 tty1     Ss+  Apr17   0:00 /sbin/agetty -o -p -- \\u --noclear tty1 linux\r\n"
+        "{username}      1328  0.0  0.1  19216  5144 pts/0    Ss   09:10   0:00 -bash\r\n"
+        "{username}      1392  0.0  0.1  36084  3704 pts/0    R+   09:15   0:00 ps aux\r\n"
+    ),
+    "cat /etc/passwd": (
+        "root:x:0:0:root:/root:/bin/bash\r\n"
+        "daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin\r\n"
+        "bin:x:2:2:bin:/bin:/usr/sbin/nologin\r\n"
+        "sys:x:3:3:sys:/dev:/usr/sbin/nologin\r\n"
+        "{username}:x:1000:1000:{capitalized}:/home/{username}:/bin/bash\r\n"
+        "sshd:x:110:65534::/run/sshd:/usr/sbin/nologin\r\n"
+    ),
+    "cat /etc/hostname": "{hostname}\r\n",
+    "cat /etc/hosts": (
+        "127.0.0.1 localhost\r\n"
+        "127.0.1.1 {hostname}\r\n"
+        "\r\n"
+        "# The following lines are desirable for IPv6 capable hosts\r\n"
+        "::1     ip6-localhost ip6-loopback\r\n"
+        "fe00::0 ip6-localnet\r\n"
+        "ff00::0 ip6-mcastprefix\r\n"
+        "ff02::1 ip6-allnodes\r\n"
+        "ff02::2 ip6-allrouters\r\n"
+    ),
+    "ifconfig": (
+        "eth0: flags=4163<UP,BROADCAST,RUNNING,MULTICAST>  mtu 1500\r\n"
+        "        inet 10.0.2.15  netmask 255.255.255.0  broadcast 10.0.2.255\r\n"
+        "        inet6 fe80::a00:27ff:fe73:60cf  prefixlen 64  scopeid 0x20<link>\r\n"
+        "        ether 08:00:27:73:60:cf  txqueuelen 1000  (Ethernet)\r\n"
+        "        RX packets 963  bytes 91521 (91.5 KB)\r\n"
+        "        RX errors 0  dropped 0  overruns 0  frame 0\r\n"
+        "        TX packets 649  bytes 96318 (96.3 KB)\r\n"
+        "        TX errors 0  dropped 0 overruns 0  carrier 0  collisions 0\r\n"
+        "\r\n"
+        "lo: flags=73<UP,LOOPBACK,RUNNING>  mtu 65536\r\n"
+        "        inet 127.0.0.1  netmask 255.0.0.0\r\n"
+        "        inet6 ::1  prefixlen 128  scopeid 0x10<host>\r\n"
+        "        loop  txqueuelen 1000  (Local Loopback)\r\n"
+        "        RX packets 182  bytes 13832 (13.8 KB)\r\n"
+        "        RX errors 0  dropped 0  overruns 0  frame 0\r\n"
+        "        TX packets 182  bytes 13832 (13.8 KB)\r\n"
+        "        TX errors 0  dropped 0 overruns 0  carrier 0  collisions 0\r\n"
+    ),
+    "uptime": " 09:15:27 up 15 days, 7:23, 1 user, load average: 0.00, 0.01, 0.05\r\n",
+    "exit": "logout\r\nConnection to {hostname} closed.\r\n",
+}
+
+# Other spellings of the same command
+ALIASES = {
+    "ls -la": "ls",
+    "ls -l": "ls",
+    "ps -ef": "ps aux",
+    "/sbin/ifconfig": "ifconfig",
+    "logout": "exit",
+    "quit": "exit",
+}
+
+
+class FakeShell:
+    """Fake bash whose commands are looked up in tables.
+
+    A command line is matched against the full-line table first ("ls -la",
+    "cat /etc/hosts") and then by its first word ("cat", "sudo"), so
+    dispatch costs two dict lookups however many commands are registered.
+    Static responses are rendered once per (username, hostname) and cached.
+    A command's output, together with the next prompt, is written in a
+    single send().
+
+    Handlers are called as handler(shell, command, args, username, hostname)
+    and return the output text, or a list of (delay, text) parts for output
+    that should arrive in steps.
+    """
+
+    def __init__(self, cache_size=4096):
+        self._static = {}
+        self._lines = {}
+        self._names = {}
+        self.render = lru_cache(maxsize=cache_size)(self._render)
+
+    def add_static(self, line, template):
+        """Register a full command line with a fixed response template."""
+        self._static[line] = template
+        self._lines[line] = lambda shell, command, args, username, hostname: shell.render(line, username, hostname)
+
+    def add_alias(self, line, target):
+        """Make a full command line behave exactly like another one."""
+        self._lines[line] = self._lines[target]
+
+    def add_command(self, name, handler):
+        """Register a handler for every command line starting with name."""
+        self._names[name] = handler
+
+    def _render(self, line, username, hostname):
+        return self._static[line].format(
+            username=username, hostname=hostname, capitalized=username.capitalize()
+        )
+
+    def respond(self, command, username, hostname):
+        """Return the response to a command line as a list of (delay, text) parts."""
+        line = command.lower().strip()
+        handler = self._lines.get(line)
+        if handler is None:
+            name, _, args = line.partition(" ")
+            handler = self._names.get(name, command_not_found)
+        else:
+            args = ""
+        result = handler(self, command, args.strip(), username, hostname)
+        if isinstance(result, str):
+            return [(0, result)]
+        return result
+
+    def run(self, output, command, username, hostname, prompt=""):
+        """Answer a command on output, followed by the prompt, coalescing writes."""
+        parts = self.respond(command, username, hostname)
+        delay, text = parts[-1]
+        parts[-1] = (delay, text + prompt)
+        for delay, text in parts:
+            if text:
+                output.send(text, delay)
+
+
+def command_not_found(shell, command, args, username, hostname):
+    return f"bash: {command.split()[0]}: command not found\r\n"
+
+
+def cd(shell, command, args, username, hostname):
+    # Just acknowledge the cd command
+    return ""
+
+
+def cat(shell, command, args, username, hostname):
+    # Files with content are registered as full command lines
+    if not args:
+        return ""
+    return f"cat: {args}: No such file or directory\r\n"
+
+
+def sudo(shell, command, args, username, hostname):
+    # Pause to simulate password entry (scheduled, the thread doesn't sleep)
+    return [
+        (0, f"[sudo] password for {username}: "),
+        (1, f"\r\n{username} is not in the sudoers file. This incident will be reported.\r\n"),
+    ]
+
+
+def who(shell, command, args, username, hostname):
+    current_time = datetime.now().strftime('%H:%M:%S')
+    return (
+        f" {current_time} up 15 days, 7:23, 1 user, load average: 0.00, 0.01, 0.05\r\n"
+        f"USER     TTY      FROM             LOGIN@   IDLE   JCPU   PCPU WHAT\r\n"
+        f"{username}    pts/0    10.0.2.2          09:10    0.00s  0.04s  0.00s w\r\n"
+    )
+
+
+def default_shell():
+    """Build the shell with the built-in commands."""
+    shell = FakeShell()
+    for line, template in STATIC_RESPONSES.items():
+        shell.add_static(line, template)
+    for line, target in ALIASES.items():
+        shell.add_alias(line, target)
+    shell.add_command("cd", cd)
+    shell.add_command("cat", cat)
+    shell.add_command("sudo", sudo)
+    shell.add_command("w", who)
+    shell.add_command("who", who)
+    return shell
@@ -0,0 +1,242 @@
+import os
+import json
+import sqlite3
+import heapq
+import threading
+
+try:
+    from .eventlog import iter_events, timestamp_key, normalize_time, normalize_end
+except ImportError:
+    from eventlog import iter_events, timestamp_key, normalize_time, normalize_end
+
+DB_NAME = "events.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    ip TEXT,
+    username TEXT,
+    protocol TEXT,
+    data TEXT NOT NULL,
+    session TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_ip ON events (ip, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_username ON events (username, timestamp);
+"""
+
+
+def db_path(log_dir):
+    """Return the path of the event database inside log_dir."""
+    return os.path.join(log_dir, DB_NAME)
+
+
+class SQLiteEventStore:
+    """Event storage backed by an SQLite database in WAL mode.
+
+    Every thread gets its own connection; WAL lets the dashboard read while the
+    log writer commits. The full event is kept as JSON in ``data`` and the
+    columns used for filtering are indexed together with the timestamp, so
+    "latest N matching" queries only touch N rows.
+    """
+
+    def __init__(self, path, synchronous="NORMAL"):
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        if "session" not in [row[1] for row in conn.execute("PRAGMA table_info(events)")]:
+            # Database created before SSH sessions had IDs
+            conn.execute("ALTER TABLE events ADD COLUMN session TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session ON events (session, timestamp)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def insert_many(self, entries):
+        """Insert events in a single transaction."""
+        rows = [
+            (
+                timestamp_key(entry),
+                entry.get("type", "access"),
+                entry.get("ip"),
+                entry.get("username"),
+                entry.get("protocol"),
+                json.dumps(entry, separators=(",", ":"), ensure_ascii=False),
+                entry.get("session"),
+            )
+            for entry in entries
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO events (timestamp, type, ip, username, protocol, data, session) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def query(self, types=None, ip=None, username=None, limit=None, newest_first=True):
+        """Return events matching the filters, ordered by timestamp.
+
+        ``types`` may be a single type or a list of types. With several types,
+        each one is fetched through its own index and the results are merged.
+        """
+        if isinstance(types, (list, tuple, set)) and len(types) > 1:
+            results = [self.query(t, ip, username, limit, newest_first) for t in types]
+            merged = heapq.merge(*results, key=timestamp_key, reverse=newest_first)
+            return list(merged)[:limit] if limit else list(merged)
+        if isinstance(types, str):
+            types = [types]
+
+        clauses, params = self._where({"types": types, "ip": ip, "username": username})
+        sql = "SELECT data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        order = "DESC" if newest_first else "ASC"
+        sql += f" ORDER BY timestamp {order}, id {order}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._connect().execute(sql, params)
+        return [json.loads(data) for (data,) in rows]
+
+    def page(self, filters, cursor=None, limit=100):
+        """Return one page of matching events, newest first, and the cursor of the next page.
+
+        Pages are ordered by (timestamp, id); the cursor is the position of the
+        last returned event, so new events never shift later pages.
+        """
+        if cursor is not None and (len(cursor) != 2 or not isinstance(cursor[1], int)):
+            raise ValueError("Invalid cursor")
+        clauses, params = self._where(filters)
+        if cursor:
+            timestamp, row_id = cursor
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([timestamp, timestamp, row_id])
+
+        sql = "SELECT id, timestamp, data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][1], rows[-1][0])
+        return [json.loads(data) for _, _, data in rows], next_cursor
+
+    def iter_range(self, filters, batch_size=5000):
+        """Yield the events matching filters, oldest first.
+
+        Rows are fetched in keyset batches of batch_size, so a long export
+        neither loads everything nor keeps a read transaction open.
+        """
+        last = None
+        while True:
+            clauses, params = self._where(filters)
+            if last:
+                clauses.append("(timestamp > ? OR (timestamp = ? AND id > ?))")
+                params.extend([last[0], last[0], last[1]])
+            sql = "SELECT id, timestamp, data FROM events"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY timestamp, id LIMIT ?"
+            params.append(batch_size)
+
+            rows = self._connect().execute(sql, params).fetchall()
+            for _, _, data in rows:
+                yield json.loads(data)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][1], rows[-1][0])
+
+    @staticmethod
+    def _where(filters):
+        """Build SQL conditions for the filters accepted by eventlog.event_matches."""
+        clauses = []
+        params = []
+        types = filters.get("types")
+        if types:
+            clauses.append(f"type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        for column in ("ip", "username", "protocol", "session"):
+            value = filters.get(column)
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if filters.get("start"):
+            clauses.append("timestamp >= ?")
+            params.append(normalize_time(filters["start"]))
+        if filters.get("end"):
+            clauses.append("timestamp <= ?")
+            params.append(normalize_end(filters["end"]))
+        return clauses, params
+
+    def events_after(self, last_id, limit=1000):
+        """Return up to limit (id, event) pairs inserted after row id last_id, in insertion order."""
+        rows = self._connect().execute(
+            "SELECT id, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (last_id or 0, limit)
+        )
+        return [(row_id, json.loads(data)) for row_id, data in rows]
+
+    def max_id(self):
+        """Return the id of the most recently inserted event (0 if empty)."""
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def count(self):
+        """Return the number of stored events."""
+        return self._connect().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def delete_before(self, timestamp):
+        """Delete events stamped before timestamp (e.g. "YYYY-MM-DD"). Returns the number deleted."""
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM events WHERE timestamp < ?", (normalize_time(timestamp),)).rowcount
+
+    def import_ndjson(self, log_dir, batch_size=10000):
+        """Load every NDJSON event in log_dir (archived days included) into the database."""
+        imported = 0
+        batch = []
+        for entry in iter_events(log_dir):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self.insert_many(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            self.insert_many(batch)
+            imported += len(batch)
+        return imported
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+if __name__ == "__main__":
+    import sys
+
+    try:
+        from .utils import LOG_DIR
+    except ImportError:
+        from utils import LOG_DIR
+
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else LOG_DIR
+    store = SQLiteEventStore(db_path(source_dir))
+    print(f"Imported {store.import_ndjson(source_dir)} events into {store.path}")
@@ -1,28 +1,52 @@
 import socket
 import threading
+import queue
 import paramiko
 import logging
 import os
 import time
 from datetime import datetime, timedelta  # Import timedelta directly
 import sys
+from collections import Counter
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 
 # Add the parent directory to the path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
+    from honeypot import utils
     from honeypot.utils import save_log
+    from honeypot.eventlog import new_session_id
+    from honeypot.ttylog import TTYRecorder, tty_dir, TTY_SUFFIX
+    from honeypot.scheduler import Scheduler, SessionOutput
+    from honeypot.shell import default_shell
+    from honeypot.line_discipline import LineDiscipline, INTERRUPT
+    from honeypot.metrics import REGISTRY, CONNECTIONS, AUTH_ATTEMPTS, COMMANDS, ACTIVE_SESSIONS, SSH_HANDSHAKE_SECONDS
 except ImportError:
+    import utils
     from utils import save_log
+    from eventlog import new_session_id
+    from ttylog import TTYRecorder, tty_dir, TTY_SUFFIX
+    from scheduler import Scheduler, SessionOutput
+    from shell import default_shell
+    from line_discipline import LineDiscipline, INTERRUPT
+    from metrics import REGISTRY, CONNECTIONS, AUTH_ATTEMPTS, COMMANDS, ACTIVE_SESSIONS, SSH_HANDSHAKE_SECONDS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
 class SSHServer(paramiko.ServerInterface):
-    def __init__(self, client_address):
+    def __init__(self, client_address, session_id=None):
         self.client_address = client_address
+        self.session_id = session_id
         self.event = threading.Event()
         self.username = None
         self.password = None
+        self.authenticated = None
+        self.auth_attempts = 0
+        self.commands = 0
+        self.term_size = None
+        self.recorder = None
 
     def check_channel_request(self, kind, chanid):
         if kind == 'session':
@@ -33,19 +57,25 @@ class SSHServer(paramiko.ServerInterface):
         # Log the authentication attempt
         self.username = username
         self.password = password
+        self.auth_attempts += 1
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self.authenticated is None:
+            self.authenticated = now
         
         log_entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": now,
             "ip": self.client_address[0],
             "port": self.client_address[1],
             "type": "ssh_login_attempt",
+            "session": self.session_id,
             "username": username,
             "password": password,
             "protocol": "SSH"
         }
         
         save_log(log_entry)
-        logging.info(f"SSH login attempt from {self.client_address[0]}: username='{username}', password='{password}'")
+        AUTH_ATTEMPTS.inc(sensor="ssh")
+        logging.debug("SSH login attempt from %s: username=%r, password=%r", self.client_address[0], username, password)
         
         # Always return success - this is a honeypot
         return paramiko.AUTH_SUCCESSFUL
@@ -58,269 +88,497 @@ class SSHServer(paramiko.ServerInterface):
         return True
 
     def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        self.term_size = (width, height)
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        self.term_size = (width, height)
+        if self.recorder is not None:
+            self.recorder.resize(width, height)
         return True
 
     def check_channel_exec_request(self, channel, command):
-        # Log the command execution attempt
+        # Log the command execution attempt (the session record holds the rest)
         log_entry = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "ip": self.client_address[0],
-            "port": self.client_address[1],
             "type": "ssh_command",
-            "username": self.username,
-            "password": self.password,
-            "command": command.decode('utf-8'),
-            "protocol": "SSH"
+            "session": self.session_id,
+            "command": command.decode('utf-8', errors='replace'),
         }
         
         save_log(log_entry)
-        logging.info(f"SSH command from {self.client_address[0]}: '{command.decode('utf-8')}'")
+        self.commands += 1
+        COMMANDS.inc(sensor="ssh")
+        logging.debug("SSH command from %s: %r", self.client_address[0], log_entry["command"])
         
         # Simulate command execution
         channel.send(f"Command '{command.decode('utf-8')}' executed.\r\n")
         channel.send("$ ")
         return True
 
+# Host key files (next to this module) and the algorithms each key type offers
+HOST_KEY_FILES = {
+    "ed25519": "ssh_key_ed25519",
+    "ecdsa": "ssh_key_ecdsa",
+    "rsa": "ssh_key",
+}
+HOST_KEY_ALGORITHMS = {
+    "ed25519": ["ssh-ed25519"],
+    "ecdsa": ["ecdsa-sha2-nistp256"],
+    "rsa": ["rsa-sha2-512", "rsa-sha2-256", "ssh-rsa"],
+}
+
+def load_host_key(kind, key_dir):
+    """Load the host key of the given kind, generating it on first use."""
+    key_path = os.path.join(key_dir, HOST_KEY_FILES[kind])
+    if os.path.exists(key_path):
+        if kind == "ed25519":
+            return paramiko.Ed25519Key(filename=key_path)
+        if kind == "ecdsa":
+            return paramiko.ECDSAKey(filename=key_path)
+        return paramiko.RSAKey(filename=key_path)
+    
+    logging.info(f"Generating new SSH {kind} host key...")
+    if kind == "ed25519":
+        # paramiko cannot generate Ed25519 keys, so write one in OpenSSH format
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        data = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.OpenSSH,
+            serialization.NoEncryption(),
+        )
+        with open(os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            f.write(data)
+        key = paramiko.Ed25519Key(filename=key_path)
+    else:
+        if kind == "ecdsa":
+            key = paramiko.ECDSAKey.generate()
+        else:
+            key = paramiko.RSAKey.generate(2048)
+        key.write_private_key_file(key_path)
+    logging.info(f"SSH host key generated and saved to {key_path}")
+    return key
+
+def load_host_keys(kinds):
+    """Load (or generate) the host keys of the given kinds from the package directory."""
+    key_dir = os.path.dirname(os.path.abspath(__file__))
+    return [load_host_key(kind, key_dir) for kind in kinds]
+
+def thread_cpu_time(thread):
+    """Return the CPU time a running thread has used so far, or None where the platform cannot tell.
+    
+    Read through the thread's POSIX CPU clock, so it needs no hook inside the
+    thread (Unix only).
+    """
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+    except (AttributeError, TypeError, OSError):
+        return None
+
 class SSHHoneypot:
-    def __init__(self, host="0.0.0.0", port=2222):
+    """SSH sensor served by a fixed pool of worker threads.
+    
+    Accepted connections wait in a bounded accept queue for a free worker.
+    With overflow="reject" a connection is closed right away when no worker
+    is idle; with overflow="queue" it waits in the queue (up to accept_queue
+    connections) and is closed only when the queue is full.
+    
+    handshake_timeout bounds the banner exchange and key exchange,
+    auth_timeout the time to authenticate and open a shell, and idle_timeout
+    the silence allowed in an interactive session.
+    
+    An optional admission control (see admission.py) refuses over-limit
+    sources right after accept(), before any key exchange.
+    
+    Each accepted connection gets a session ID. Login attempts and commands
+    are logged with it (commands only carry the time, source IP and command
+    line), and one "ssh_session" record with the client version, the
+    credentials, the connect/auth times and the duration is written when the
+    connection closes.
+    
+    host_keys lists the host key types to offer ("ed25519", "ecdsa", "rsa")
+    in order of preference, and kex the key exchange algorithms (None keeps
+    paramiko's defaults). The client's preference wins when both sides
+    support several algorithms, so dropping expensive algorithms from these
+    lists is what lowers the cost per handshake.
+    
+    Delayed output (the sudo prompt pause, and with tarpit=True the whole
+    session dripped tarpit_chunk bytes every tarpit_interval seconds) goes
+    through one shared scheduler instead of sleeping worker threads. Each
+    session may spend tarpit_session_budget seconds of delay, and at most
+    tarpit_global_budget delayed writes are pending across all sessions.
+    
+    Input lines longer than max_line characters are cut off.
+    
+    With record_tty=True the input and output of interactive sessions are
+    recorded (see ttylog.py) to tty_dir (default LOG_DIR/tty), at most
+    tty_max_bytes per session, gzipped when the session ends if
+    tty_compress is set.
+    
+    With reuse_port=True several worker processes can listen on the same
+    port (see supervisor.py).
+    """
+    
+    def __init__(self, host="0.0.0.0", port=2222, max_sessions=100, accept_queue=200,
+                 overflow="reject", backlog=128, handshake_timeout=15, auth_timeout=20,
+                 idle_timeout=300, admission=None, host_keys=("ed25519", "ecdsa", "rsa"),
+                 kex=None, tarpit=False, tarpit_chunk=16, tarpit_interval=1.0,
+                 tarpit_session_budget=120, tarpit_global_budget=10000, max_line=4096,
+                 reuse_port=False, record_tty=False, tty_dir=None, tty_compress=True,
+                 tty_max_bytes=10 * 1024 * 1024):
+        if overflow not in ("reject", "queue"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
         self.host = host
         self.port = port
+        self.max_sessions = max_sessions
+        self.overflow = overflow
+        self.backlog = backlog
+        self.handshake_timeout = handshake_timeout
+        self.auth_timeout = auth_timeout
+        self.idle_timeout = idle_timeout
+        self.admission = admission
+        self.tarpit = tarpit
+        self.tarpit_chunk = tarpit_chunk
+        self.tarpit_interval = tarpit_interval
+        self.tarpit_session_budget = tarpit_session_budget
+        self.scheduler = Scheduler(max_pending=tarpit_global_budget)
+        self.shell = default_shell()
+        self.max_line = max_line
+        self.reuse_port = reuse_port
+        self.record_tty = record_tty
+        self.tty_dir = tty_dir
+        self.tty_compress = tty_compress
+        self.tty_max_bytes = tty_max_bytes
+        self._accept_queue = queue.Queue(maxsize=accept_queue)
+        self._stats_lock = threading.Lock()
         
-        # Create SSH key if it doesn't exist
-        key_path = os.path.join(os.path.dirname(__file__), 'ssh_key')
-        if not os.path.exists(key_path):
-            logging.info("Generating new SSH host key...")
-            key = paramiko.RSAKey.generate(2048)
-            key.write_private_key_file(key_path)
-            logging.info(f"SSH host key generated and saved to {key_path}")
-            self.host_key = key
-        else:
-            self.host_key = paramiko.RSAKey(filename=key_path)
+        # Counters
+        self.active_sessions = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.handshake_failures = 0
+        self.idle_timeouts = 0
+        self.handshakes = 0
+        self.handshake_cpu = 0.0
+        # Handshakes whose CPU time could be measured (see thread_cpu_time)
+        self.handshake_cpu_samples = 0
+        self.handshake_algorithms = Counter()
+        
+        # Create SSH keys if they don't exist
+        unknown = [kind for kind in host_keys if kind not in HOST_KEY_FILES]
+        if unknown or not host_keys:
+            raise ValueError(f"Unknown or missing SSH host key types: {unknown}")
+        self.host_keys = load_host_keys(host_keys)
+        # paramiko keeps its supported algorithms in private tables; without
+        # them nothing is filtered out
+        known_keys = getattr(paramiko.Transport, "_key_info", None)
+        self.key_types = [
+            name for kind in host_keys for name in HOST_KEY_ALGORITHMS[kind]
+            if known_keys is None or name in known_keys
+        ]
+        
+        # Ignore key exchange algorithms this paramiko version doesn't know
+        self.kex = None
+        if kex:
+            known_kex = getattr(paramiko.Transport, "_kex_info", None)
+            self.kex = [name for name in kex if known_kex is None or name in known_kex]
+            skipped = [name for name in kex if name not in self.kex]
+            if skipped:
+                logging.warning(f"Unsupported SSH key exchange algorithms ignored: {skipped}")
+        
+        REGISTRY.register_stats("honeypot_ssh", self.stats, counters=(
+            "accepted", "rejected", "handshake_failures", "idle_timeouts", "handshakes",
+            "handshake_cpu_seconds", "handshake_cpu_samples", "handshake_algorithms", "scheduler_scheduled",
+            "scheduler_fired", "scheduler_refused", "scheduler_errors"))
+        ACTIVE_SESSIONS.set_function(lambda: self.active_sessions, sensor="ssh")
 
     def start(self):
+        server_socket = None
         try:
+            # Start the worker pool
+            for i in range(self.max_sessions):
+                threading.Thread(target=self._worker, name=f"ssh-worker-{i}", daemon=True).start()
+            
             server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                # Several worker processes listen on the port (see supervisor.py)
+                server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             server_socket.bind((self.host, self.port))
-            server_socket.listen(5)
-            logging.info(f"SSH Honeypot listening on {self.host}:{self.port}")
+            server_socket.listen(self.backlog)
+            logging.info(f"SSH Honeypot listening on {self.host}:{self.port} ({self.max_sessions} workers, overflow={self.overflow})")
             
             while True:
                 client, addr = server_socket.accept()
-                logging.info(f"SSH Connection from {addr}")
-                threading.Thread(target=self.handle_client, args=(client, addr)).start()
+                if self.admission is not None and not self.admission.admit(client, addr):
+                    CONNECTIONS.inc(sensor="ssh", result="refused")
+                    continue
+                logging.debug("SSH connection from %s", addr)
+                connected = datetime.now()
+                self._dispatch(client, addr, new_session_id(connected), connected)
                 
         except Exception as e:
             logging.error(f"Error starting SSH honeypot: {e}")
         finally:
-            server_socket.close()
+            if server_socket is not None:
+                server_socket.close()
+    
+    def _dispatch(self, client, addr, session_id, connected):
+        """Hand an accepted connection (and its session ID) to the worker pool or reject it."""
+        with self._stats_lock:
+            busy = self.active_sessions + self._accept_queue.qsize()
+        if self.overflow == "reject" and busy >= self.max_sessions:
+            self._reject(client, addr)
+            return
+        try:
+            self._accept_queue.put_nowait((client, addr, session_id, connected))
+            with self._stats_lock:
+                self.accepted += 1
+            CONNECTIONS.inc(sensor="ssh", result="accepted")
+        except queue.Full:
+            self._reject(client, addr)
+    
+    def _reject(self, client, addr):
+        with self._stats_lock:
+            self.rejected += 1
+        CONNECTIONS.inc(sensor="ssh", result="rejected")
+        logging.debug("SSH connection from %s rejected: all %d sessions busy", addr, self.max_sessions)
+        client.close()
+    
+    def _worker(self):
+        while True:
+            client, addr, session_id, connected = self._accept_queue.get()
+            with self._stats_lock:
+                self.active_sessions += 1
+            try:
+                self.handle_client(client, addr, session_id, connected)
+            finally:
+                with self._stats_lock:
+                    self.active_sessions -= 1
+    
+    def stats(self):
+        """Return session pool usage and counters."""
+        with self._stats_lock:
+            return {
+                "active_sessions": self.active_sessions,
+                "max_sessions": self.max_sessions,
+                "queued": self._accept_queue.qsize(),
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "handshake_failures": self.handshake_failures,
+                "idle_timeouts": self.idle_timeouts,
+                "handshakes": self.handshakes,
+                "handshake_cpu_seconds": round(self.handshake_cpu, 6),
+                "handshake_cpu_samples": self.handshake_cpu_samples,
+                # None until a handshake's CPU time was measured
+                "handshake_cpu_avg_ms": round(self.handshake_cpu / self.handshake_cpu_samples * 1000, 3)
+                if self.handshake_cpu_samples else None,
+                # Handshakes one core could do per second at the measured cost
+                "handshakes_per_core_second": round(self.handshake_cpu_samples / self.handshake_cpu, 1)
+                if self.handshake_cpu else None,
+                "handshake_algorithms": dict(self.handshake_algorithms),
+                "scheduler": self.scheduler.stats(),
+            }
+    
+    def _record_handshake(self, transport, elapsed):
+        """Count a completed key exchange that took elapsed seconds (wall time).
+        
+        Only public Transport attributes are used. The CPU time is that of the
+        transport thread, which was started by start_server() and has done
+        little besides the banner exchange, key exchange and host key
+        signature by the time it returns.
+        """
+        cpu = thread_cpu_time(transport)
+        # The kex algorithm is not exposed once the exchange is over, so
+        # handshakes are broken down by host key type and cipher
+        algorithms = f"{getattr(transport, 'host_key_type', None)} {getattr(transport, 'remote_cipher', None)}"
+        with self._stats_lock:
+            self.handshakes += 1
+            if cpu is not None:
+                self.handshake_cpu += cpu
+                self.handshake_cpu_samples += 1
+            self.handshake_algorithms[algorithms] += 1
+        SSH_HANDSHAKE_SECONDS.observe(elapsed)
+        if cpu is not None:
+            logging.debug(f"SSH handshake took {cpu * 1000:.2f} ms CPU ({algorithms})")
 
-    def handle_client(self, client_socket, client_address):
+    def handle_client(self, client_socket, client_address, session_id=None, connected=None):
+        connected = connected or datetime.now()
+        session_id = session_id or new_session_id(connected)
+        server_handler = SSHServer(client_address, session_id)
+        transport = None
+        output = None
+        # Scanners dropping out before the key exchange completes get no session record
+        handshake_done = False
         try:
             transport = paramiko.Transport(client_socket)
-            transport.add_server_key(self.host_key)
+            transport.banner_timeout = self.handshake_timeout
+            transport.handshake_timeout = self.handshake_timeout
+            transport.auth_timeout = self.auth_timeout
+            for host_key in self.host_keys:
+                transport.add_server_key(host_key)
             
-            server_handler = SSHServer(client_address)
-            transport.start_server(server=server_handler)
+            # Algorithm preference order
+            options = transport.get_security_options()
+            options.key_types = self.key_types
+            if self.kex:
+                options.kex = self.kex
             
-            channel = transport.accept(20)
+            started = time.monotonic()
+            try:
+                transport.start_server(server=server_handler)
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                with self._stats_lock:
+                    self.handshake_failures += 1
+                logging.debug("SSH handshake with %s failed: %s", client_address, e)
+                return
+            handshake_done = transport.is_active()
+            if handshake_done:
+                self._record_handshake(transport, time.monotonic() - started)
+            
+            channel = transport.accept(self.auth_timeout)
             if channel is None:
-                logging.info(f"No channel established with {client_address}")
+                logging.debug("No channel established with %s", client_address)
+                return
+            
+            if not server_handler.event.wait(self.auth_timeout):
+                logging.debug("No shell requested by %s", client_address)
+                channel.close()
                 return
             
-            server_handler.event.wait(10)
+            # Close sessions that stay silent for too long
+            channel.settimeout(self.idle_timeout)
+            
+            recorder = server_handler.recorder = self._start_recording(session_id, server_handler)
+            if recorder is not None:
+                def send(data):
+                    # Recorded when it actually goes out (after any tarpit delay)
+                    recorder.output(data)
+                    channel.sendall(data)
+            else:
+                send = channel.sendall
+            
+            # All output goes through the session's ordered (and maybe delayed) writer
+            output = SessionOutput(self.scheduler, send,
+                                   budget=self.tarpit_session_budget,
+                                   send_ready=channel.send_ready,
+                                   on_close=channel.close)
+            if self.tarpit:
+                output.slow_down(self.tarpit_chunk, self.tarpit_interval)
             
             # Create a fake environment
             hostname = "prod-server"
             username = server_handler.username or "user"
             
-            # Send a welcome message
-            channel.send(f"\r\nWelcome to Ubuntu 20.04.5 LTS (GNU/Linux 5.4.0-146-generic x86_64)\r\n\r\n")
-            channel.send(f" * Documentation:  https://help.ubuntu.com\r\n")
-            channel.send(f" * Management:     https://landscape.canonical.com\r\n")
-            channel.send(f" * Support:        https://ubuntu.com/advantage\r\n\r\n")
-            channel.send(f"  System information as of {datetime.now().strftime('%a %b %d %H:%M:%S %Y')}\r\n\r\n")
-            channel.send(f"  System load:  0.08              Processes:             128\r\n")
-            channel.send(f"  Usage of /:   42.6% of 30.88GB   Users logged in:       1\r\n")
-            channel.send(f"  Memory usage: 38%                IPv4 address for eth0: 10.0.2.15\r\n\r\n")
-            channel.send(f"Last login: {(datetime.now() - timedelta(days=2)).strftime('%a %b %d %H:%M:%S %Y')} from 192.168.1.5\r\n")
-            channel.send(f"{username}@{hostname}:~$ ")
+            # Send a welcome message (one write)
+            output.send(
+                f"\r\nWelcome to Ubuntu 20.04.5 LTS (GNU/Linux 5.4.0-146-generic x86_64)\r\n\r\n"
+                f" * Documentation:  https://help.ubuntu.com\r\n"
+                f" * Management:     https://landscape.canonical.com\r\n"
+                f" * Support:        https://ubuntu.com/advantage\r\n\r\n"
+                f"  System information as of {datetime.now().strftime('%a %b %d %H:%M:%S %Y')}\r\n\r\n"
+                f"  System load:  0.08              Processes:             128\r\n"
+                f"  Usage of /:   42.6% of 30.88GB   Users logged in:       1\r\n"
+                f"  Memory usage: 38%                IPv4 address for eth0: 10.0.2.15\r\n\r\n"
+                f"Last login: {(datetime.now() - timedelta(days=2)).strftime('%a %b %d %H:%M:%S %Y')} from 192.168.1.5\r\n"
+                f"{username}@{hostname}:~$ "
+            )
             
             # Handle commands
-            buffer = ""
+            prompt = f"{username}@{hostname}:~$ "
+            discipline = LineDiscipline(max_line=self.max_line)
             while True:
-                data = channel.recv(1024)
+                try:
+                    data = channel.recv(4096)
+                except socket.timeout:
+                    with self._stats_lock:
+                        self.idle_timeouts += 1
+                    logging.debug("SSH session from %s idle for %ss, closing", client_address, self.idle_timeout)
+                    break
                 if not data:
                     break
+                if server_handler.recorder is not None:
+                    server_handler.recorder.input(data)
                 
-                # Convert to text and handle special characters
-                text = data.decode('utf-8')
-                for char in text:
-                    if char == '\r' or char == '\n':
-                        command = buffer.strip()
-                        if command:
-                            # Log the command
-                            log_entry = {
-                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "ip": client_address[0],
-                                "port": client_address[1],
-                                "type": "ssh_command",
-                                "username": server_handler.username,
-                                "password": server_handler.password,
-                                "command": command,
-                                "protocol": "SSH"
-                            }
-                            
-                            save_log(log_entry)
-                            logging.info(f"SSH command from {client_address[0]}: '{command}'")
-                            
-                            # Process commands
-                            self.process_command(channel, command, username, hostname)
-                        
-                        buffer = ""
-                        channel.send(f"{username}@{hostname}:~$ ")
-                    elif char == '\x03':  # Ctrl+C
-                        channel.send("^C\r\n")
-                        buffer = ""
-                        channel.send(f"{username}@{hostname}:~$ ")
-                    elif char == '\x7f' or char == '\x08':  # Backspace
-                        if buffer:
-                            buffer = buffer[:-1]
-                            channel.send("\b \b")  # Move back, erase, move back
-                    else:
-                        buffer += char
-                        channel.send(char)  # Echo the character
+                # One echo write per chunk, then the commands it completed
+                for echo, line in discipline.feed(data):
+                    if line is None:
+                        output.send(echo)
+                        continue
+                    command = line.strip() if line is not INTERRUPT else ""
+                    if not command:
+                        output.send(echo + prompt)
+                        continue
+                    output.send(echo)
+                    
+                    # Log the command (the session record holds the rest)
+                    log_entry = {
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "ip": client_address[0],
+                        "type": "ssh_command",
+                        "session": session_id,
+                        "command": command,
+                    }
+                    
+                    save_log(log_entry)
+                    server_handler.commands += 1
+                    COMMANDS.inc(sensor="ssh")
+                    logging.debug("SSH command from %s: %r", client_address[0], command)
+                    
+                    # Answer the command and show the next prompt in one write
+                    self.shell.run(output, command, username, hostname, prompt=prompt)
             
             channel.close()
             
         except Exception as e:
             logging.error(f"Error handling SSH client {client_address}: {e}")
         finally:
+            if output is not None:
+                output.close()
+            if transport is not None:
+                transport.close()
             client_socket.close()
+            if server_handler.recorder is not None:
+                server_handler.recorder.close()
+            if handshake_done:
+                self._log_session(client_address, connected, transport, server_handler)
     
-    def process_command(self, channel, command, username, hostname):
-        """Process and respond to shell commands"""
-        cmd = command.lower().strip()
-        
-        # Exit commands
-        if cmd in ['exit', 'logout', 'quit']:
-            channel.send("logout\r\n")
-            channel.send(f"Connection to {hostname} closed.\r\n")
-            return
-        
-        # Basic commands
-        elif cmd == 'whoami':
-            channel.send(f"{username}\r\n")
-        
-        elif cmd == 'hostname':
-            channel.send(f"{hostname}\r\n")
-        
-        elif cmd == 'id':
-            channel.send(f"uid=1000({username}) gid=1000({username}) groups=1000({username}),4(adm),24(cdrom),27(sudo),30(dip),46(plugdev),120(lpadmin),131(lxd),132(sambashare)\r\n")
-        
-        elif cmd.startswith('cd '):
-            # Just acknowledge the cd command
-            pass
-        
-        elif cmd == 'pwd':
-            channel.send(f"/home/{username}\r\n")
-        
-        elif cmd == 'ls' or cmd == 'ls -la' or cmd == 'ls -l':
-            channel.send("total 32\r\n")
-            channel.send(f"drwxr-xr-x 4 {username} {username} 4096 Apr 18 09:14 .\r\n")
-            channel.send(f"drwxr-xr-x 3 root     root     4096 Jan 15 12:32 ..\r\n")
-            channel.send(f"-rw------- 1 {username} {username}  220 Jan 15 12:32 .bash_history\r\n")
-            channel.send(f"-rw-r--r-- 1 {username} {username} 3771 Jan 15 12:32 .bashrc\r\n")
-            channel.send(f"drwx------ 2 {username} {username} 4096 Jan 15 12:34 .cache\r\n")
-            channel.send(f"-rw-r--r-- 1 {username} {username}  807 Jan 15 12:32 .profile\r\n")
-            channel.send(f"drwxrwxr-x 2 {username} {username} 4096 Apr 18 09:14 .ssh\r\n")
-            channel.send(f"-rw-r--r-- 1 {username} {username}    0 Jan 15 12:34 .sudo_as_admin_successful\r\n")
-            channel.send(f"-rw------- 1 {username} {username}  945 Apr 18 09:10 .viminfo\r\n")
-        
-        elif cmd == 'uname -a':
-            channel.send("Linux prod-server 5.4.0-146-generic #163-Ubuntu SMP Fri Mar 17 18:26:02 UTC 2023 x86_64 x86_64 x86_64 GNU/Linux\r\n")
-        
-        elif cmd == 'ps aux' or cmd == 'ps -ef':
-            channel.send(f"USER         PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND\r\n")
-            channel.send(f"root           1  0.0  0.2 168860 11492 ?        Ss   Apr17   0:04 /sbin/init\r\n")
-            channel.send(f"root           2  0.0  0.0      0     0 ?        S    Apr17   0:00 [kthreadd]\r\n")
-            channel.send(f"root         546  0.0  0.6  72172 25868 ?        Ss   Apr17   0:00 /usr/sbin/sshd -D\r\n")
-            channel.send(f"root         565  0.0  0.3 235520 14120 ?        Ssl  Apr17   0:00 /usr/sbin/rsyslogd -n\r\n")
-            channel.send(f"root         566  0.0  0.0   6812  2972 tty1     Ss+  Apr17   0:00 /sbin/agetty -o -p -- \\u --noclear tty1 linux\r\n")
-            channel.send(f"{username}      1328  0.0  0.1  19216  5144 pts/0    Ss   09:10   0:00 -bash\r\n")
-            channel.send(f"{username}      1392  0.0  0.1  36084  3704 pts/0    R+   09:15   0:00 ps aux\r\n")
-        
-        elif cmd == 'cat /etc/passwd':
-            channel.send("root:x:0:0:root:/root:/bin/bash\r\n")
-            channel.send("daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin\r\n")
-            channel.send("bin:x:2:2:bin:/bin:/usr/sbin/nologin\r\n")
-            channel.send("sys:x:3:3:sys:/dev:/usr/sbin/nologin\r\n")
-            channel.send(f"{username}:x:1000:1000:{username.capitalize()}:/home/{username}:/bin/bash\r\n")
-            channel.send("sshd:x:110:65534::/run/sshd:/usr/sbin/nologin\r\n")
-        
-        elif cmd == 'ifconfig' or cmd == '/sbin/ifconfig':
-            channel.send("eth0: flags=4163<UP,BROADCAST,RUNNING,MULTICAST>  mtu 1500\r\n")
-            channel.send("        inet 10.0.2.15  netmask 255.255.255.0  broadcast 10.0.2.255\r\n")
-            channel.send("        inet6 fe80::a00:27ff:fe73:60cf  prefixlen 64  scopeid 0x20<link>\r\n")
-            channel.send("        ether 08:00:27:73:60:cf  txqueuelen 1000  (Ethernet)\r\n")
-            channel.send("        RX packets 963  bytes 91521 (91.5 KB)\r\n")
-            channel.send("        RX errors 0  dropped 0  overruns 0  frame 0\r\n")
-            channel.send("        TX packets 649  bytes 96318 (96.3 KB)\r\n")
-            channel.send("        TX errors 0  dropped 0 overruns 0  carrier 0  collisions 0\r\n")
-            channel.send("\r\n")
-            channel.send("lo: flags=73<UP,LOOPBACK,RUNNING>  mtu 65536\r\n")
-            channel.send("        inet 127.0.0.1  netmask 255.0.0.0\r\n")
-            channel.send("        inet6 ::1  prefixlen 128  scopeid 0x10<host>\r\n")
-            channel.send("        loop  txqueuelen 1000  (Local Loopback)\r\n")
-            channel.send("        RX packets 182  bytes 13832 (13.8 KB)\r\n")
-            channel.send("        RX errors 0  dropped 0  overruns 0  frame 0\r\n")
-            channel.send("        TX packets 182  bytes 13832 (13.8 KB)\r\n")
-            channel.send("        TX errors 0  dropped 0 overruns 0  carrier 0  collisions 0\r\n")
-        
-        elif cmd.startswith('cat '):
-            # Simulate file not found for most files
-            filename = cmd[4:].strip()
-            if filename in ['/etc/passwd', '/etc/hostname', '/etc/hosts']:
-                # These files are handled in their specific commands
-                if filename == '/etc/hostname':
-                    channel.send(f"{hostname}\r\n")
-                elif filename == '/etc/hosts':
-                    channel.send("127.0.0.1 localhost\r\n")
-                    channel.send(f"127.0.1.1 {hostname}\r\n")
-                    channel.send("\r\n")
-                    channel.send("# The following lines are desirable for IPv6 capable hosts\r\n")
-                    channel.send("::1     ip6-localhost ip6-loopback\r\n")
-                    channel.send("fe00::0 ip6-localnet\r\n")
-                    channel.send("ff00::0 ip6-mcastprefix\r\n")
-                    channel.send("ff02::1 ip6-allnodes\r\n")
-                    channel.send("ff02::2 ip6-allrouters\r\n")
-            else:
-                channel.send(f"cat: {filename}: No such file or directory\r\n")
-        
-        elif cmd == 'uptime':
-            # Generate a random uptime
-            days = 15
-            hours = 7
-            minutes = 23
-            channel.send(f" 09:15:27 up {days} days, {hours}:{minutes}, 1 user, load average: 0.00, 0.01, 0.05\r\n")
-        
-        elif cmd == 'w' or cmd == 'who':
-            current_time = datetime.now().strftime('%H:%M:%S')
-            channel.send(f" {current_time} up 15 days, 7:23, 1 user, load average: 0.00, 0.01, 0.05\r\n")
-            channel.send(f"USER     TTY      FROM             LOGIN@   IDLE   JCPU   PCPU WHAT\r\n")
-            channel.send(f"{username}    pts/0    10.0.2.2          09:10    0.00s  0.04s  0.00s w\r\n")
-        
-        # For any other command, just acknowledge it
-        else:
-            if cmd:
-                if cmd.startswith('sudo '):
-                    channel.send(f"[sudo] password for {username}: ")
-                    # Wait for a moment to simulate password entry
-                    time.sleep(1)
-                    channel.send("\r\n")
-                    channel.send(f"{username} is not in the sudoers file. This incident will be reported.\r\n")
-                else:
-                    channel.send(f"bash: {command.split()[0]}: command not found\r\n")
+    def _start_recording(self, session_id, server_handler):
+        """Start recording the session's terminal (see ttylog.py), if enabled."""
+        if not self.record_tty:
+            return None
+        directory = self.tty_dir or tty_dir(utils.LOG_DIR)
+        try:
+            recorder = TTYRecorder(os.path.join(directory, session_id + TTY_SUFFIX),
+                                   max_bytes=self.tty_max_bytes, compress=self.tty_compress)
+        except OSError as e:
+            logging.error(f"Could not record SSH session {session_id}: {e}")
+            return None
+        if server_handler.term_size:
+            recorder.resize(*server_handler.term_size)
+        return recorder
+    
+    def _log_session(self, client_address, connected, transport, server_handler):
+        """Write the session's record: one per connection that completed the key exchange, once it is closed."""
+        closed = datetime.now()
+        save_log({
+            "timestamp": closed.strftime("%Y-%m-%d %H:%M:%S"),
+            "ip": client_address[0],
+            "port": client_address[1],
+            "type": "ssh_session",
+            "session": server_handler.session_id,
+            "protocol": "SSH",
+            "client_version": getattr(transport, "remote_version", None) or None,
+            "username": server_handler.username,
+            "password": server_handler.password,
+            "auth_attempts": server_handler.auth_attempts,
+            "connected": connected.strftime("%Y-%m-%d %H:%M:%S"),
+            "authenticated": server_handler.authenticated,
+            "duration": round((closed - connected).total_seconds(), 3),
+            "commands": server_handler.commands,
+            "tty": server_handler.recorder is not None,
+        })
 
 if __name__ == "__main__":
     # Use a non-privileged port for testing
@@ -0,0 +1,160 @@
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+
+try:
+    from .utils import get_log_writer, use_event_queue
+    from .metrics import REGISTRY
+except ImportError:
+    from utils import get_log_writer, use_event_queue
+    from metrics import REGISTRY
+
+
+def _worker_main(target, args, events, writer_settings):
+    # Runs in the worker process: send events to the supervisor, then serve
+    use_event_queue(events, **writer_settings)
+    target(*args)
+
+
+class _Slot:
+    """One worker position of a sensor and the process currently filling it."""
+
+    def __init__(self, name, index, target, args):
+        self.name = name
+        self.index = index
+        self.target = target
+        self.args = args
+        self.process = None
+        self.started = 0.0
+        self.restart_at = None
+        self.quick_failures = 0
+        self.restarts = 0
+
+
+class Supervisor:
+    """Runs sensors in worker processes and restarts the ones that die.
+
+    Each sensor gets ``workers`` processes listening on the same ports with
+    SO_REUSEPORT, so the kernel spreads connections (and the CPU spent on
+    them, e.g. SSH key exchanges) over several cores. Workers do not write
+    logs themselves: their log writer sends batches of events over one
+    multiprocessing queue to this process, where a single thread hands them
+    to ``sink`` (by default the shared LogWriter), so every event still goes
+    through one writer.
+
+    A worker that exits is restarted after ``restart_delay`` seconds; the
+    delay doubles (up to ``max_restart_delay``) while it keeps dying within
+    ``stable_after`` seconds of starting.
+    """
+
+    def __init__(self, sink=None, queue_size=1000, writer_settings=None, restart_delay=1.0,
+                 max_restart_delay=60.0, stable_after=30.0):
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("Worker processes need SO_REUSEPORT, which this platform lacks")
+        # spawn: workers start from a clean interpreter instead of a copy of
+        # this process and its threads
+        self._ctx = multiprocessing.get_context("spawn")
+        # Each item is a batch (list) of events
+        self.events = self._ctx.Queue(queue_size)
+        self.sink = sink
+        self.writer_settings = writer_settings or {}
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self._slots = []
+        self._lock = threading.Lock()
+        self._running = False
+        REGISTRY.register_stats("honeypot_supervisor", self.stats, counters=("events_received",))
+
+        # Counters
+        self.received = 0
+
+    def add(self, name, target, workers, *args):
+        """Run target(*args) in ``workers`` processes. target must be importable (picklable)."""
+        for index in range(workers):
+            self._slots.append(_Slot(name, index, target, args))
+
+    def start(self):
+        """Start the workers and the threads forwarding their events and watching them."""
+        if self.sink is None:
+            self.sink = get_log_writer()
+        self._running = True
+        threading.Thread(target=self._forward, name="worker-events", daemon=True).start()
+        with self._lock:
+            for slot in self._slots:
+                self._spawn(slot)
+        threading.Thread(target=self._monitor, name="worker-monitor", daemon=True).start()
+        return self
+
+    def _spawn(self, slot):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot.target, slot.args, self.events, self.writer_settings),
+            name=f"{slot.name}-worker-{slot.index}",
+            daemon=True,
+        )
+        process.start()
+        slot.process = process
+        slot.started = time.monotonic()
+        slot.restart_at = None
+        logging.info(f"Started {process.name} (pid {process.pid})")
+
+    def _forward(self):
+        while True:
+            batch = self.events.get()
+            for entry in batch:
+                self.sink.submit(entry)
+            self.received += len(batch)
+
+    def _monitor(self):
+        while self._running:
+            now = time.monotonic()
+            with self._lock:
+                for slot in self._slots:
+                    if not self._running:
+                        break
+                    if slot.restart_at is not None:
+                        if now >= slot.restart_at:
+                            slot.restarts += 1
+                            self._spawn(slot)
+                        continue
+                    if slot.process.is_alive():
+                        if now - slot.started >= self.stable_after:
+                            slot.quick_failures = 0
+                        continue
+                    if now - slot.started < self.stable_after:
+                        slot.quick_failures += 1
+                    delay = min(self.max_restart_delay, self.restart_delay * 2 ** slot.quick_failures)
+                    slot.restart_at = now + delay
+                    logging.warning(
+                        f"{slot.process.name} (pid {slot.process.pid}) exited with code "
+                        f"{slot.process.exitcode}; restarting in {delay:.0f}s"
+                    )
+            time.sleep(0.5)
+
+    def stop(self, timeout=5.0):
+        """Terminate every worker."""
+        with self._lock:
+            self._running = False
+            processes = [slot.process for slot in self._slots if slot.process is not None]
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": [
+                    {
+                        "name": slot.process.name if slot.process else f"{slot.name}-worker-{slot.index}",
+                        "pid": slot.process.pid if slot.process else None,
+                        "alive": bool(slot.process and slot.process.is_alive()),
+                        "restarts": slot.restarts,
+                    }
+                    for slot in self._slots
+                ],
+                "events_received": self.received,
+            }
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+try:
+    from .utils import save_log
+    from .metrics import REGISTRY, CONNECTIONS, ACTIVE_SESSIONS
+except ImportError:
+    from utils import save_log
+    from metrics import REGISTRY, CONNECTIONS, ACTIVE_SESSIONS
+
+
+class AsyncTCPHoneypot:
+    """Raw TCP sensor running on a single asyncio event loop.
+
+    Each connection gets the banner, then its input is collected until a
+    newline, EOF, ``max_buffer`` bytes or a timeout, and logged. Connections
+    are coroutines rather than threads, so idle scanners only cost a socket
+    and a small buffer. ``max_connections`` caps how many are served at once;
+    extra connections are closed right after accept().
+
+    Timeouts: each read waits at most ``idle_timeout`` seconds, and the whole
+    exchange is cut off after ``read_timeout`` seconds (slow-loris clients).
+
+    With an ``admission`` control (see admission.py), connections from
+    over-limit sources are aborted, or tarpitted by a paused coroutine,
+    before the banner is sent.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8080, backlog=1024, max_connections=10000,
+                 read_timeout=30, idle_timeout=10, max_buffer=4096,
+                 banner=b"Welcome to the service!\n", admission=None, reuse_port=False):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.max_buffer = max_buffer
+        self.banner = banner
+        self.admission = admission
+        self.reuse_port = reuse_port
+        self.held = 0
+        REGISTRY.register_stats("honeypot_tcp", self.stats, counters=("accepted", "rejected", "timeouts"))
+        ACTIVE_SESSIONS.set_function(lambda: self.active, sensor="tcp")
+
+        # Counters
+        self.active = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def serve_forever(self):
+        """Run the event loop in the calling thread."""
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        server = await asyncio.start_server(
+            self._handle, self.host, self.port, backlog=self.backlog, limit=self.max_buffer,
+            reuse_port=self.reuse_port or None,
+        )
+        logging.info(f"TCP Honeypot listening on {self.host}:{self.port} (asyncio, max {self.max_connections} connections)")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        if self.admission is not None and not self.admission.allow(addr[0]):
+            CONNECTIONS.inc(sensor="tcp", result="refused")
+            await self._refuse(writer, addr)
+            return
+        if self.active >= self.max_connections:
+            self.rejected += 1
+            CONNECTIONS.inc(sensor="tcp", result="rejected")
+            writer.transport.abort()
+            return
+
+        self.active += 1
+        self.accepted += 1
+        CONNECTIONS.inc(sensor="tcp", result="accepted")
+        logging.debug("TCP connection from %s", addr)
+        try:
+            # Simulate a service response
+            writer.write(self.banner)
+            await asyncio.wait_for(writer.drain(), self.idle_timeout)
+            data = await self._read_input(reader)
+            text = data.decode("utf-8", errors="replace")
+            logging.debug("Received data from %s: %r", addr, text)
+
+            # Log the interaction
+            log_entry = {
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "ip": addr[0],
+                "port": addr[1],
+                "data": text
+            }
+            save_log(log_entry)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+        except (ConnectionError, OSError) as e:
+            logging.error(f"Error handling client {addr}: {e}")
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def _refuse(self, writer, addr):
+        """Abort or tarpit a connection refused by admission control."""
+        tarpit = self.admission.tarpit
+        if self.admission.action != "tarpit" or self.held >= tarpit.max_held:
+            self.admission.refused(addr)
+            writer.transport.abort()
+            return
+        self.admission.refused(addr, tarpitted=True)
+        self.held += 1
+        writer.transport.pause_reading()
+        try:
+            await asyncio.sleep(tarpit.hold_seconds)
+        finally:
+            self.held -= 1
+            writer.transport.abort()
+
+    async def _read_input(self, reader):
+        """Read until a newline, EOF, max_buffer bytes or a timeout.
+
+        Whatever arrived before a timeout is returned; a timeout with no
+        data at all is raised.
+        """
+        buffer = bytearray()
+        deadline = time.monotonic() + self.read_timeout
+        while len(buffer) < self.max_buffer and b"\n" not in buffer:
+            remaining = min(self.idle_timeout, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(reader.read(self.max_buffer - len(buffer)), remaining)
+            except asyncio.TimeoutError:
+                if not buffer:
+                    raise
+                break
+            if not chunk:
+                break
+            buffer += chunk
+        if not buffer and time.monotonic() >= deadline:
+            raise asyncio.TimeoutError()
+        return bytes(buffer)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "max_connections": self.max_connections,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "held": self.held,
+        }
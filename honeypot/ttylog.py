@@ -0,0 +1,211 @@
+import gzip
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+from datetime import datetime
+
+# File header: magic, format version, start time (Unix seconds)
+MAGIC = b"MTTY"
+VERSION = 1
+HEADER = struct.Struct("<4sBd")
+
+# Frame header: kind, milliseconds since the start, payload length
+FRAME = struct.Struct("<BIH")
+MAX_PAYLOAD = 0xFFFF
+MAX_MILLISECONDS = 0xFFFFFFFF
+
+# Frame kinds
+INPUT = ord("i")
+OUTPUT = ord("o")
+RESIZE = ord("r")  # payload: columns, rows
+TERMINAL_SIZE = struct.Struct("<HH")
+
+# Recordings live in LOG_DIR/tty as <session ID>.tty (.tty.gz once compressed)
+TTY_DIR = "tty"
+TTY_SUFFIX = ".tty"
+
+
+def tty_dir(log_dir):
+    return os.path.join(log_dir, TTY_DIR)
+
+
+def recording_path(directory, session_id):
+    """Return the path of a session's recording (plain or compressed), or None if there is none."""
+    for name in (session_id + TTY_SUFFIX, session_id + TTY_SUFFIX + ".gz"):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def compress_recording(path):
+    """Gzip a finished recording to name.tty.gz and remove the plain file.
+
+    As with the log partitions, the archive is renamed into place once
+    complete, and the plain file is preferred while both exist.
+    """
+    target = path + ".gz"
+    tmp = target + ".tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+# Finished recordings waiting to be gzipped by the compressor thread
+_compress_queue = queue.Queue()
+_compress_thread = None
+_compress_lock = threading.Lock()
+
+
+def compress_later(path):
+    """Queue a finished recording for compression on a background thread.
+
+    Compressing a long session takes a while, and the SSH worker closing it
+    should not hold its pool slot meanwhile. Until it is done the plain file
+    is served; after a crash it simply stays plain.
+    """
+    global _compress_thread
+    with _compress_lock:
+        if _compress_thread is None:
+            _compress_thread = threading.Thread(target=_compress_loop, name="tty-compress", daemon=True)
+            _compress_thread.start()
+    _compress_queue.put(path)
+
+
+def _compress_loop():
+    while True:
+        path = _compress_queue.get()
+        try:
+            compress_recording(path)
+        except OSError as e:
+            logging.error(f"Could not compress TTY recording {path}: {e}")
+
+
+def prune_recordings(directory, before):
+    """Delete the recordings of sessions started before the date ``before``. Returns how many were deleted."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    deleted = 0
+    for name in names:
+        try:
+            started = datetime.strptime(name[:8], "%Y%m%d").date()
+        except ValueError:
+            continue
+        if started < before:
+            try:
+                os.remove(os.path.join(directory, name))
+                deleted += 1
+            except OSError:
+                pass
+    return deleted
+
+
+class TTYRecorder:
+    """Records what an SSH client typed and saw, with the time of each write.
+
+    The file starts with a header (magic, version, start time) followed by
+    frames: a 7-byte header (kind, milliseconds since the start, length) and
+    up to 64 KiB of data. Frames are only ever appended, through a buffer of
+    ``buffer_size`` bytes, so a recording costs one write() per buffer
+    rather than per keystroke; after a crash everything up to the last
+    flushed frame can still be read.
+
+    Recording stops (and ``truncated`` is set) once ``max_bytes`` of data
+    were recorded. With compress=True close() hands the file to the
+    background compressor (see compress_later).
+    """
+
+    def __init__(self, path, buffer_size=65536, max_bytes=10 * 1024 * 1024, compress=True):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.recorded = 0
+        self.truncated = False
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+
+    def input(self, data):
+        self._frame(INPUT, data)
+
+    def output(self, data):
+        self._frame(OUTPUT, data)
+
+    def resize(self, columns, rows):
+        self._frame(RESIZE, TERMINAL_SIZE.pack(min(columns, 0xFFFF), min(rows, 0xFFFF)))
+
+    def _frame(self, kind, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data:
+            return
+        with self._lock:
+            if self._file is None or self.truncated:
+                return
+            if self.max_bytes is not None and self.recorded + len(data) > self.max_bytes:
+                self.truncated = True
+                return
+            self.recorded += len(data)
+            elapsed = min(int((time.monotonic() - self._started) * 1000), MAX_MILLISECONDS)
+            for i in range(0, len(data), MAX_PAYLOAD):
+                chunk = data[i:i + MAX_PAYLOAD]
+                self._file.write(FRAME.pack(kind, elapsed, len(chunk)))
+                self._file.write(chunk)
+
+    def close(self):
+        """Flush the recording and queue it for compression."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        if self.compress:
+            compress_later(self.path)
+
+
+def open_recording(path):
+    """Open a recording and read its header. Returns (file, start time in Unix seconds).
+
+    Raises ValueError if the file is not a recording.
+    """
+    f = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    try:
+        header = f.read(HEADER.size)
+    except (OSError, EOFError):
+        # Not gzip data, or cut off
+        header = b""
+    if len(header) < HEADER.size or HEADER.unpack(header)[:2] != (MAGIC, VERSION):
+        f.close()
+        raise ValueError(f"Not a TTY recording: {path}")
+    return f, HEADER.unpack(header)[2]
+
+
+def read_frames(f):
+    """Yield (kind, milliseconds, data) for each frame of a recording opened with open_recording.
+
+    Frames are read one at a time. A frame cut short (the session was still
+    being written, or the process died) ends the recording.
+    """
+    while True:
+        try:
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                return
+            kind, elapsed, length = FRAME.unpack(header)
+            data = f.read(length)
+        except (OSError, EOFError):
+            # Damaged or unfinished gzip stream
+            return
+        if len(data) < length:
+            return
+        yield kind, elapsed, data
@@ -1,29 +1,77 @@
-import json
 import os
-from datetime import datetime
+import time
+import atexit
+import threading
+
+try:
+    from .writer import LogWriter, QueueWriter
+    from .sqlite_store import SQLiteEventStore, db_path
+    from .metrics import REGISTRY, EVENTS, SAVE_LOG_SECONDS
+except ImportError:
+    from writer import LogWriter, QueueWriter
+    from sqlite_store import SQLiteEventStore, db_path
+    from metrics import REGISTRY, EVENTS, SAVE_LOG_SECONDS
 
 # Use absolute path to ensure logs are saved in a consistent location
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
 
-def save_log(entry):
-    """Save a log entry to a JSON file."""
-    os.makedirs(LOG_DIR, exist_ok=True)
-    log_file = os.path.join(LOG_DIR, f"{datetime.now().strftime('%Y-%m-%d')}.json")
-    
-    if os.path.exists(log_file):
-        try:
-            with open(log_file, "r") as f:
-                logs = json.load(f)
-        except json.JSONDecodeError:
-            # Handle corrupted JSON file
-            logs = []
-    else:
-        logs = []
-
-    logs.append(entry)
-
-    with open(log_file, "w") as f:
-        json.dump(logs, f, indent=4)
+_writer = None
+_writer_lock = threading.Lock()
+
+# PRAGMA synchronous level matching each fsync policy
+SQLITE_SYNCHRONOUS = {"always": "FULL", "interval": "NORMAL", "never": "OFF"}
+
+def configure_log_writer(backend="ndjson", **settings):
+    """Replace the shared log writer with one using the given LogWriter settings.
+
+    backend is "ndjson" (day files) or "sqlite" (LOG_DIR/events.db).
+    """
+    global _writer
+    if backend == "sqlite":
+        synchronous = SQLITE_SYNCHRONOUS[settings.get("fsync", "interval")]
+        settings["store"] = SQLiteEventStore(db_path(LOG_DIR), synchronous=synchronous)
+    elif backend != "ndjson":
+        raise ValueError(f"Unknown log backend: {backend}")
     
-    # Debug output to confirm log was saved
-    print(f"Log saved: {entry.get('type', 'access')} from {entry.get('ip', 'unknown')} at {entry['timestamp']}")
\ No newline at end of file
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = LogWriter(LOG_DIR, **settings).start()
+    REGISTRY.register_stats("honeypot_log_writer", _writer.stats, LogWriter.STATS_COUNTERS)
+    return _writer
+
+def use_event_queue(events, **settings):
+    """Send this process's events to a multiprocessing queue instead of writing them.
+
+    Used by sensor worker processes; the supervisor writes the events (see
+    supervisor.py). settings are LogWriter settings for the local batching.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = QueueWriter(LOG_DIR, events, **settings).start()
+    REGISTRY.register_stats("honeypot_log_writer", _writer.stats, LogWriter.STATS_COUNTERS)
+    return _writer
+
+def get_log_writer():
+    """Return the shared log writer, starting it with default settings if needed."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter(LOG_DIR).start()
+                REGISTRY.register_stats("honeypot_log_writer", _writer.stats, LogWriter.STATS_COUNTERS)
+    return _writer
+
+def save_log(entry):
+    """Queue a log entry for the background writer (appended to today's NDJSON file)."""
+    start = time.perf_counter()
+    get_log_writer().submit(entry)
+    SAVE_LOG_SECONDS.observe(time.perf_counter() - start)
+    EVENTS.inc(type=entry.get('type', 'access'))
+
+@atexit.register
+def _close_log_writer():
+    if _writer is not None:
+        _writer.close()
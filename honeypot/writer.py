@@ -0,0 +1,264 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from queue import Full
+
+try:
+    from .eventlog import day_file, read_events, encode_event, needs_newline
+    from .metrics import LOG_COMMIT_SECONDS
+except ImportError:
+    from eventlog import day_file, read_events, encode_event, needs_newline
+    from metrics import LOG_COMMIT_SECONDS
+
+OVERFLOW_POLICIES = ("drop_oldest", "block", "spill")
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class LogWriter:
+    """Background writer that batches log events into group commits.
+
+    Connection threads hand events to ``submit`` which only appends them to an
+    in-memory queue. A single writer thread drains the queue every
+    ``flush_interval`` seconds (or as soon as ``batch_size`` events are
+    waiting) and appends each batch to the day files with one write per file.
+
+    When the queue holds ``max_queue`` events, ``overflow`` decides what
+    happens to new ones:
+
+    - ``drop_oldest``: discard the oldest queued event
+    - ``block``: wait until the writer makes room
+    - ``spill``: append the event to a spill file on disk; the writer replays
+      it once the queue has drained
+
+    ``fsync`` controls durability: ``always`` syncs after every batch,
+    ``interval`` at most once every ``fsync_interval`` seconds and ``never``
+    leaves it to the OS.
+
+    If ``store`` is given (an SQLiteEventStore), batches are inserted into it in
+    one transaction instead of being appended to the day files.
+    """
+
+    def __init__(self, log_dir, flush_interval=0.5, batch_size=500, max_queue=10000,
+                 overflow="drop_oldest", fsync="interval", fsync_interval=1.0, spill_dir=None,
+                 store=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.store = store
+        self.spill_file = os.path.join(spill_dir or log_dir, f"spill-{os.getpid()}.jsonl.tmp")
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._busy = False
+        self._last_fsync = 0.0
+
+        # Counters
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self):
+        """Start the writer thread."""
+        os.makedirs(self.log_dir, exist_ok=True)
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, entry, path=None):
+        """Queue an event for writing. Returns False if it had to be dropped."""
+        item = (path or day_file(self.log_dir), entry)
+        with self._cond:
+            self.submitted += 1
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == "block":
+                    while len(self._queue) >= self.max_queue and self._running:
+                        self._cond.wait()
+                else:
+                    self._spill(item)
+                    return True
+            self._queue.append(item)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """Block until every queued event has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._busy or self._has_spill():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else self.flush_interval)
+        return True
+
+    def close(self, timeout=5.0):
+        """Write out pending events and stop the writer thread."""
+        if not self._running:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # stats() keys that only grow
+    STATS_COUNTERS = ("submitted", "written", "dropped", "spilled", "batches", "errors")
+
+    def stats(self):
+        """Return queue depth and writer counters."""
+        with self._cond:
+            depth = len(self._queue)
+        return {
+            "queue_depth": depth,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+    def _spill(self, item):
+        # Called with self._cond held
+        path, entry = item
+        with self._spill_lock:
+            with open(self.spill_file, "ab") as f:
+                f.write(encode_event({"path": path, "entry": entry}))
+        self.spilled += 1
+
+    def _has_spill(self):
+        return any(os.path.exists(path) and os.path.getsize(path) > 0
+                   for path in (self.spill_file, self.spill_file + ".replay"))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and self._running:
+                    self._cond.wait(self.flush_interval)
+                if not self._queue and not self._running:
+                    break
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._busy = True
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+
+            try:
+                if batch:
+                    with LOG_COMMIT_SECONDS.time():
+                        self._commit(batch)
+                elif self.overflow == "spill" and self._has_spill():
+                    self._replay_spill()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Log writer failed to write {len(batch)} events: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _commit(self, batch):
+        """Append a batch with one write (and at most one fsync) per file."""
+        if self.store is not None:
+            self.store.insert_many([entry for _, entry in batch])
+            self.written += len(batch)
+            self.batches += 1
+            return
+
+        by_path = {}
+        for path, entry in batch:
+            by_path.setdefault(path, []).append(entry)
+
+        sync = self.fsync == "always"
+        if self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            sync = True
+
+        for path, entries in by_path.items():
+            data = b"".join(encode_event(entry) for entry in entries)
+            with open(path, "ab+") as f:
+                if needs_newline(f):
+                    data = b"\n" + data
+                f.write(data)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        if sync:
+            self._last_fsync = time.monotonic()
+        self.written += len(batch)
+        self.batches += 1
+
+    def _replay_spill(self):
+        """Move spilled events back into the log once the queue is empty.
+
+        A replay file left by a crash mid-replay is replayed first, so it is
+        never overwritten; events it shares with the log are written twice
+        rather than lost.
+        """
+        replay_file = self.spill_file + ".replay"
+        if os.path.exists(replay_file):
+            self._replay_file(replay_file)
+        with self._spill_lock:
+            if not os.path.exists(self.spill_file):
+                return
+            os.replace(self.spill_file, replay_file)
+        self._replay_file(replay_file)
+
+    def _replay_file(self, replay_file):
+        records = [(record["path"], record["entry"]) for record in read_events(replay_file)]
+        for start in range(0, len(records), self.batch_size):
+            self._commit(records[start:start + self.batch_size])
+        os.remove(replay_file)
+
+
+class QueueWriter(LogWriter):
+    """LogWriter for worker processes: batches go to another process instead of to disk.
+
+    Events are queued and batched exactly like LogWriter does, but each batch
+    is put on ``events`` (a multiprocessing queue) as a list of events for
+    the supervisor to write (see supervisor.py). If the supervisor
+    stops taking batches for ``put_timeout`` seconds, the batch is dropped
+    rather than stalling this process.
+    """
+
+    def __init__(self, log_dir, events, put_timeout=1.0, **settings):
+        settings.pop("store", None)
+        super().__init__(log_dir, **settings)
+        self.events = events
+        self.put_timeout = put_timeout
+
+    def _commit(self, batch):
+        try:
+            self.events.put([entry for _, entry in batch], timeout=self.put_timeout)
+        except Full:
+            self.dropped += len(batch)
+            return
+        self.written += len(batch)
+        self.batches += 1
@@ -1,27 +1,152 @@
 import threading
 from honeypot.honeypot import Honeypot
-from honeypot.ssh_honeypot import SSHHoneypot
-from web.app import app
+from honeypot.ssh_honeypot import SSHHoneypot, load_host_keys
+from honeypot.admission import AdmissionControl
+from honeypot.supervisor import Supervisor
+from honeypot.retention import LogRetention
+from honeypot.ttylog import tty_dir
+from honeypot.sqlite_store import SQLiteEventStore, db_path
+from honeypot.utils import configure_log_writer, LOG_DIR
 from config import HONEYPOT_HOST, HONEYPOT_PORT, WEB_APP_HOST, WEB_APP_PORT
+from config import LOG_BACKEND, LOG_FLUSH_INTERVAL, LOG_BATCH_SIZE, LOG_QUEUE_SIZE, LOG_OVERFLOW, LOG_FSYNC
+from config import LOG_RETENTION_ENABLED, LOG_HOT_DAYS, LOG_RETENTION_DAYS, LOG_RETENTION_INTERVAL
+from config import TCP_BACKLOG, TCP_MAX_CONNECTIONS, TCP_READ_TIMEOUT, TCP_IDLE_TIMEOUT, TCP_MAX_BUFFER
+from config import HTTP_MAX_CONNECTIONS, HTTP_TIMEOUT, HTTP_MAX_HEADER_BYTES, HTTP_MAX_BODY, HTTP_KEEPALIVE_REQUESTS
+from config import SSH_PORT, SSH_MAX_SESSIONS, SSH_ACCEPT_QUEUE, SSH_OVERFLOW, SSH_BACKLOG
+from config import SSH_HANDSHAKE_TIMEOUT, SSH_AUTH_TIMEOUT, SSH_IDLE_TIMEOUT, SSH_HOST_KEYS, SSH_KEX
+from config import SSH_TARPIT, SSH_TARPIT_CHUNK, SSH_TARPIT_INTERVAL
+from config import SSH_TARPIT_SESSION_BUDGET, SSH_TARPIT_GLOBAL_BUDGET, SSH_MAX_LINE
+from config import SSH_TTY_RECORDING, SSH_TTY_COMPRESS, SSH_TTY_MAX_BYTES
+from config import ADMISSION_ENABLED, ADMISSION_RATE, ADMISSION_BURST, ADMISSION_SUBNET_RATE
+from config import ADMISSION_SUBNET_BURST, ADMISSION_MAX_ENTRIES, ADMISSION_ACTION
+from config import ADMISSION_TARPIT_SECONDS, ADMISSION_MAX_TARPIT
+from config import SENSOR_WORKERS
 
-def start_honeypot():
-    honeypot = Honeypot(host=HONEYPOT_HOST, port=HONEYPOT_PORT)
+def make_admission(workers=1):
+    """Build the admission table, or None when admission control is off.
+    
+    With several worker processes per sensor each worker has its own table,
+    so each gets its share of the limits (connections from one source are
+    spread over the workers by the kernel).
+    """
+    if not ADMISSION_ENABLED:
+        return None
+    return AdmissionControl(
+        rate=ADMISSION_RATE / workers,
+        burst=max(1, ADMISSION_BURST / workers),
+        subnet_rate=ADMISSION_SUBNET_RATE / workers,
+        subnet_burst=max(1, ADMISSION_SUBNET_BURST / workers),
+        max_entries=ADMISSION_MAX_ENTRIES,
+        action=ADMISSION_ACTION,
+        tarpit_seconds=ADMISSION_TARPIT_SECONDS,
+        max_tarpit=ADMISSION_MAX_TARPIT,
+    )
+
+def start_honeypot(admission=None, reuse_port=False):
+    honeypot = Honeypot(
+        host=HONEYPOT_HOST,
+        port=HONEYPOT_PORT,
+        tcp_backlog=TCP_BACKLOG,
+        max_tcp_connections=TCP_MAX_CONNECTIONS,
+        tcp_read_timeout=TCP_READ_TIMEOUT,
+        tcp_idle_timeout=TCP_IDLE_TIMEOUT,
+        tcp_max_buffer=TCP_MAX_BUFFER,
+        admission=admission,
+        http_max_connections=HTTP_MAX_CONNECTIONS,
+        http_timeout=HTTP_TIMEOUT,
+        http_max_header_bytes=HTTP_MAX_HEADER_BYTES,
+        http_max_body=HTTP_MAX_BODY,
+        http_keepalive_requests=HTTP_KEEPALIVE_REQUESTS,
+        reuse_port=reuse_port,
+    )
     honeypot.start()
 
-def start_ssh_honeypot():
+def start_ssh_honeypot(admission=None, reuse_port=False):
     # Using port 2222 to avoid requiring admin privileges
-    ssh_honeypot = SSHHoneypot(host=HONEYPOT_HOST, port=2222)
+    ssh_honeypot = SSHHoneypot(
+        host=HONEYPOT_HOST,
+        port=SSH_PORT,
+        max_sessions=SSH_MAX_SESSIONS,
+        accept_queue=SSH_ACCEPT_QUEUE,
+        overflow=SSH_OVERFLOW,
+        backlog=SSH_BACKLOG,
+        handshake_timeout=SSH_HANDSHAKE_TIMEOUT,
+        auth_timeout=SSH_AUTH_TIMEOUT,
+        idle_timeout=SSH_IDLE_TIMEOUT,
+        admission=admission,
+        host_keys=SSH_HOST_KEYS,
+        kex=SSH_KEX,
+        tarpit=SSH_TARPIT,
+        tarpit_chunk=SSH_TARPIT_CHUNK,
+        tarpit_interval=SSH_TARPIT_INTERVAL,
+        tarpit_session_budget=SSH_TARPIT_SESSION_BUDGET,
+        tarpit_global_budget=SSH_TARPIT_GLOBAL_BUDGET,
+        max_line=SSH_MAX_LINE,
+        reuse_port=reuse_port,
+        record_tty=SSH_TTY_RECORDING,
+        tty_dir=tty_dir(LOG_DIR),
+        tty_compress=SSH_TTY_COMPRESS,
+        tty_max_bytes=SSH_TTY_MAX_BYTES,
+    )
     ssh_honeypot.start()
 
+def run_sensor_worker(sensor, workers):
+    """Entry point of a sensor worker process started by the supervisor."""
+    start = start_honeypot if sensor == "http" else start_ssh_honeypot
+    start(admission=make_admission(workers), reuse_port=True)
+
+def start_sensor_workers(workers, writer_settings):
+    # Generate missing host keys once, before the workers race to create them
+    load_host_keys(SSH_HOST_KEYS)
+    supervisor = Supervisor(writer_settings=writer_settings)
+    supervisor.add("http", run_sensor_worker, workers, "http", workers)
+    supervisor.add("ssh", run_sensor_worker, workers, "ssh", workers)
+    return supervisor.start()
+
 def start_web_app():
+    # Imported here so sensor worker processes don't load the dashboard
+    from web.app import app
     app.run(host=WEB_APP_HOST, port=WEB_APP_PORT)
 
 if __name__ == "__main__":
-    # Start HTTP honeypot in a thread
-    threading.Thread(target=start_honeypot, daemon=True).start()
+    writer_settings = dict(
+        flush_interval=LOG_FLUSH_INTERVAL,
+        batch_size=LOG_BATCH_SIZE,
+        max_queue=LOG_QUEUE_SIZE,
+        overflow=LOG_OVERFLOW,
+        fsync=LOG_FSYNC,
+    )
+    
+    # Start the shared background log writer used by both sensors
+    configure_log_writer(backend=LOG_BACKEND, **writer_settings)
+    
+    # Point the dashboard at the same storage backend and load the history (once)
+    from web.app import init_app
+    init_app(backend=LOG_BACKEND)
+    
+    # Archive and prune old day partitions in the background
+    if LOG_RETENTION_ENABLED:
+        LogRetention(
+            LOG_DIR,
+            hot_days=LOG_HOT_DAYS,
+            retention_days=LOG_RETENTION_DAYS,
+            interval=LOG_RETENTION_INTERVAL,
+            store=SQLiteEventStore(db_path(LOG_DIR)) if LOG_BACKEND == "sqlite" else None,
+        ).start()
     
-    # Start SSH honeypot in a thread
-    threading.Thread(target=start_ssh_honeypot, daemon=True).start()
+    if SENSOR_WORKERS > 0:
+        # Sensors in worker processes; their events come back to this process's writer
+        start_sensor_workers(SENSOR_WORKERS, writer_settings)
+    else:
+        # One admission table shared by every listener, so a flood on one port
+        # also counts against the source on the others
+        admission = make_admission()
+        
+        # Start HTTP honeypot in a thread
+        threading.Thread(target=start_honeypot, args=(admission,), daemon=True).start()
+        
+        # Start SSH honeypot in a thread
+        threading.Thread(target=start_ssh_honeypot, args=(admission,), daemon=True).start()
     
     # Start web app in main thread
-    start_web_app()
\ No newline at end of file
+    start_web_app()
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 import os
 import sys
-import json
 import shutil
 from pathlib import Path
 
+from honeypot.eventlog import migrate_json_logs
+
 def setup_honeypot():
     """Set up the honeypot environment"""
     print("Setting up Honeypot environment...")
@@ -20,12 +21,16 @@ def setup_honeypot():
             print(f"Creating directory: {full_path}")
             full_path.mkdir(parents=True, exist_ok=True)
     
+    # Convert JSON-array logs from older versions to NDJSON
+    migrated = migrate_json_logs(base_dir / "logs")
+    if migrated:
+        print(f"Migrated {migrated} log entries to NDJSON")
+    
     # Create empty log file if it doesn't exist
-    log_file = base_dir / "logs" / "honeypot.json"
+    log_file = base_dir / "logs" / "honeypot.jsonl"
     if not log_file.exists():
         print(f"Creating empty log file: {log_file}")
-        with open(log_file, "w") as f:
-            json.dump([], f)
+        log_file.touch()
     
     # Create a sample config file if it doesn't exist
     config_file = base_dir / "web" / "config.py"
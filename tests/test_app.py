@@ -0,0 +1,26 @@
+import base64
+import json
+
+import pytest
+
+import web.app as app_module
+
+
+@pytest.fixture
+def client(tmp_path):
+    app_module.init_app(str(tmp_path), "ndjson")
+    return app_module.app.test_client()
+
+
+def test_malformed_cursor_is_a_client_error(client):
+    cursor = base64.urlsafe_b64encode(json.dumps([1, 2, 3]).encode()).decode()
+    response = client.get(f"/api/logs?cursor={cursor}")
+    assert response.status_code == 400
+
+
+def test_ingested_events_are_paged_back(client):
+    body = b'{"ip": "198.51.100.1", "timestamp": "2026-01-01T10:00:30"}\n'
+    response = client.post("/api/ingest", data=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.get_json()["accepted"] == 1
+    logs = client.get("/api/logs?start=2026-01-01T10:00&end=2026-01-01T10:00").get_json()["logs"]
+    assert [event["timestamp"] for event in logs] == ["2026-01-01 10:00:30"]
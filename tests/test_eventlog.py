@@ -0,0 +1,46 @@
+import base64
+import json
+
+import pytest
+
+from honeypot.eventlog import append_events, day_file, decode_cursor, encode_cursor, event_matches, normalize_end
+from web.cache import EventCache
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize("value", [[1, 2, 3], [None], [], ["2026-10-18 12:00:00", [1]], {"a": 1}, "x"])
+def test_malformed_cursors_are_rejected(value):
+    with pytest.raises(ValueError):
+        decode_cursor(raw_cursor(value))
+
+
+def test_cursor_round_trip():
+    key = ("2026-10-18 12:00:00", "2026-10-18.jsonl", 4)
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+def test_cache_rejects_cursor_of_the_wrong_shape(tmp_path):
+    cache = EventCache(str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.page({}, ("2026-10-18 12:00:00", 1, "x"))
+
+
+def test_minute_end_bound_covers_the_whole_minute():
+    assert normalize_end("2026-10-18T12:17") == "2026-10-18 12:17:59.999999"
+    assert normalize_end("2026-10-18") == "2026-10-18 23:59:59.999999"
+    assert normalize_end("2026-10-18 12:17:30") == "2026-10-18 12:17:30.999999"
+    filters = {"end": "2026-10-18T12:17"}
+    assert event_matches({"timestamp": "2026-10-18 12:17:45"}, filters)
+    assert event_matches({"timestamp": "2026-10-18T12:17:59.500000"}, filters)
+    assert not event_matches({"timestamp": "2026-10-18 12:18:00"}, filters)
+
+
+def test_cache_page_end_bound(tmp_path):
+    from datetime import datetime
+    events = [{"timestamp": f"2026-10-18 12:{minute:02d}:30", "ip": "198.51.100.1"} for minute in (16, 17, 18)]
+    append_events(day_file(str(tmp_path), datetime(2026, 10, 18)), events)
+    logs, _ = EventCache(str(tmp_path)).page({"start": "2026-10-18T12:00", "end": "2026-10-18T12:17"})
+    assert [event["timestamp"] for event in logs] == ["2026-10-18 12:17:30", "2026-10-18 12:16:30"]
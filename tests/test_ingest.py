@@ -0,0 +1,43 @@
+import gzip
+import io
+
+import pytest
+
+from web.ingest import BatchTooLarge, decode_body, parse_batch
+
+
+def test_concatenated_gzip_members_are_all_decoded():
+    body = gzip.compress(b'{"ip": "198.51.100.1"}\n') + gzip.compress(b'{"ip": "198.51.100.2"}\n')
+    data = decode_body(io.BytesIO(body), True, 1024 * 1024, 1024 * 1024)
+    events, rejected, _ = parse_batch(data, 100)
+    assert [event["ip"] for event in events] == ["198.51.100.1", "198.51.100.2"]
+    assert rejected == 0
+
+
+def test_decoded_size_limit_covers_every_member():
+    body = gzip.compress(b"x" * 600) + gzip.compress(b"x" * 600)
+    with pytest.raises(BatchTooLarge):
+        decode_body(io.BytesIO(body), True, 1024 * 1024, 1000)
+
+
+def test_truncated_gzip_is_rejected():
+    body = gzip.compress(b'{"ip": "198.51.100.1"}\n')
+    with pytest.raises(ValueError):
+        decode_body(io.BytesIO(body[:-4]), True, 1024 * 1024, 1024 * 1024)
+
+
+def test_non_scalar_fields_are_rejected():
+    data = (b'{"ip": "198.51.100.1", "username": ["a"], "command": {"x": 1}}\n'
+            b'{"ip": "198.51.100.1", "username": "root"}\n')
+    events, rejected, errors = parse_batch(data, 100)
+    assert [event["username"] for event in events] == ["root"]
+    assert rejected == 1
+    assert errors == [{"line": 1, "error": "not a single value: username, command"}]
+
+
+def test_timestamps_with_an_offset_are_rejected():
+    events, rejected, errors = parse_batch(
+        b'{"ip": "198.51.100.1", "timestamp": "2026-01-01T10:00:00+02:00"}\n'
+        b'{"ip": "198.51.100.1", "timestamp": "2026-01-01T10:00:00.250"}\n', 100)
+    assert [event["timestamp"] for event in events] == ["2026-01-01 10:00:00"]
+    assert rejected == 1
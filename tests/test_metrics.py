@@ -0,0 +1,12 @@
+from honeypot.metrics import Registry
+
+
+def test_stats_counters_are_typed_as_counters():
+    registry = Registry()
+    registry.register_stats("demo", lambda: {"accepted": 3, "active": 1, "algorithms": {"rsa": 2}},
+                            counters=("accepted", "algorithms"))
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_accepted_total counter" in lines
+    assert "demo_accepted_total 3" in lines
+    assert "# TYPE demo_active gauge" in lines
+    assert "demo_algorithms_rsa_total 2" in lines
@@ -0,0 +1,28 @@
+import threading
+
+from honeypot.scheduler import Scheduler
+
+
+def test_cancelled_timers_do_not_count_toward_max_pending():
+    scheduler = Scheduler(max_pending=4)
+    for _ in range(20):
+        timers = [scheduler.call_later(60, print) for _ in range(4)]
+        assert None not in timers
+        for timer in timers:
+            scheduler.cancel(timer)
+    assert scheduler.stats()["pending"] == 0
+    assert scheduler.stats()["refused"] == 0
+    assert len(scheduler._heap) <= 4
+
+
+def test_cancel_after_fire_is_a_no_op():
+    scheduler = Scheduler(max_pending=2)
+    done = threading.Event()
+    timer = scheduler.call_later(0, done.set)
+    assert done.wait(5)
+    scheduler.cancel(timer)
+    stats = scheduler.stats()
+    assert stats["fired"] == 1
+    assert stats["pending"] == 0
+    assert scheduler.call_later(60, print) is not None
+    assert scheduler.call_later(60, print) is not None
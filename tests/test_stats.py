@@ -0,0 +1,25 @@
+from web.stats import AttackStats
+
+
+def test_non_scalar_fields_are_not_ranked():
+    stats = AttackStats()
+    stats.add([
+        {"timestamp": "2026-10-18 10:00:00", "type": "login_attempt", "ip": "198.51.100.1",
+         "username": ["a"], "password": {"b": 1}},
+        {"timestamp": "2026-10-18 10:00:01", "type": ["odd"], "ip": "198.51.100.1", "username": "root"},
+    ])
+    result = stats.query()
+    assert result["total"] == 2
+    assert result["top_usernames"] == [("root", 1)]
+    assert result["top_passwords"] == []
+    assert result["top_ips"] == [("198.51.100.1", 2)]
+
+
+def test_top_counters_are_bounded():
+    stats = AttackStats(top_capacity=5, daily_top_capacity=3)
+    stats.add([{"timestamp": "2026-10-18 10:00:00", "ip": "198.51.100.1", "username": f"user{i}"}
+               for i in range(100)])
+    stats.add([{"timestamp": "2026-10-18 10:00:00", "ip": "198.51.100.1", "username": "root"}] * 5)
+    assert len(stats._total_top["usernames"]) <= 10
+    # Approximate counts once trimmed, but the frequent value stays on top
+    assert stats.query(top=1)["top_usernames"][0][0] == "root"
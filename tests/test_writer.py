@@ -0,0 +1,22 @@
+import os
+
+from honeypot.eventlog import encode_event, read_events
+from honeypot.writer import LogWriter
+
+
+def test_restart_replays_leftover_replay_file_and_spill(tmp_path):
+    log_file = str(tmp_path / "events.jsonl")
+    writer = LogWriter(str(tmp_path), overflow="spill", flush_interval=0.05)
+    # A crash during a replay left both files behind
+    with open(writer.spill_file + ".replay", "wb") as f:
+        f.write(encode_event({"path": log_file, "entry": {"ip": "10.0.0.1"}}))
+    with open(writer.spill_file, "wb") as f:
+        f.write(encode_event({"path": log_file, "entry": {"ip": "10.0.0.2"}}))
+
+    writer.start()
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert [event["ip"] for event in read_events(log_file)] == ["10.0.0.1", "10.0.0.2"]
+    assert not os.path.exists(writer.spill_file)
+    assert not os.path.exists(writer.spill_file + ".replay")
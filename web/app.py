@@ -1,7 +1,8 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, g
 import os
-import json
-from datetime import datetime
+import time
+import logging
+import threading
 
 # Import configuration first
 try:
@@ -10,6 +11,12 @@ except ImportError:
     # Default configuration if config.py is not found
     CONFIG = {
         'LOG_DIR': os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs"),
+        'LOG_BACKEND': os.environ.get('HONEYPOT_LOG_BACKEND', "ndjson"),
+        'EVENT_CACHE_MAX_EVENTS': int(os.environ.get('HONEYPOT_CACHE_MAX_EVENTS', 1000000)),
+        'INGEST_MAX_BODY': 16 * 1024 * 1024,
+        'INGEST_MAX_DECODED': 128 * 1024 * 1024,
+        'INGEST_MAX_EVENTS': 100000,
+        'INGEST_KEY_TTL': 86400,
         'HONEYPOT_HOST': "0.0.0.0",
         'HONEYPOT_PORT': 8080,
         'WEB_HOST': "0.0.0.0",
@@ -25,20 +32,221 @@ HONEYPOT_PORT = CONFIG['HONEYPOT_PORT']
 # Fix the import based on your environment
 try:
     from web.logger import HoneypotLogger  # For Windows development
+    from web.cache import EventCache
+    from web.live import LiveFeed
+    from web.stats import AttackStats
+    from web.export import export_stream, EXPORT_FORMATS
+    from web.ingest import IdempotencyKeys, BatchTooLarge, decode_body, parse_batch
+    from web.replay import replay_stream, REPLAY_FORMATS
 except ImportError:
     from logger import HoneypotLogger  # For Linux deployment
+    from cache import EventCache
+    from live import LiveFeed
+    from stats import AttackStats
+    from export import export_stream, EXPORT_FORMATS
+    from ingest import IdempotencyKeys, BatchTooLarge, decode_body, parse_batch
+    from replay import replay_stream, REPLAY_FORMATS
+
+# The logger module puts the project root on sys.path
+from honeypot.eventlog import (
+    migrate_json_logs, encode_cursor, decode_cursor, iter_range, session_range, list_log_files,
+    is_archived, read_events,
+)
+from honeypot.sqlite_store import SQLiteEventStore, db_path
+from honeypot.ttylog import open_recording, recording_path, tty_dir
+from honeypot.metrics import REGISTRY, DASHBOARD_REQUEST_SECONDS
 
 app = Flask(__name__)
 
-# Initialize the logger with the correct LOG_DIR
-logger = HoneypotLogger(LOG_DIR)
+# Logger for /api/log and /api/ingest; set by init_app
+logger = None
+
+# SQLite event store, or None when events are read from the NDJSON day files
+event_store = None
+
+# Parsed NDJSON events, refreshed incrementally as the sensors append to the files
+event_cache = None
+
+# Newest SQLite row already passed to the ingest listeners
+_last_row_id = 0
+_ingest_lock = threading.RLock()
+_ingest_thread = None
+
+# Seconds between checks for new events while dashboards are streaming
+INGEST_POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15
+
+# Results of recent /api/ingest batches, so retries are not stored twice (set by init_app)
+ingest_keys = None
+
+# Attack statistics rolled up from every ingested event (/api/stats)
+attack_stats = AttackStats()
+
+# Streams newly stored events to connected dashboards (/api/stream)
+live_feed = LiveFeed(replay_size=1000, max_pending=500, max_subscribers=100)
+REGISTRY.register_stats("honeypot_live_feed", live_feed.stats, counters=("published", "resets"))
+
+# False while the existing history is loaded, so it is not streamed as new events
+_history_loaded = False
+
+# Set once init_app has run
+_initialized = False
+
+def notify_ingest_listeners(events):
+    """Pass a batch of newly stored events to everything maintained at ingest time."""
+    attack_stats.add(events)
+    if _history_loaded:
+        live_feed.publish(events)
+
+def init_app(log_dir=None, backend=None):
+    """Point the dashboard at its log directory and storage backend, and load the history.
+    
+    Importing this module touches no files. run.py calls this once at
+    startup; when the app is served on its own (app.run or a WSGI server)
+    the first request does. Defaults come from the configuration.
+    """
+    global LOG_DIR, logger, ingest_keys, _initialized
+    with _ingest_lock:
+        LOG_DIR = log_dir or CONFIG['LOG_DIR']
+        # Also creates LOG_DIR
+        logger = HoneypotLogger(LOG_DIR)
+        # Convert any JSON-array logs left by older versions to NDJSON
+        migrate_json_logs(LOG_DIR)
+        ingest_keys = IdempotencyKeys(LOG_DIR, ttl=CONFIG.get('INGEST_KEY_TTL', 86400))
+        init_storage(backend or CONFIG.get('LOG_BACKEND', "ndjson"))
+        _initialized = True
+
+def init_storage(backend):
+    """Select the storage backend used by the dashboard and /api/log.
+    
+    The existing history is read once to build the statistics (archived days
+    included); after that only new events are ingested.
+    """
+    global event_store, event_cache, _last_row_id, _history_loaded
+    with _ingest_lock:
+        if backend == "sqlite":
+            event_store = SQLiteEventStore(db_path(LOG_DIR))
+        elif backend == "ndjson":
+            event_store = None
+        else:
+            raise ValueError(f"Unknown log backend: {backend}")
+        logger.store = event_store
+        
+        event_cache = EventCache(LOG_DIR, max_events=CONFIG.get('EVENT_CACHE_MAX_EVENTS', 1000000))
+        event_cache.add_listener(notify_ingest_listeners)
+        REGISTRY.register_stats("honeypot_event_cache", event_cache.stats, counters=(
+            "hits", "misses", "evictions", "refreshes", "refresh_time", "bytes_read", "archive_reads"))
+        _last_row_id = 0
+        _history_loaded = False
+        attack_stats.clear()
+        if event_store is None:
+            load_archived_stats()
+        ingest_new_events()
+        _history_loaded = True
+
+def load_archived_stats(batch_size=10000):
+    """Add the events of the archived (compressed) days to the statistics.
+    
+    The cache only reads the plain day files, so without this the statistics
+    would lose every archived day at each restart.
+    """
+    batch = []
+    for path in list_log_files(LOG_DIR, archived=True):
+        if not is_archived(path):
+            continue
+        for event in read_events(path):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                attack_stats.add(batch)
+                batch = []
+    if batch:
+        attack_stats.add(batch)
+
+def ingest_new_events():
+    """Pick up events stored since the last call and pass them to the ingest listeners."""
+    global _last_row_id
+    if event_store is None:
+        # The cache notifies the listeners itself
+        event_cache.refresh()
+        return
+    with _ingest_lock:
+        while True:
+            rows = event_store.events_after(_last_row_id, limit=10000)
+            if not rows:
+                break
+            _last_row_id = rows[-1][0]
+            notify_ingest_listeners([event for _, event in rows])
+
+def _ingest_loop():
+    while True:
+        try:
+            ingest_new_events()
+        except Exception as e:
+            logging.error(f"Error ingesting new events: {e}")
+        time.sleep(INGEST_POLL_INTERVAL)
+
+def start_ingest_thread():
+    """Start polling storage for new events (once per process)."""
+    global _ingest_thread
+    with _ingest_lock:
+        if _ingest_thread is None:
+            _ingest_thread = threading.Thread(target=_ingest_loop, name="ingest", daemon=True)
+            _ingest_thread.start()
+
+@app.before_request
+def ensure_initialized():
+    if not _initialized:
+        with _ingest_lock:
+            if not _initialized:
+                init_app()
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed responses are timed until their first byte is ready
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        DASHBOARD_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                          endpoint=endpoint, method=request.method)
+    return response
+
+# Page size for /api/logs
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-# Ensure log directory exists
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
-    # Create an initial empty log file
-    with open(os.path.join(LOG_DIR, "honeypot.json"), "w") as f:
-        json.dump([], f)
+def parse_filters(args):
+    """Read the event filters from request arguments.
+
+    type may be a comma-separated list; start and end are inclusive timestamps
+    (e.g. "2024-01-31 23:00" or the value of a datetime-local input).
+    """
+    types = [t for t in args.get('type', '').split(',') if t]
+    return {
+        'types': types,
+        'ip': args.get('ip') or None,
+        'username': args.get('username') or None,
+        'protocol': args.get('protocol') or None,
+        'session': args.get('session') or None,
+        'start': args.get('start') or None,
+        'end': args.get('end') or None,
+    }
+
+def page_events(filters, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return a page of matching events (newest first) and the cursor of the next page."""
+    if event_store is not None:
+        return event_store.page(filters, cursor, limit)
+    return event_cache.page(filters, cursor, limit)
+
+def recent_events(types=None, limit=10):
+    """Return the latest events, optionally restricted to a list of types."""
+    if event_store is not None:
+        return event_store.query(types=types, limit=limit)
+    
+    return event_cache.latest(types, limit)
 
 @app.route("/")
 def dashboard():
@@ -48,13 +256,8 @@ def dashboard():
 
 @app.route("/logs")
 def logs():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    all_logs = []
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            all_logs.extend(logs)
-    return render_template("logs.html", logs=all_logs)
+    # Rows are fetched page by page from /api/logs
+    return render_template("logs.html")
 
 @app.route("/settings")
 def settings():
@@ -62,13 +265,159 @@ def settings():
 
 @app.route("/api/logs")  # This is correct
 def api_logs():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    all_logs = []
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            all_logs.extend(logs)
-    return jsonify(all_logs)
+    """Return one page of logs, newest first.
+
+    Query parameters: limit, cursor (next_cursor of the previous page) and the
+    filters accepted by parse_filters.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        logs, next_cursor = page_events(parse_filters(request.args),
+                                        decode_cursor(cursor) if cursor else None,
+                                        limit)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    return jsonify({
+        "logs": logs,
+        "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
+    })
+
+@app.route("/api/export")
+def api_export():
+    """Stream every event in a time range as NDJSON or CSV, oldest first.
+
+    Query parameters: start (required), end, format (ndjson or csv) and the
+    other filters accepted by parse_filters. Only the day partitions that
+    overlap the range are read, and events are streamed as they are read.
+    """
+    filters = parse_filters(request.args)
+    fmt = request.args.get('format', 'ndjson')
+    if not filters['start']:
+        return jsonify({"status": "error", "message": "start is required"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown export format: {fmt}"}), 400
+    
+    if event_store is not None:
+        events = event_store.iter_range(filters)
+    else:
+        events = iter_range(LOG_DIR, filters)
+    filename = f"honeypot-export.{'csv' if fmt == 'csv' else 'jsonl'}"
+    return Response(export_stream(events, fmt),
+                    mimetype=EXPORT_FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}",
+                             "X-Accel-Buffering": "no"})
+
+@app.route("/api/sessions/<session_id>")
+def api_session(session_id):
+    """Return an SSH session: its record and its login attempts and commands, oldest first.
+
+    SQLite finds the events through the session index; the NDJSON files are
+    only read for the days after the session's start (encoded in its ID).
+    """
+    try:
+        start, end = session_range(session_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    if event_store is not None:
+        events = event_store.iter_range({'session': session_id})
+    else:
+        events = iter_range(LOG_DIR, {'session': session_id, 'start': start, 'end': end})
+    
+    record = None
+    children = []
+    for event in events:
+        if event.get('type') == 'ssh_session':
+            record = event
+        else:
+            children.append(event)
+    if record is None and not children:
+        return jsonify({"status": "error", "message": "Session not found"}), 404
+    return jsonify({"session": record, "events": children})
+
+@app.route("/api/sessions/<session_id>/tty")
+def api_session_tty(session_id):
+    """Stream a session's terminal recording for playback.
+
+    format=asciicast (default) gives asciicast v2, which asciinema plays;
+    format=raw gives the recording in its own binary format. The file is
+    read one frame (or chunk) at a time, compressed or not.
+    """
+    fmt = request.args.get('format', 'asciicast')
+    if fmt not in REPLAY_FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown replay format: {fmt}"}), 400
+    try:
+        session_range(session_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    path = recording_path(tty_dir(LOG_DIR), session_id)
+    if path is None:
+        return jsonify({"status": "error", "message": "No recording for this session"}), 404
+    try:
+        f, started = open_recording(path)
+    except (OSError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    
+    extension = "cast" if fmt == "asciicast" else "tty"
+    return Response(replay_stream(f, started, fmt),
+                    mimetype=REPLAY_FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={session_id}.{extension}",
+                             "X-Accel-Buffering": "no"})
+
+@app.route("/api/stream")
+def stream():
+    """Server-Sent Events feed of newly stored events.
+
+    Each event is sent as "event: log" with its id; clients resuming with
+    Last-Event-ID get the events they missed, or "event: reset" if those are
+    no longer available and the client should reload its data.
+    """
+    start_ingest_thread()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    subscriber = live_feed.subscribe(last_event_id)
+    if subscriber is None:
+        return jsonify({"status": "error", "message": "Too many live connections"}), 503
+    
+    return Response(live_feed.stream(subscriber, HEARTBEAT_INTERVAL),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/stats")
+def api_stats():
+    """Attack statistics from the ingest-time rollups.
+
+    Query parameters: start, end (optional time range), granularity
+    (minute, hour or day) and top (number of top values per category).
+    """
+    ingest_new_events()
+    try:
+        top = min(max(int(request.args.get('top', 10)), 1), 100)
+        stats = attack_stats.query(start=request.args.get('start'),
+                                   end=request.args.get('end'),
+                                   granularity=request.args.get('granularity', 'hour'),
+                                   top=top)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(stats)
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(event_cache.stats())
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format. Metrics are per process: with SENSOR_WORKERS > 0
+    # the sensors' connection, login, command and handshake metrics and
+    # active sessions stay in the worker processes and are not reported here
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/api/settings", methods=["POST"])
 def api_settings():
@@ -85,64 +434,23 @@ def honeypot_monitor():
 
 @app.route("/api/honeypot/activity")
 def honeypot_activity():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    all_logs = []
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            all_logs.extend(logs)
-    
-    # Sort by timestamp in descending order and get the latest 20 entries
-    all_logs.sort(key=lambda x: x["timestamp"], reverse=True)
-    return jsonify(all_logs[:20])
+    # Latest 20 entries, most recent first
+    return jsonify(recent_events(limit=20))
 
 @app.route("/api/honeypot/login-attempts")
 def honeypot_login_attempts():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    login_attempts = []
-    
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            # Filter for login attempts (include both regular and SSH login attempts)
-            attempts = [log for log in logs if log.get('type') in ['login_attempt', 'ssh_login_attempt']]
-            login_attempts.extend(attempts)
-    
-    # Sort by timestamp in descending order and get the latest 10 entries
-    login_attempts.sort(key=lambda x: x["timestamp"], reverse=True)
-    return jsonify(login_attempts[:10])
+    # Latest 10 login attempts (include both regular and SSH login attempts)
+    return jsonify(recent_events(['login_attempt', 'ssh_login_attempt'], limit=10))
 
 @app.route("/api/honeypot/web-login-attempts")
 def web_login_attempts():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    login_attempts = []
-    
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            # Filter for web login attempts only
-            attempts = [log for log in logs if log.get('type') == 'login_attempt']
-            login_attempts.extend(attempts)
-    
-    # Sort by timestamp in descending order and get the latest 10 entries
-    login_attempts.sort(key=lambda x: x["timestamp"], reverse=True)
-    return jsonify(login_attempts[:10])
+    # Latest 10 web login attempts only
+    return jsonify(recent_events(['login_attempt'], limit=10))
 
 @app.route("/api/honeypot/ssh-login-attempts")
 def ssh_login_attempts():
-    log_files = [f for f in os.listdir(LOG_DIR) if f.endswith(".json")]
-    login_attempts = []
-    
-    for log_file in log_files:
-        with open(os.path.join(LOG_DIR, log_file), "r") as f:
-            logs = json.load(f)
-            # Filter for SSH login attempts only
-            attempts = [log for log in logs if log.get('type') == 'ssh_login_attempt']
-            login_attempts.extend(attempts)
-    
-    # Sort by timestamp in descending order and get the latest 10 entries
-    login_attempts.sort(key=lambda x: x["timestamp"], reverse=True)
-    return jsonify(login_attempts[:10])
+    # Latest 10 SSH login attempts only
+    return jsonify(recent_events(['ssh_login_attempt'], limit=10))
 
 # Add a new endpoint to log attempts directly from the honeypot
 @app.route("/api/log", methods=["POST"])
@@ -174,5 +482,50 @@ def log_attempt():
     
     return jsonify({"status": "success", "log": log_entry}), 200
 
+@app.route("/api/ingest", methods=["POST"])
+def api_ingest():
+    """Store a batch of events sent by a remote sensor.
+    
+    The body is NDJSON, one event per line, optionally gzip-compressed
+    (Content-Encoding: gzip). Every line is validated and the valid events are
+    written in a single commit; the response gives the accepted and rejected
+    counts. A retry carrying the same Idempotency-Key header gets the
+    original result and is not stored again.
+    """
+    max_body = CONFIG.get('INGEST_MAX_BODY', 16 * 1024 * 1024)
+    if request.content_length is not None and request.content_length > max_body:
+        return jsonify({"status": "error", "message": f"Body larger than {max_body} bytes"}), 413
+    
+    key = request.headers.get('Idempotency-Key')
+    if key:
+        key = key[:200]
+        result = ingest_keys.get(key)
+        if result is not None:
+            return jsonify(result), 200, {"Idempotent-Replayed": "true"}
+    
+    gzipped = request.headers.get('Content-Encoding', '').lower() in ('gzip', 'x-gzip')
+    try:
+        data = decode_body(request.stream, gzipped, max_body, CONFIG.get('INGEST_MAX_DECODED', 128 * 1024 * 1024))
+        events, rejected, errors = parse_batch(data, CONFIG.get('INGEST_MAX_EVENTS', 100000))
+    except BatchTooLarge as e:
+        return jsonify({"status": "error", "message": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    result = {"status": "success", "accepted": len(events), "rejected": rejected, "errors": errors}
+    if not key:
+        logger.log_events(events)
+        return jsonify(result), 200
+    
+    with ingest_keys.lock:
+        # A concurrent retry may have stored the batch in the meantime
+        previous = ingest_keys.get(key)
+        if previous is not None:
+            return jsonify(previous), 200, {"Idempotent-Replayed": "true"}
+        logger.log_events(events)
+        ingest_keys.put(key, result)
+    return jsonify(result), 200
+
 if __name__ == "__main__":
+    init_app()
     app.run(host=CONFIG['WEB_HOST'], port=CONFIG['WEB_PORT'], debug=CONFIG['DEBUG'])
\ No newline at end of file
@@ -0,0 +1,271 @@
+import os
+import time
+import heapq
+import threading
+
+from honeypot.eventlog import (
+    list_log_files, parse_lines, read_events, timestamp_key, event_matches, file_may_match,
+    is_archived,
+)
+
+try:
+    from .recent import RecentEvents
+except ImportError:
+    from recent import RecentEvents
+
+
+class _FileState:
+    """Parsed contents of one log file and how far it has been read."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.size = 0
+        self.mtime = 0
+        self.inode = None
+        self.events = []
+        self.evicted = False
+
+
+class EventCache:
+    """Process-wide cache of the events stored in the NDJSON log files.
+
+    ``refresh`` stats every log file and only parses what was appended since
+    the previous refresh, starting at the offset where it stopped. Torn or
+    partially written last lines are left for the next refresh. A file that
+    shrinks or is replaced is parsed again from the start.
+
+    At most ``max_events`` events are kept in memory. When the cap is exceeded
+    the oldest day files are evicted; their events are then read from disk
+    when a query needs them (and counted as misses).
+
+    ``recent`` holds the latest events per type. It is updated with every
+    batch of new events, whether or not their file is evicted, and rebuilt
+    only when a file is truncated, replaced or removed. Functions registered
+    with ``add_listener`` are called with every batch of new events as well.
+
+    Only the plain (hot) day files are cached. Compressed days archived by
+    honeypot/retention.py are streamed from disk by ``page`` when the query
+    has a start time that reaches them, and are skipped otherwise.
+    """
+
+    def __init__(self, log_dir, max_events=1000000, recent_capacity=100):
+        self.log_dir = log_dir
+        self.max_events = max_events
+        self.recent = RecentEvents(recent_capacity)
+        self._files = {}
+        self._lock = threading.RLock()
+        self._cached_events = 0
+        self._stale_recent = False
+        self._listeners = []
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_time = 0.0
+        self.last_refresh_time = 0.0
+        self.bytes_read = 0
+        self.evictions = 0
+        self.archive_reads = 0
+
+    def refresh(self):
+        """Pick up newly appended events. Returns the list of new events."""
+        start = time.perf_counter()
+        new_events = []
+        with self._lock:
+            paths = list_log_files(self.log_dir)
+            for path in set(self._files) - set(paths):
+                self._drop(path)
+
+            for path in paths:
+                state = self._files.get(path)
+                if state is None:
+                    state = self._files[path] = _FileState(path)
+                new_events.extend(self._refresh_file(state))
+
+            self._evict()
+
+            if self._stale_recent:
+                self._rebuild_recent()
+            else:
+                self.recent.add(new_events)
+            if new_events:
+                for listener in self._listeners:
+                    listener(new_events)
+
+            elapsed = time.perf_counter() - start
+            self.refreshes += 1
+            self.refresh_time += elapsed
+            self.last_refresh_time = elapsed
+        return new_events
+
+    def add_listener(self, listener):
+        """Call listener(events) with every batch of newly ingested events."""
+        self._listeners.append(listener)
+
+    def _refresh_file(self, state):
+        try:
+            st = os.stat(state.path)
+        except FileNotFoundError:
+            self._drop(state.path)
+            return []
+
+        if st.st_size == state.size and st.st_mtime == state.mtime and st.st_ino == state.inode:
+            return []
+
+        if st.st_size < state.offset or (state.inode is not None and st.st_ino != state.inode):
+            # Truncated or replaced: start over
+            self._cached_events -= len(state.events)
+            state.events = []
+            state.offset = 0
+            self._stale_recent = True
+
+        new_events = []
+        with open(state.path, "rb") as f:
+            f.seek(state.offset)
+            data = f.read(st.st_size - state.offset)
+        self.bytes_read += len(data)
+
+        # Only consume complete lines; a partial last line is read again later
+        end = data.rfind(b"\n") + 1
+        if end:
+            new_events = parse_lines(data[:end])
+            state.offset += end
+            if not state.evicted:
+                state.events.extend(new_events)
+                self._cached_events += len(new_events)
+
+        state.size = st.st_size
+        state.mtime = st.st_mtime
+        state.inode = st.st_ino
+        return new_events
+
+    def _drop(self, path):
+        state = self._files.pop(path, None)
+        if state is not None:
+            self._cached_events -= len(state.events)
+            self._stale_recent = True
+
+    def _rebuild_recent(self):
+        """Recompute the latest-events index from every remaining file."""
+        self.recent.clear()
+        for path in sorted(self._files):
+            state = self._files[path]
+            self.recent.add(read_events(path) if state.evicted else state.events)
+        self._stale_recent = False
+
+    def _evict(self):
+        """Evict the oldest day files until the cache fits in max_events."""
+        for path in sorted(self._files):
+            if self._cached_events <= self.max_events:
+                break
+            state = self._files[path]
+            if state.evicted:
+                continue
+            self._cached_events -= len(state.events)
+            state.events = []
+            state.evicted = True
+            self.evictions += 1
+
+    def events(self):
+        """Return every event, oldest day file first (refreshing first)."""
+        self.refresh()
+        parts = []
+        with self._lock:
+            for path in sorted(self._files):
+                state = self._files[path]
+                if state.evicted:
+                    self.misses += 1
+                    parts.append(path)
+                else:
+                    self.hits += 1
+                    parts.append(list(state.events))
+
+        # Evicted files are streamed from disk outside the lock
+        result = []
+        for part in parts:
+            if isinstance(part, str):
+                result.extend(read_events(part))
+            else:
+                result.extend(part)
+        return result
+
+    def page(self, filters, cursor=None, limit=100):
+        """Return one page of matching events, newest first, and the cursor of the next page.
+
+        Events are ordered by (timestamp, file name, line number), which stays
+        stable as files grow. Day files that cannot hold events in the
+        requested time range (or past the cursor) are skipped without reading.
+        Archived days are only searched when filters has a ``start``.
+        """
+        if cursor is not None and (len(cursor) != 3 or not isinstance(cursor[1], str) or not isinstance(cursor[2], int)):
+            raise ValueError("Invalid cursor")
+        self.refresh()
+        start = filters.get("start")
+        end = filters.get("end")
+        if cursor:
+            end = min(end, cursor[0]) if end else cursor[0]
+
+        parts = []
+        with self._lock:
+            for path in sorted(self._files):
+                if not file_may_match(path, start, end):
+                    continue
+                state = self._files[path]
+                if state.evicted:
+                    self.misses += 1
+                    parts.append((path, None))
+                else:
+                    self.hits += 1
+                    parts.append((path, list(state.events)))
+
+        if start:
+            # Archived days are only read when the time range asks for them
+            for path in list_log_files(self.log_dir, archived=True):
+                if is_archived(path) and file_may_match(path, start, end):
+                    self.archive_reads += 1
+                    parts.append((path, None))
+
+        def candidates():
+            for path, events in parts:
+                name = os.path.basename(path)
+                for index, event in enumerate(events if events is not None else read_events(path)):
+                    if not event_matches(event, filters):
+                        continue
+                    key = (timestamp_key(event), name, index)
+                    if cursor and key >= cursor:
+                        continue
+                    yield key, event
+
+        top = heapq.nlargest(limit + 1, candidates(), key=lambda item: item[0])
+        next_cursor = None
+        if len(top) > limit:
+            top = top[:limit]
+            next_cursor = top[-1][0]
+        return [event for _, event in top], next_cursor
+
+    def latest(self, types=None, limit=10):
+        """Return the newest events of the given types, newest first (refreshing first)."""
+        self.refresh()
+        with self._lock:
+            self.hits += 1
+        return self.recent.latest(types, limit)
+
+    def stats(self):
+        """Return cache size and hit/miss/refresh counters."""
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "evicted_files": sum(1 for state in self._files.values() if state.evicted),
+                "cached_events": self._cached_events,
+                "max_events": self.max_events,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "refresh_time": round(self.refresh_time, 6),
+                "last_refresh_time": round(self.last_refresh_time, 6),
+                "bytes_read": self.bytes_read,
+                "archive_reads": self.archive_reads,
+            }
@@ -8,6 +8,19 @@ CONFIG = {
     # Log directory - can be relative to project or absolute
     'LOG_DIR': os.environ.get('HONEYPOT_LOG_DIR', os.path.join(BASE_DIR, "logs")),
     
+    # Event storage backend: "ndjson" (day files) or "sqlite" (LOG_DIR/events.db)
+    'LOG_BACKEND': os.environ.get('HONEYPOT_LOG_BACKEND', "ndjson"),
+    
+    # Maximum number of events the dashboard keeps in memory (oldest days are evicted first)
+    'EVENT_CACHE_MAX_EVENTS': int(os.environ.get('HONEYPOT_CACHE_MAX_EVENTS', 1000000)),
+    
+    # Bulk ingestion (/api/ingest): body size limits and events per batch
+    'INGEST_MAX_BODY': int(os.environ.get('HONEYPOT_INGEST_MAX_BODY', 16 * 1024 * 1024)),
+    'INGEST_MAX_DECODED': int(os.environ.get('HONEYPOT_INGEST_MAX_DECODED', 128 * 1024 * 1024)),
+    'INGEST_MAX_EVENTS': int(os.environ.get('HONEYPOT_INGEST_MAX_EVENTS', 100000)),
+    # Seconds an Idempotency-Key is remembered
+    'INGEST_KEY_TTL': int(os.environ.get('HONEYPOT_INGEST_KEY_TTL', 86400)),
+    
     # Honeypot settings
     'HONEYPOT_HOST': os.environ.get('HONEYPOT_HOST', "0.0.0.0"),
     'HONEYPOT_PORT': int(os.environ.get('HONEYPOT_PORT', 8080)),
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+# CSV columns; any other event fields go to "extra" as JSON
+EXPORT_FIELDS = [
+    "timestamp", "type", "session", "ip", "port", "protocol", "username", "password",
+    "command", "path", "data", "raw_data",
+]
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Bytes collected before a chunk is handed to the server
+CHUNK_SIZE = 64 * 1024
+
+
+def ndjson_lines(events):
+    """Serialize events to NDJSON, one line per event."""
+    for entry in events:
+        yield json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def csv_lines(events):
+    """Serialize events to CSV (header first), one line per event."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS + ["extra"])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for entry in events:
+        extra = {key: value for key, value in entry.items() if key not in EXPORT_FIELDS}
+        writer.writerow(
+            [_cell(entry.get(field)) for field in EXPORT_FIELDS]
+            + [json.dumps(extra, separators=(",", ":"), ensure_ascii=False) if extra else ""]
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return value
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Group serialized lines into chunks of about size bytes (encoded as UTF-8)."""
+    parts = []
+    length = 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            length = 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def export_stream(events, fmt):
+    """Return the body generator for an export of events in the given format."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    lines = csv_lines(events) if fmt == "csv" else ndjson_lines(events)
+    return chunked(lines)
@@ -0,0 +1,207 @@
+import ipaddress
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+# Stored in the log directory, but not named *.jsonl so it is never read as events
+KEYS_FILE = "ingest-keys.log"
+
+# Rejected lines listed in a response (the counts are always complete)
+MAX_REPORTED_ERRORS = 100
+
+# Fields read by the dashboard (statistics, filters, sessions) that must be
+# a single value, not a list or an object
+SCALAR_FIELDS = ("username", "password", "command", "protocol", "session")
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def decode_body(stream, gzipped, max_bytes, max_decoded):
+    """Read a request body, gunzipping it on the fly, and return the raw NDJSON bytes.
+
+    A gzip body may hold several members one after the other, as written by
+    concatenating gzip files; all of them are decoded. Raises BatchTooLarge
+    when the body exceeds max_bytes on the wire or max_decoded once
+    decompressed (so a gzip bomb is stopped early), and ValueError when it
+    is not valid gzip.
+    """
+    decompressor = zlib.decompressobj(wbits=47) if gzipped else None  # gzip or zlib header
+    received = 0
+    parts = []
+    decoded = 0
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_bytes:
+            raise BatchTooLarge(f"Body larger than {max_bytes} bytes")
+        if decompressor is None:
+            decoded += len(chunk)
+            if decoded > max_decoded:
+                raise BatchTooLarge(f"Decompressed body larger than {max_decoded} bytes")
+            parts.append(chunk)
+            continue
+        while chunk:
+            if decompressor.eof:
+                # The next gzip member
+                decompressor = zlib.decompressobj(wbits=47)
+            try:
+                data = decompressor.decompress(chunk, max_decoded - decoded + 1)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {e}") from e
+            if decompressor.unconsumed_tail:
+                raise BatchTooLarge(f"Decompressed body larger than {max_decoded} bytes")
+            decoded += len(data)
+            if decoded > max_decoded:
+                raise BatchTooLarge(f"Decompressed body larger than {max_decoded} bytes")
+            parts.append(data)
+            chunk = decompressor.unused_data
+    if decompressor is not None and not decompressor.eof and received:
+        raise ValueError("Truncated gzip body")
+    return b"".join(parts)
+
+
+def validate_event(entry, now):
+    """Return (event, None) for a valid event or (None, reason).
+
+    Events need a valid ``ip``; ``type`` defaults to "access" and
+    ``timestamp`` to now. The timestamp must be a local time without a UTC
+    offset and is stored as "YYYY-MM-DD HH:MM:SS", like the sensors write it.
+    The fields in SCALAR_FIELDS must not be lists or objects. Other fields
+    are stored as sent.
+    """
+    if not isinstance(entry, dict):
+        return None, "not a JSON object"
+    ip = entry.get("ip")
+    if not isinstance(ip, str):
+        return None, "missing ip"
+    try:
+        ipaddress.ip_address(ip)
+    except ValueError:
+        return None, "invalid ip"
+    event_type = entry.setdefault("type", "access")
+    if not isinstance(event_type, str) or not event_type or len(event_type) > 64:
+        return None, "invalid type"
+    timestamp = entry.setdefault("timestamp", now)
+    if not isinstance(timestamp, str):
+        return None, "invalid timestamp"
+    try:
+        when = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None, "invalid timestamp"
+    if when.tzinfo is not None:
+        # Stored times are compared as local-time strings
+        return None, "timestamp with a UTC offset"
+    entry["timestamp"] = when.strftime("%Y-%m-%d %H:%M:%S")
+    port = entry.get("port")
+    if port is not None and (not isinstance(port, int) or isinstance(port, bool) or not 0 <= port <= 65535):
+        return None, "invalid port"
+    invalid = [field for field in SCALAR_FIELDS if isinstance(entry.get(field), (list, dict))]
+    if invalid:
+        return None, f"not a single value: {', '.join(invalid)}"
+    return entry, None
+
+
+def parse_batch(data, max_events):
+    """Validate an NDJSON batch. Returns (events, rejected count, reported errors)."""
+    now = datetime.now().isoformat()
+    events = []
+    rejected = 0
+    errors = []
+    for number, line in enumerate(data.split(b"\n"), 1):
+        if not line.strip():
+            continue
+        if len(events) + rejected >= max_events:
+            raise BatchTooLarge(f"More than {max_events} events in one batch")
+        try:
+            event, reason = validate_event(json.loads(line), now)
+        except ValueError:
+            event, reason = None, "invalid JSON"
+        if event is None:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": number, "error": reason})
+        else:
+            events.append(event)
+    return events, rejected, errors
+
+
+class IdempotencyKeys:
+    """Results of recently ingested batches, by Idempotency-Key.
+
+    A retried batch with a known key gets the stored result instead of
+    being written again. Keys are kept for ``ttl`` seconds, at most
+    ``max_keys`` of them (oldest dropped first), and appended to a file in
+    the log directory so they survive a restart.
+    """
+
+    def __init__(self, log_dir, ttl=86400, max_keys=100000):
+        self.path = os.path.join(log_dir, KEYS_FILE)
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        # Held from the key check to the write, so concurrent retries of one
+        # batch cannot both be written
+        self.lock = threading.Lock()
+        self._lines = 0
+        self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("time", 0) > cutoff:
+                        self._keys[record["key"]] = (record["time"], record["result"])
+        except FileNotFoundError:
+            return
+        self._trim()
+        self._rewrite()
+
+    def _rewrite(self):
+        # Compact the file down to the live keys
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            for key, (stamp, result) in self._keys.items():
+                f.write(json.dumps({"key": key, "time": stamp, "result": result}) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+        self._lines = len(self._keys)
+
+    def get(self, key):
+        entry = self._keys.get(key)
+        if entry is None or entry[0] < time.time() - self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key, result):
+        stamp = time.time()
+        self._keys[key] = (stamp, result)
+        self._keys.move_to_end(key)
+        self._trim()
+        if self._lines >= 2 * self.max_keys:
+            self._rewrite()
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "time": stamp, "result": result}) + "\n")
+        self._lines += 1
+
+    def _trim(self):
+        cutoff = time.time() - self.ttl
+        while self._keys:
+            key, (stamp, _) = next(iter(self._keys.items()))
+            if stamp > cutoff and len(self._keys) <= self.max_keys:
+                break
+            del self._keys[key]
+
+    def __len__(self):
+        return len(self._keys)
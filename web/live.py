@@ -0,0 +1,126 @@
+import json
+import threading
+from collections import deque
+
+
+class Subscriber:
+    """One connected dashboard: a bounded queue of (event id, event) pairs."""
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.pending = deque()
+        # Set when events were lost (slow consumer or resume point too old);
+        # the client must then reload its data instead of relying on the stream
+        self.needs_reset = False
+
+
+class LiveFeed:
+    """Fan-out of newly ingested events to streaming dashboard connections.
+
+    Every published event gets an increasing id. The last ``replay_size``
+    events are kept so a reconnecting client can resume from its last event
+    id. Each subscriber buffers at most ``max_pending`` events; a consumer
+    that falls further behind is flagged for a reset instead of growing its
+    buffer.
+    """
+
+    def __init__(self, replay_size=1000, max_pending=500, max_subscribers=100):
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._cond = threading.Condition()
+        self._next_id = 1
+
+        # Counters
+        self.published = 0
+        self.resets = 0
+
+    def publish(self, events):
+        """Assign ids to new events and queue them for every subscriber."""
+        if not events:
+            return
+        with self._cond:
+            for event in events:
+                item = (self._next_id, event)
+                self._next_id += 1
+                self._replay.append(item)
+                for subscriber in self._subscribers:
+                    if subscriber.needs_reset:
+                        continue
+                    if len(subscriber.pending) >= subscriber.max_pending:
+                        subscriber.pending.clear()
+                        subscriber.needs_reset = True
+                        self.resets += 1
+                    else:
+                        subscriber.pending.append(item)
+            self.published += len(events)
+            self._cond.notify_all()
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, replaying events after last_event_id if still available.
+
+        Returns None when the subscriber limit is reached.
+        """
+        with self._cond:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(self.max_pending)
+            if last_event_id is not None:
+                oldest = self._replay[0][0] if self._replay else self._next_id
+                if last_event_id + 1 < oldest or last_event_id >= self._next_id:
+                    # Missed events are gone (or the id is from before a restart)
+                    subscriber.needs_reset = True
+                else:
+                    missed = [item for item in self._replay if item[0] > last_event_id]
+                    subscriber.pending.extend(missed[-self.max_pending:])
+                    subscriber.needs_reset = len(missed) > self.max_pending
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._cond:
+            self._subscribers.discard(subscriber)
+
+    def wait(self, subscriber, timeout):
+        """Wait up to timeout seconds for events.
+
+        Returns (reset, items): reset is True if the subscriber lost events
+        since the last call.
+        """
+        with self._cond:
+            if not subscriber.pending and not subscriber.needs_reset:
+                self._cond.wait(timeout)
+            reset = subscriber.needs_reset
+            items = list(subscriber.pending)
+            subscriber.pending.clear()
+            subscriber.needs_reset = False
+            return reset, items
+
+    def stream(self, subscriber, heartbeat_interval=15):
+        """Yield Server-Sent Events for a subscriber until the client disconnects."""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                reset, items = self.wait(subscriber, heartbeat_interval)
+                if reset:
+                    yield f"id: {self._next_id - 1}\nevent: reset\ndata: {{}}\n\n"
+                if items:
+                    yield "".join(
+                        f"id: {event_id}\nevent: log\ndata: {json.dumps(event)}\n\n"
+                        for event_id, event in items
+                    )
+                elif not reset:
+                    # Heartbeat comment keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "resets": self.resets,
+                "last_event_id": self._next_id - 1,
+            }
@@ -1,8 +1,16 @@
-import json
 import os
+import sys
 from datetime import datetime
 import ipaddress
 
+# Add the parent directory to the path to import the honeypot package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from honeypot.eventlog import append_events, day_file, file_day, list_log_files, read_events, timestamp_key, LOG_SUFFIX
+
+# Events posted to the dashboard go to their own day partitions
+# (YYYY-MM-DD.api.jsonl), so retention rotates and prunes them like the rest
+API_PARTITION = ".api"
+
 class HoneypotLogger:
     def __init__(self, log_dir="../logs"):
         self.log_dir = log_dir
@@ -10,26 +18,41 @@ class HoneypotLogger:
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
         
-        # Default log file
-        self.log_file = os.path.join(log_dir, "honeypot.json")
+        # Optional SQLiteEventStore; when set, events are stored there instead
+        self.store = None
         
-        # Create log file if it doesn't exist
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, "w") as f:
-                json.dump([], f)
+        # Single file used before day partitions; still read, no longer written
+        self.legacy_log_file = os.path.join(log_dir, "honeypot" + LOG_SUFFIX)
+    
+    @property
+    def log_file(self):
+        """Today's partition for posted events"""
+        return day_file(self.log_dir, name=API_PARTITION)
     
     def _load_logs(self):
-        """Load existing logs from file"""
-        try:
-            with open(self.log_file, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+        """Load existing logs from file (archived days included)"""
+        logs = list(read_events(self.legacy_log_file))
+        for path in list_log_files(self.log_dir, archived=True):
+            if file_day(path) is not None and os.path.basename(path)[10:].startswith(API_PARTITION + "."):
+                logs.extend(read_events(path))
+        return logs
     
     def _save_logs(self, logs):
-        """Save logs to file"""
-        with open(self.log_file, "w") as f:
-            json.dump(logs, f, indent=2)
+        """Append new logs to file (or the event store)"""
+        if self.store is not None:
+            self.store.insert_many(logs)
+            return
+        # Each event goes to the partition of its own day, so the range
+        # queries and retention find ingested events sent late
+        days = {}
+        for entry in logs:
+            try:
+                when = datetime.fromisoformat(timestamp_key(entry))
+            except ValueError:
+                when = datetime.now()
+            days.setdefault(when.date(), (when, []))[1].append(entry)
+        for when, entries in days.values():
+            append_events(day_file(self.log_dir, when, name=API_PARTITION), entries)
     
     def log_attempt(self, ip, port, attempt_type, username=None, password=None, data=None, raw_data=None):
         """Log a honeypot access attempt"""
@@ -57,13 +80,16 @@ class HoneypotLogger:
         if raw_data:
             log_entry["raw_data"] = raw_data
             
-        # Load existing logs, add new entry, and save
-        logs = self._load_logs()
-        logs.append(log_entry)
-        self._save_logs(logs)
+        # Append the new entry without rewriting existing logs
+        self._save_logs([log_entry])
         
         return log_entry
     
+    def log_events(self, entries):
+        """Store a batch of already validated events in one write (or one transaction)"""
+        self._save_logs(entries)
+        return len(entries)
+    
     def log_login_attempt(self, ip, port, username, password, service="web"):
         """Log a login attempt (web or SSH)"""
         attempt_type = "ssh_login_attempt" if service == "ssh" else "login_attempt"
@@ -0,0 +1,55 @@
+import heapq
+import itertools
+import threading
+
+from honeypot.eventlog import timestamp_key
+
+
+class RecentEvents:
+    """Latest events per event type, maintained as events are ingested.
+
+    Each type keeps a bounded min-heap of its ``capacity`` newest events (plus
+    one heap across all types), so adding an event costs O(log capacity) and
+    "latest N of type X" never looks at the rest of the history. Events with
+    the same timestamp are ordered by arrival.
+    """
+
+    ALL = None
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._heaps = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, events):
+        """Record newly ingested events."""
+        with self._lock:
+            for event in events:
+                item = (timestamp_key(event), next(self._seq), event)
+                self._push(self.ALL, item)
+                self._push(event.get("type", "access"), item)
+
+    def _push(self, key, item):
+        heap = self._heaps.setdefault(key, [])
+        if len(heap) < self.capacity:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def clear(self):
+        with self._lock:
+            self._heaps = {}
+
+    def latest(self, types=None, limit=10):
+        """Return up to ``limit`` newest events of the given types, newest first.
+
+        Limits above ``capacity`` return at most ``capacity`` events.
+        """
+        with self._lock:
+            if not types:
+                heaps = [self._heaps.get(self.ALL, [])]
+            else:
+                heaps = [self._heaps.get(t, []) for t in types]
+            items = heapq.nlargest(limit, itertools.chain.from_iterable(heaps))
+        return [event for _, _, event in items]
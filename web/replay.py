@@ -0,0 +1,79 @@
+import codecs
+import json
+
+from honeypot.ttylog import read_frames, INPUT, OUTPUT, RESIZE, TERMINAL_SIZE
+
+try:
+    from .export import chunked
+except ImportError:
+    from export import chunked
+
+# Terminal size assumed when a recording starts without one
+DEFAULT_SIZE = (80, 24)
+
+REPLAY_FORMATS = {
+    "asciicast": "application/x-asciicast",
+    "raw": "application/octet-stream",
+}
+
+# Bytes read at a time for raw downloads
+RAW_CHUNK_SIZE = 64 * 1024
+
+_KINDS = {INPUT: "i", OUTPUT: "o"}
+
+
+def asciicast_lines(f, started):
+    """Convert an open TTY recording to asciicast v2 lines (header first), one frame at a time.
+
+    asciicast is the NDJSON format played by asciinema; input is included as
+    "i" events and terminal resizes as "r" events.
+    """
+    frames = read_frames(f)
+    first = next(frames, None)
+    width, height = DEFAULT_SIZE
+    if first is not None and first[0] == RESIZE:
+        width, height = TERMINAL_SIZE.unpack(first[2])
+        first = None
+    yield json.dumps({"version": 2, "width": width, "height": height, "timestamp": int(started)}) + "\n"
+
+    # Per stream, so a character split over two writes is decoded whole
+    decoders = {kind: codecs.getincrementaldecoder("utf-8")(errors="replace") for kind in _KINDS}
+
+    def events():
+        if first is not None:
+            yield first
+        yield from frames
+
+    for kind, elapsed, data in events():
+        if kind == RESIZE:
+            text = "%dx%d" % TERMINAL_SIZE.unpack(data)
+            code = "r"
+        elif kind in _KINDS:
+            text = decoders[kind].decode(data)
+            code = _KINDS[kind]
+            if not text:
+                continue
+        else:
+            continue
+        yield json.dumps([elapsed / 1000, code, text], ensure_ascii=False) + "\n"
+
+
+def raw_chunks(f):
+    """Stream the recording in its own binary format (uncompressed)."""
+    f.seek(0)
+    while True:
+        chunk = f.read(RAW_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def replay_stream(f, started, fmt):
+    """Body generator of a replay in the given format; closes f when done."""
+    try:
+        if fmt == "raw":
+            yield from raw_chunks(f)
+        else:
+            yield from chunked(asciicast_lines(f, started))
+    finally:
+        f.close()
@@ -8,7 +8,7 @@ function getTimestampedUrl(url) {
 // Global variables to store attempt data
 let webAttempts = [];
 let sshAttempts = [];
-let allAttempts = [];
+let attemptStats = null;
 
 // Fetch web login attempts
 function fetchWebLoginAttempts() {
@@ -22,50 +22,7 @@ function fetchWebLoginAttempts() {
         .then(data => {
             // Store the data globally
             webAttempts = data;
-            
-            const tableBody = document.getElementById('web-login-attempts-body');
-            if (!tableBody) return; // Guard clause if element doesn't exist
-            
-            tableBody.innerHTML = '';
-            
-            if (data.length === 0) {
-                const row = document.createElement('tr');
-                const cell = document.createElement('td');
-                cell.colSpan = 4;
-                cell.textContent = 'No web login attempts recorded';
-                cell.style.textAlign = 'center';
-                row.appendChild(cell);
-                tableBody.appendChild(row);
-                return;
-            }
-            
-            data.forEach(attempt => {
-                const row = document.createElement('tr');
-                
-                const timeCell = document.createElement('td');
-                // Format the timestamp to be more readable
-                const timestamp = new Date(attempt.timestamp);
-                timeCell.textContent = timestamp.toLocaleString();
-                
-                const ipCell = document.createElement('td');
-                ipCell.textContent = attempt.ip;
-                
-                const usernameCell = document.createElement('td');
-                usernameCell.textContent = attempt.username || '-';
-                
-                const passwordCell = document.createElement('td');
-                passwordCell.textContent = attempt.password || '-';
-                
-                row.appendChild(timeCell);
-                row.appendChild(ipCell);
-                row.appendChild(usernameCell);
-                row.appendChild(passwordCell);
-                
-                tableBody.appendChild(row);
-            });
-            
-            // Update attempt statistics
-            updateAttemptStats();
+            renderWebLoginAttempts();
         })
         .catch(error => {
             console.error('Error fetching web login attempts:', error);
@@ -76,6 +33,54 @@ function fetchWebLoginAttempts() {
         });
 }
 
+// Render the stored web login attempts
+function renderWebLoginAttempts() {
+    const data = webAttempts;
+    const tableBody = document.getElementById('web-login-attempts-body');
+    if (!tableBody) return; // Guard clause if element doesn't exist
+    
+    tableBody.innerHTML = '';
+    
+    if (data.length === 0) {
+        const row = document.createElement('tr');
+        const cell = document.createElement('td');
+        cell.colSpan = 4;
+        cell.textContent = 'No web login attempts recorded';
+        cell.style.textAlign = 'center';
+        row.appendChild(cell);
+        tableBody.appendChild(row);
+        return;
+    }
+    
+    data.forEach(attempt => {
+        const row = document.createElement('tr');
+        
+        const timeCell = document.createElement('td');
+        // Format the timestamp to be more readable
+        const timestamp = new Date(attempt.timestamp);
+        timeCell.textContent = timestamp.toLocaleString();
+        
+        const ipCell = document.createElement('td');
+        ipCell.textContent = attempt.ip;
+        
+        const usernameCell = document.createElement('td');
+        usernameCell.textContent = attempt.username || '-';
+        
+        const passwordCell = document.createElement('td');
+        passwordCell.textContent = attempt.password || '-';
+        
+        row.appendChild(timeCell);
+        row.appendChild(ipCell);
+        row.appendChild(usernameCell);
+        row.appendChild(passwordCell);
+        
+        tableBody.appendChild(row);
+    });
+    
+    // Update attempt statistics
+    updateAttemptStats();
+}
+
 // Fetch SSH login attempts
 function fetchSSHLoginAttempts() {
     fetch(getTimestampedUrl('/api/honeypot/ssh-login-attempts'))
@@ -86,44 +91,8 @@ function fetchSSHLoginAttempts() {
             return response.json();
         })
         .then(data => {
-            const tableBody = document.getElementById('ssh-login-attempts-body');
-            if (!tableBody) return; // Guard clause if element doesn't exist
-            
-            tableBody.innerHTML = '';
-            
-            if (data.length === 0) {
-                const row = document.createElement('tr');
-                const cell = document.createElement('td');
-                cell.colSpan = 4;
-                cell.textContent = 'No SSH login attempts recorded';
-                cell.style.textAlign = 'center';
-                row.appendChild(cell);
-                tableBody.appendChild(row);
-                return;
-            }
-            
-            data.forEach(attempt => {
-                const row = document.createElement('tr');
-                
-                const timeCell = document.createElement('td');
-                timeCell.textContent = attempt.timestamp;
-                
-                const ipCell = document.createElement('td');
-                ipCell.textContent = attempt.ip;
-                
-                const usernameCell = document.createElement('td');
-                usernameCell.textContent = attempt.username || '-';
-                
-                const passwordCell = document.createElement('td');
-                passwordCell.textContent = attempt.password || '-';
-                
-                row.appendChild(timeCell);
-                row.appendChild(ipCell);
-                row.appendChild(usernameCell);
-                row.appendChild(passwordCell);
-                
-                tableBody.appendChild(row);
-            });
+            sshAttempts = data;
+            renderSSHLoginAttempts();
         })
         .catch(error => {
             console.error('Error fetching SSH login attempts:', error);
@@ -134,9 +103,52 @@ function fetchSSHLoginAttempts() {
         });
 }
 
-// Fetch all attempts for statistics
-function fetchAllAttempts() {
-    fetch(getTimestampedUrl('/api/logs'))
+// Render the stored SSH login attempts
+function renderSSHLoginAttempts() {
+    const data = sshAttempts;
+    const tableBody = document.getElementById('ssh-login-attempts-body');
+    if (!tableBody) return; // Guard clause if element doesn't exist
+    
+    tableBody.innerHTML = '';
+    
+    if (data.length === 0) {
+        const row = document.createElement('tr');
+        const cell = document.createElement('td');
+        cell.colSpan = 4;
+        cell.textContent = 'No SSH login attempts recorded';
+        cell.style.textAlign = 'center';
+        row.appendChild(cell);
+        tableBody.appendChild(row);
+        return;
+    }
+    
+    data.forEach(attempt => {
+        const row = document.createElement('tr');
+        
+        const timeCell = document.createElement('td');
+        timeCell.textContent = attempt.timestamp;
+        
+        const ipCell = document.createElement('td');
+        ipCell.textContent = attempt.ip;
+        
+        const usernameCell = document.createElement('td');
+        usernameCell.textContent = attempt.username || '-';
+        
+        const passwordCell = document.createElement('td');
+        passwordCell.textContent = attempt.password || '-';
+        
+        row.appendChild(timeCell);
+        row.appendChild(ipCell);
+        row.appendChild(usernameCell);
+        row.appendChild(passwordCell);
+        
+        tableBody.appendChild(row);
+    });
+}
+
+// Fetch attack statistics (rolled up on the server as events are logged)
+function fetchAttemptStats() {
+    fetch(getTimestampedUrl('/api/stats?granularity=day&top=1'))
         .then(response => {
             if (!response.ok) {
                 throw new Error('Network response was not ok');
@@ -144,61 +156,54 @@ function fetchAllAttempts() {
             return response.json();
         })
         .then(data => {
-            allAttempts = data;
+            attemptStats = data;
             updateAttemptStats();
         })
         .catch(error => {
-            console.error('Error fetching all attempts:', error);
+            console.error('Error fetching attempt statistics:', error);
         });
 }
 
+// Refresh the statistics at most once every few seconds while events stream in
+let statsRefreshTimer = null;
+function scheduleStatsRefresh() {
+    if (statsRefreshTimer) return;
+    statsRefreshTimer = setTimeout(function() {
+        statsRefreshTimer = null;
+        fetchAttemptStats();
+    }, 5000);
+}
+
+// Escape values recorded from attackers before inserting them as HTML
+function escapeHtml(value) {
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
 // Update attempt statistics
 function updateAttemptStats() {
     // Only proceed if we have the stats element and data
     const statsElement = document.getElementById('attempt-stats');
-    if (!statsElement || !allAttempts.length) return;
-    
-    // Count attempts by type
-    const typeCounts = {};
-    allAttempts.forEach(attempt => {
-        const type = attempt.type || 'access';
-        typeCounts[type] = (typeCounts[type] || 0) + 1;
-    });
+    if (!statsElement || !attemptStats) return;
     
-    // Count unique IPs
-    const uniqueIPs = new Set(allAttempts.map(attempt => attempt.ip)).size;
+    const typeCounts = attemptStats.totals;
     
-    // Get most common username and password
-    const usernameCounts = {};
-    const passwordCounts = {};
-    
-    allAttempts.forEach(attempt => {
-        if (attempt.username) {
-            usernameCounts[attempt.username] = (usernameCounts[attempt.username] || 0) + 1;
-        }
-        if (attempt.password) {
-            passwordCounts[attempt.password] = (passwordCounts[attempt.password] || 0) + 1;
-        }
-    });
-    
-    const mostCommonUsername = Object.entries(usernameCounts)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 1)
-        .map(entry => `${entry[0]} (${entry[1]} attempts)`)[0] || 'None';
-    
-    const mostCommonPassword = Object.entries(passwordCounts)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 1)
-        .map(entry => `${entry[0]} (${entry[1]} attempts)`)[0] || 'None';
+    const formatTop = top => top.length
+        ? `${escapeHtml(top[0][0])} (${top[0][1]} attempts)`
+        : 'None';
     
     // Update the stats display
     statsElement.innerHTML = `
-        <p><strong>Total Attempts:</strong> ${allAttempts.length}</p>
-        <p><strong>Unique IPs:</strong> ${uniqueIPs}</p>
+        <p><strong>Total Attempts:</strong> ${attemptStats.total}</p>
+        <p><strong>Unique IPs:</strong> ${attemptStats.unique_ips}</p>
         <p><strong>Web Login Attempts:</strong> ${typeCounts['login_attempt'] || 0}</p>
         <p><strong>SSH Login Attempts:</strong> ${typeCounts['ssh_login_attempt'] || 0}</p>
-        <p><strong>Most Common Username:</strong> ${mostCommonUsername}</p>
-        <p><strong>Most Common Password:</strong> ${mostCommonPassword}</p>
+        <p><strong>Most Common Username:</strong> ${formatTop(attemptStats.top_usernames)}</p>
+        <p><strong>Most Common Password:</strong> ${formatTop(attemptStats.top_passwords)}</p>
     `;
 }
 
@@ -212,7 +217,50 @@ function checkHoneypotStatus() {
     // Refresh login attempt data
     fetchWebLoginAttempts();
     fetchSSHLoginAttempts();
-    fetchAllAttempts();
+    fetchAttemptStats();
+}
+
+// Number of rows shown in each login attempts table
+const MAX_RECENT_ATTEMPTS = 10;
+
+// Add a pushed login attempt to the matching table
+function handleLiveLog(log) {
+    scheduleStatsRefresh();
+    
+    if (log.type === 'login_attempt') {
+        webAttempts = [log].concat(webAttempts).slice(0, MAX_RECENT_ATTEMPTS);
+        renderWebLoginAttempts();
+    } else if (log.type === 'ssh_login_attempt') {
+        sshAttempts = [log].concat(sshAttempts).slice(0, MAX_RECENT_ATTEMPTS);
+        renderSSHLoginAttempts();
+    } else {
+        return;
+    }
+    
+    const lastUpdatedElement = document.getElementById('last-updated');
+    if (lastUpdatedElement) {
+        lastUpdatedElement.textContent = new Date().toLocaleTimeString();
+    }
+}
+
+// Receive new events from the server as they are logged instead of polling.
+// The browser reconnects on its own and resumes from the last event id.
+function startLiveFeed(reload) {
+    if (!window.EventSource) {
+        // Fall back to polling every 10 seconds
+        setInterval(reload, 10000);
+        return;
+    }
+    
+    const source = new EventSource('/api/stream');
+    source.addEventListener('log', function(event) {
+        handleLiveLog(JSON.parse(event.data));
+    });
+    // Sent when events were missed (slow connection or server restart)
+    source.addEventListener('reset', reload);
+    source.onerror = function() {
+        console.error('Live feed disconnected, reconnecting...');
+    };
 }
 
 document.addEventListener('DOMContentLoaded', function() {
@@ -227,6 +275,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Refresh login attempt data
         fetchWebLoginAttempts();
         fetchSSHLoginAttempts();
+        fetchAttemptStats();
     }
     
     // Initialize dashboard components
@@ -234,11 +283,9 @@ document.addEventListener('DOMContentLoaded', function() {
         // Set up any additional dashboard functionality here
         console.log("Dashboard initialized");
         
-        // Check status immediately
+        // Load the current data once, then follow the live feed
         checkHoneypotStatus();
-        
-        // Then check every 10 seconds
-        setInterval(checkHoneypotStatus, 10000);
+        startLiveFeed(checkHoneypotStatus);
     }
     
     // Initialize the dashboard
@@ -0,0 +1,170 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from honeypot.eventlog import timestamp_key, normalize_time
+
+# Length of the timestamp prefix ("YYYY-MM-DD HH:MM") that names a bucket
+BUCKET_WIDTHS = {"minute": 16, "hour": 13, "day": 10}
+
+# Buckets older than this many days (before the newest event) are pruned
+BUCKET_RETENTION_DAYS = {"minute": 7, "hour": 90, "day": None}
+
+# Event fields ranked by the "top" statistics
+TOP_FIELDS = {
+    "ips": "ip",
+    "usernames": "username",
+    "passwords": "password",
+    "commands": "command",
+}
+
+# Days of per-day top values kept (before the newest event), as for hour buckets
+TOP_RETENTION_DAYS = 90
+
+# Values counted per top field: all time, and per day. A counter holding
+# twice as many is trimmed back to its most frequent values, so memory stays
+# bounded however many distinct usernames and passwords are tried.
+TOP_CAPACITY = 10000
+DAILY_TOP_CAPACITY = 1000
+
+# Records summarizing other events; their fields are already counted there
+SUMMARY_TYPES = {"ssh_session"}
+
+
+class AttackStats:
+    """Attack statistics rolled up as events are ingested.
+
+    Counts per event type are kept in minute, hour and day buckets, and the
+    source IPs, usernames, passwords and commands are counted per day. A
+    query only sums the buckets that overlap its time range, so its cost
+    depends on the range and granularity rather than on the number of events.
+
+    Top values are approximate once more distinct values are seen than a
+    counter keeps (``top_capacity`` all time, ``daily_top_capacity`` per
+    day): rare values are dropped, and a value dropped and seen again starts
+    counting from zero. ``unique_ips`` then counts only the IPs still kept.
+    """
+
+    def __init__(self, top_capacity=TOP_CAPACITY, daily_top_capacity=DAILY_TOP_CAPACITY):
+        self.top_capacity = top_capacity
+        self.daily_top_capacity = daily_top_capacity
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {name: defaultdict(Counter) for name in BUCKET_WIDTHS}
+            self._daily_top = {name: defaultdict(Counter) for name in TOP_FIELDS}
+            self._total_top = {name: Counter() for name in TOP_FIELDS}
+            self._totals = Counter()
+            self._newest_day = ""
+            self._pruned_day = ""
+
+    def add(self, events):
+        """Update the rollups with newly ingested events."""
+        with self._lock:
+            for event in events:
+                key = timestamp_key(event)
+                event_type = event.get("type", "access")
+                if not isinstance(event_type, str):
+                    event_type = str(event_type)
+                self._totals[event_type] += 1
+                for name, width in BUCKET_WIDTHS.items():
+                    self._buckets[name][key[:width]][event_type] += 1
+
+                day = key[:10]
+                for name, field in TOP_FIELDS.items():
+                    value = event.get(field) if event_type not in SUMMARY_TYPES else None
+                    # Events read back from disk may hold anything; only scalars are ranked
+                    if value and isinstance(value, (str, int)):
+                        _count(self._daily_top[name][day], value, self.daily_top_capacity)
+                        _count(self._total_top[name], value, self.top_capacity)
+
+                if day > self._newest_day:
+                    self._newest_day = day
+
+            if self._newest_day != self._pruned_day:
+                self._prune()
+
+    def _prune(self):
+        """Drop fine-grained buckets and per-day top values that fall out of their retention window."""
+        try:
+            newest = date.fromisoformat(self._newest_day)
+        except ValueError:
+            return
+        for name, days in BUCKET_RETENTION_DAYS.items():
+            if days is None:
+                continue
+            cutoff = (newest - timedelta(days=days)).isoformat()
+            buckets = self._buckets[name]
+            for bucket in [b for b in buckets if b[:10] < cutoff]:
+                del buckets[bucket]
+        cutoff = (newest - timedelta(days=TOP_RETENTION_DAYS)).isoformat()
+        for days in self._daily_top.values():
+            for day in [d for d in days if d < cutoff]:
+                del days[day]
+        self._pruned_day = self._newest_day
+
+    def query(self, start=None, end=None, granularity="hour", top=10):
+        """Return counts per bucket and the top values in the [start, end] range.
+
+        Bounds are timestamps (or prefixes such as "2024-01-31"); buckets are
+        included if they overlap the range. Totals and top values are counted
+        per day, series at the requested granularity (minute buckets are only
+        kept for the last week, hour buckets and per-day top values for the
+        last 90 days).
+        """
+        if granularity not in BUCKET_WIDTHS:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        start = normalize_time(start)
+        end = normalize_time(end)
+
+        def in_range(bucket):
+            if start and bucket < start[:len(bucket)]:
+                return False
+            if end and bucket > end[:len(bucket)]:
+                return False
+            return True
+
+        with self._lock:
+            series = sorted(
+                (bucket, dict(counts))
+                for bucket, counts in self._buckets[granularity].items()
+                if in_range(bucket)
+            )
+            if start or end:
+                # Day buckets are never pruned, so totals stay exact for old ranges
+                totals = Counter()
+                for day, counts in self._buckets["day"].items():
+                    if in_range(day):
+                        totals.update(counts)
+                top_counters = {}
+                for name, days in self._daily_top.items():
+                    counter = Counter()
+                    for day, counts in days.items():
+                        if in_range(day):
+                            counter.update(counts)
+                    top_counters[name] = counter
+            else:
+                totals = Counter(self._totals)
+                top_counters = self._total_top
+
+            result = {
+                "granularity": granularity,
+                "totals": dict(totals),
+                "total": sum(totals.values()),
+                "unique_ips": len(top_counters["ips"]),
+                "series": [{"bucket": bucket, "counts": counts} for bucket, counts in series],
+            }
+            for name, counter in top_counters.items():
+                result[f"top_{name}"] = counter.most_common(top)
+        return result
+
+
+def _count(counter, value, capacity):
+    counter[value] += 1
+    if len(counter) > 2 * capacity:
+        # Keep the most frequent values only
+        kept = counter.most_common(capacity)
+        counter.clear()
+        counter.update(dict(kept))